@@ -8,6 +8,7 @@ TidyFile 主入口文件
 
 import sys
 import os
+import multiprocessing
 
 # 添加src目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -15,4 +16,6 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 from tidyfile.gui.main_window import main
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，文档提取进程池的子进程也从这个入口启动
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查看器服务器性能基准测试
+
+HTTP和HTTPS两种传输方式共用同一个服务器引擎，本脚本用相同的请求组合分别测试，
+便于对比两种入口的吞吐量和行为是否一致。
+
+使用方法:
+    python benchmark_viewer_server.py [--transport http|https|both] [--requests 200] [--concurrency 8]
+
+测试场景:
+    1. viewer.html 静态资源（gzip压缩 + 内存缓存）
+    2. /api/heartbeat JSON接口
+    3. /api/download-file 完整文件流式下载
+    4. /api/download-file Range请求（随机64KB片段）
+    5. 带If-None-Match的条件请求（304）
+"""
+
+import os
+import sys
+import ssl
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+import threading
+import http.client
+from pathlib import Path
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import start_viewer_server as viewer_server
+
+
+def start_benchmark_server(ssl_context=None):
+    """在后台线程中启动服务器，返回(服务器, 端口)"""
+    # 关闭访问日志，避免终端输出成为瓶颈
+    viewer_server.CustomHTTPRequestHandler.log_message = lambda self, format, *args: None
+    httpd = viewer_server.create_viewer_server("127.0.0.1", 0, ssl_context)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd, httpd.server_address[1]
+
+
+def create_https_context(temp_dir):
+    """生成临时自签名证书并创建TLS上下文"""
+    from start_viewer_server_https import create_ssl_context
+    return create_ssl_context(
+        os.path.join(temp_dir, "server.crt"),
+        os.path.join(temp_dir, "server.key")
+    )
+
+
+def run_scenario(name, port, use_tls, request_builder, total_requests, concurrency):
+    """
+    并发执行同一场景的请求
+    
+    Args:
+        request_builder: 返回 (方法, 路径, 请求头) 的函数
+    """
+    client_context = None
+    if use_tls:
+        client_context = ssl.create_default_context()
+        client_context.check_hostname = False
+        client_context.verify_mode = ssl.CERT_NONE
+    
+    def do_request(_):
+        method, path, headers = request_builder()
+        if use_tls:
+            conn = http.client.HTTPSConnection("127.0.0.1", port, timeout=30, context=client_context)
+        else:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        start_time = time.perf_counter()
+        try:
+            conn.request(method, path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            return response.status, len(body), time.perf_counter() - start_time
+        finally:
+            conn.close()
+    
+    # 服务器的逐请求日志会影响计时，测试期间屏蔽
+    start_time = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(do_request, range(total_requests)))
+    elapsed = time.perf_counter() - start_time
+    
+    latencies = sorted(result[2] for result in results)
+    total_bytes = sum(result[1] for result in results)
+    statuses = sorted({result[0] for result in results})
+    
+    print(f"  {name:<22} {total_requests / elapsed:>9.1f} req/s "
+          f"{total_bytes / elapsed / 1024 / 1024:>9.1f} MB/s "
+          f"p50 {latencies[len(latencies) // 2] * 1000:>7.1f}ms "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:>7.1f}ms "
+          f"状态码 {statuses}")
+    return {'name': name, 'rps': total_requests / elapsed, 'statuses': statuses}
+
+
+def run_benchmark(transport, sample_file, total_requests, concurrency, temp_dir):
+    """对一种传输方式运行全部场景"""
+    use_tls = transport == "https"
+    ssl_context = create_https_context(temp_dir) if use_tls else None
+    httpd, port = start_benchmark_server(ssl_context)
+    
+    file_size = os.path.getsize(sample_file)
+    download_path = f"/api/download-file?path={quote(sample_file)}"
+    accept_gzip = {'Accept-Encoding': 'gzip'}
+    
+    # 获取ETag用于条件请求场景
+    conn = (http.client.HTTPSConnection("127.0.0.1", port, context=ssl._create_unverified_context())
+            if use_tls else http.client.HTTPConnection("127.0.0.1", port))
+    conn.request("GET", "/viewer.html", headers=accept_gzip)
+    response = conn.getresponse()
+    response.read()
+    etag = response.getheader('ETag') or ''
+    conn.close()
+    
+    def random_range():
+        start = random.randint(0, max(0, file_size - 65536))
+        return "GET", download_path, {'Range': f"bytes={start}-{start + 65535}"}
+    
+    scenarios = [
+        ("viewer.html (gzip)", lambda: ("GET", "/viewer.html", accept_gzip)),
+        ("viewer.html (304)", lambda: ("GET", "/viewer.html", {**accept_gzip, 'If-None-Match': etag})),
+        ("api/heartbeat", lambda: ("GET", "/api/heartbeat", accept_gzip)),
+        ("download (full)", lambda: ("GET", download_path, {})),
+        ("download (range 64KB)", random_range),
+    ]
+    
+    print(f"\n[{transport.upper()}] 端口 {port}, 请求数 {total_requests}, 并发 {concurrency}")
+    results = [
+        run_scenario(name, port, use_tls, builder, total_requests, concurrency)
+        for name, builder in scenarios
+    ]
+    
+    httpd.shutdown()
+    httpd.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看器服务器性能基准测试")
+    parser.add_argument("--transport", choices=["http", "https", "both"], default="both", help="传输方式")
+    parser.add_argument("--requests", type=int, default=200, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发客户端数")
+    parser.add_argument("--file-size-mb", type=int, default=8, help="下载测试文件大小（MB）")
+    args = parser.parse_args()
+    
+    # 与正式启动一致：以项目根目录作为服务器根目录
+    os.chdir(Path(__file__).resolve().parent.parent)
+    
+    transports = ["http", "https"] if args.transport == "both" else [args.transport]
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sample_file = os.path.join(temp_dir, "benchmark_sample.pdf")
+        with open(sample_file, "wb") as f:
+            f.write(os.urandom(args.file_size_mb * 1024 * 1024))
+        
+        all_results = {}
+        for transport in transports:
+            all_results[transport] = run_benchmark(
+                transport, sample_file, args.requests, args.concurrency, temp_dir
+            )
+    
+    # 两种传输方式的状态码必须一致
+    if len(all_results) == 2:
+        print("\n行为一致性检查:")
+        for http_result, https_result in zip(all_results["http"], all_results["https"]):
+            same = http_result['statuses'] == https_result['statuses']
+            print(f"  {http_result['name']:<22} {'一致' if same else '不一致'} "
+                  f"(HTTPS/HTTP吞吐比 {https_result['rps'] / http_result['rps']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
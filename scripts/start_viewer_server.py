@@ -15,6 +15,11 @@ import http.server
 import socketserver
 import subprocess
 import threading
+import queue
+import errno
+import gzip
+import re
+import ssl
 import psutil
 import gc
 from pathlib import Path
@@ -46,16 +51,30 @@ try:
     # 添加src目录到Python路径
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
     from tidyfile.utils.app_paths import get_app_paths
+    from tidyfile.core.result_change_watcher import ResultChangeWatcher
+    from tidyfile.utils.file_name_index import get_file_name_index
+    from tidyfile.utils.path_existence_checker import check_paths_exist
+    from tidyfile.core.office_pdf_cache import OfficePdfCache, PdfPreconversionQueue, get_default_converter
+    from tidyfile.core.transfer_log_manager import TransferLogManager
     app_paths = get_app_paths()
     CACHE_DIR = app_paths.cache_dir
 except ImportError:
+    ResultChangeWatcher = None
+    get_file_name_index = None
+    check_paths_exist = None
+    OfficePdfCache = None
+    TransferLogManager = None
     # 兼容旧版本
     CACHE_DIR = Path("cache")
     if not CACHE_DIR.exists():
         CACHE_DIR.mkdir(exist_ok=True)
 
-# 文档转换缓存
-DOC_CONVERSION_CACHE = {}
+# 文档转换缓存（按大小和时间限制的LRU缓存，首次使用时创建）
+office_pdf_cache = None
+office_pdf_cache_lock = threading.Lock()
+
+# 后台预转换队列（启用预转换时创建）
+pdf_preconversion_queue = None
 
 # 连接管理配置
 CONNECTION_CONFIG = {
@@ -65,6 +84,18 @@ CONNECTION_CONFIG = {
     'cleanup_interval': 30,  # 清理间隔（秒）
     'max_memory_mb': 512,  # 最大内存使用（MB）
     'max_file_descriptors': 1000,  # 最大文件描述符数
+    'event_keepalive_interval': 15,  # 变更推送连接的保活间隔（秒）
+    'result_poll_interval': 1.0,  # 结果文件变更检查间隔（秒）
+    'path_check_workers': 16,  # 路径检查并行列出目录的线程数
+    'max_finished_jobs': 20,  # 保留的已完成后台任务数
+    'request_queue_size': 128,  # 监听队列长度
+    'gzip_min_size': 1024,  # 小于该大小的响应不压缩（字节）
+    'gzip_level': 5,  # gzip压缩级别
+    'static_max_age': 300,  # 静态资源缓存时间（秒）
+    'pdf_cache_max_size_mb': 1024,  # Office转PDF缓存总大小上限（MB）
+    'pdf_cache_max_age_days': 30,  # Office转PDF缓存最长保留天数
+    'preconvert_office_files': False,  # 是否在后台预转换最近分类的Office文件（--preconvert开启）
+    'preconvert_recent_limit': 50,  # 启动时预转换的最近记录数
 }
 
 # 连接状态跟踪
@@ -213,16 +244,283 @@ class ConnectionManager:
 # 全局连接管理器实例
 connection_manager = ConnectionManager()
 
+class BackgroundJobManager:
+    """后台任务管理器，耗时操作在后台线程执行，客户端轮询任务状态"""
+    
+    def __init__(self, max_finished_jobs=20):
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.max_finished_jobs = max_finished_jobs
+    
+    def start_job(self, job_type, target):
+        """
+        启动后台任务
+        
+        Args:
+            job_type: 任务类型
+            target: 任务函数，签名为 target(job)，通过 job['progress'] 更新进度，
+                    检查 job['cancel_event'] 响应取消，返回值作为任务结果
+        
+        Returns:
+            任务ID
+        """
+        job_id = hashlib.md5(f"{job_type}:{time.time()}:{id(target)}".encode()).hexdigest()[:12]
+        job = {
+            'job_id': job_id,
+            'type': job_type,
+            'status': 'running',
+            'progress': {'checked': 0, 'total': 0},
+            'result': None,
+            'error': None,
+            'start_time': time.time(),
+            'end_time': None,
+            'cancel_event': threading.Event()
+        }
+        
+        with self.lock:
+            self._cleanup_finished_jobs()
+            self.jobs[job_id] = job
+        
+        def run():
+            try:
+                job['result'] = target(job)
+                job['status'] = 'cancelled' if job['cancel_event'].is_set() else 'completed'
+            except Exception as e:
+                job['error'] = str(e)
+                job['status'] = 'failed'
+                print(f"后台任务失败 {job_type}: {e}")
+            finally:
+                job['end_time'] = time.time()
+        
+        threading.Thread(target=run, daemon=True).start()
+        return job_id
+    
+    def get_job(self, job_id):
+        """获取任务状态（可JSON序列化的副本），任务不存在时返回None"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        end_time = job['end_time'] or time.time()
+        return {
+            'job_id': job['job_id'],
+            'type': job['type'],
+            'status': job['status'],
+            'progress': dict(job['progress']),
+            'result': job['result'],
+            'error': job['error'],
+            'elapsed': round(end_time - job['start_time'], 2)
+        }
+    
+    def cancel_job(self, job_id):
+        """请求取消任务"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job['cancel_event'].set()
+        return True
+    
+    def _cleanup_finished_jobs(self):
+        """只保留最近的已完成任务（调用方持有锁）"""
+        finished = [job for job in self.jobs.values() if job['status'] != 'running']
+        finished.sort(key=lambda job: job['end_time'] or 0)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job['job_id']]
+
+
+# 全局后台任务管理器实例
+background_jobs = BackgroundJobManager(CONNECTION_CONFIG['max_finished_jobs'])
+
+# 静态资源缓存：路径 -> (修改时间, 大小, 原始内容, gzip内容)
+STATIC_RESOURCE_CACHE = {}
+STATIC_RESOURCE_CACHE_LOCK = threading.Lock()
+
+
+class ViewerServer(socketserver.ThreadingTCPServer):
+    """
+    查看器服务器，HTTP和HTTPS共用同一个服务器引擎
+    
+    每个请求在独立线程中处理；传入ssl_context时在工作线程中完成TLS握手，
+    慢速客户端的握手不会阻塞接受新连接。
+    """
+    
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = CONNECTION_CONFIG['request_queue_size']
+    
+    def __init__(self, server_address, handler_class, ssl_context=None):
+        self.ssl_context = ssl_context
+        super().__init__(server_address, handler_class)
+    
+    @property
+    def scheme(self):
+        """当前传输方式对应的URL协议"""
+        return 'https' if self.ssl_context else 'http'
+    
+    def get_request(self):
+        request, client_address = super().get_request()
+        # 响应头和响应体分开写出，关闭Nagle算法避免与延迟确认叠加产生的等待
+        try:
+            request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+        if self.ssl_context:
+            request = self.ssl_context.wrap_socket(
+                request, server_side=True, do_handshake_on_connect=False
+            )
+        return request, client_address
+    
+    def finish_request(self, request, client_address):
+        if self.ssl_context:
+            try:
+                request.settimeout(CONNECTION_CONFIG['connection_timeout'])
+                request.do_handshake()
+            except (ssl.SSLError, OSError) as e:
+                print(f"TLS握手失败 {client_address[0]}: {e}")
+                return
+        super().finish_request(request, client_address)
+
+
+def create_viewer_server(bind_address="0.0.0.0", port=80, ssl_context=None):
+    """
+    创建查看器服务器
+    
+    Args:
+        bind_address: 绑定地址
+        port: 端口号
+        ssl_context: TLS上下文，为None时使用HTTP传输
+    
+    Returns:
+        ViewerServer实例
+    """
+    httpd = ViewerServer((bind_address, port), CustomHTTPRequestHandler, ssl_context)
+    httpd.timeout = CONNECTION_CONFIG['keepalive_timeout']
+    return httpd
+
+
+def parse_range_header(range_header, file_size):
+    """
+    解析单段Range请求头
+    
+    Returns:
+        (起始位置, 结束位置)；范围无法满足时返回None；格式不支持（如多段范围）时返回False，按完整文件响应
+    """
+    match = re.match(r'^bytes=(\d*)-(\d*)$', range_header.strip())
+    if not match or file_size == 0:
+        return False
+    
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return False
+    
+    if not start_str:
+        # 后缀范围：bytes=-500 表示最后500字节
+        length = int(end_str)
+        if length == 0:
+            return None
+        return max(0, file_size - length), file_size - 1
+    
+    start = int(start_str)
+    end = int(end_str) if end_str else file_size - 1
+    if start >= file_size or end < start:
+        return None
+    return start, min(end, file_size - 1)
+
+# 结果文件变更监视器（服务器启动时创建）
+result_change_watcher = None
+
 def get_cache_key(file_path):
     """生成缓存键"""
     file_stat = os.stat(file_path)
     return hashlib.md5(f"{file_path}_{file_stat.st_mtime}_{file_stat.st_size}".encode()).hexdigest()
 
+def msoffice_com_converter(file_path, output_path):
+    """PDF缓存使用的COM转换器，服务器是多线程的，每次转换在当前线程中初始化COM"""
+    pythoncom.CoInitialize()
+    try:
+        return convert_with_msoffice_com(file_path, output_path, os.path.splitext(file_path)[1])
+    finally:
+        pythoncom.CoUninitialize()
+
+def get_office_pdf_cache():
+    """获取Office转PDF缓存，Windows上使用Office COM转换，其他平台使用LibreOffice作为本地替代"""
+    global office_pdf_cache
+    if OfficePdfCache is None:
+        return None
+    with office_pdf_cache_lock:
+        if office_pdf_cache is None:
+            converter = msoffice_com_converter if WIN32COM_AVAILABLE else get_default_converter()
+            office_pdf_cache = OfficePdfCache(
+                CACHE_DIR,
+                converter=converter,
+                max_size_mb=CONNECTION_CONFIG['pdf_cache_max_size_mb'],
+                max_age_days=CONNECTION_CONFIG['pdf_cache_max_age_days']
+            )
+    return office_pdf_cache
+
+def start_pdf_preconversion(json_file):
+    """
+    启动后台预转换：先转换最近分类的Office文件，之后跟随结果文件的新增记录
+    
+    Args:
+        json_file: 结果文件路径
+    """
+    global pdf_preconversion_queue
+    cache = get_office_pdf_cache()
+    if cache is None or cache.converter is None:
+        print("没有可用的Office转换器，跳过后台预转换")
+        return
+    
+    pdf_preconversion_queue = PdfPreconversionQueue(
+        cache,
+        thread_initializer=pythoncom.CoInitialize if WIN32COM_AVAILABLE else None,
+        thread_finalizer=pythoncom.CoUninitialize if WIN32COM_AVAILABLE else None
+    )
+    pdf_preconversion_queue.start()
+    
+    # 最近分类的记录优先
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        records = [item for item in records if isinstance(item, dict)]
+        records.sort(key=lambda item: item.get('处理时间', ''), reverse=True)
+        recent = records[:CONNECTION_CONFIG['preconvert_recent_limit']]
+        added = pdf_preconversion_queue.enqueue(item.get('最终目标路径', '') for item in recent)
+        print(f"后台预转换已启动，排队 {added} 个Office文件")
+    except Exception as e:
+        print(f"读取结果文件失败，跳过初始预转换: {e}")
+    
+    # 跟随结果文件变更，新分类的Office文件自动加入队列
+    if result_change_watcher is not None:
+        subscriber = result_change_watcher.subscribe()
+        
+        def follow_changes():
+            while True:
+                event = subscriber.get()
+                if event.get('reset'):
+                    continue
+                changed = event.get('added', []) + event.get('modified', [])
+                pdf_preconversion_queue.enqueue(
+                    change['record'].get('最终目标路径', '') for change in changed
+                )
+        
+        threading.Thread(target=follow_changes, daemon=True).start()
+
 def convert_office_to_pdf_advanced(file_path, cache_key=None):
-    """Office文件转PDF，仅使用win32com，失败则返回None"""
+    """Office文件转PDF，结果保存在有大小上限的LRU缓存中，失败则返回None"""
     if cache_key is None:
         cache_key = get_cache_key(file_path)
     
+    cache = get_office_pdf_cache()
+    if cache is not None:
+        pdf_path = cache.get_or_convert(file_path, cache_key)
+        if pdf_path:
+            print(f"使用缓存的PDF文件: {pdf_path}")
+            return pdf_path
+        print("Office转换失败，将使用原始文件")
+        return None
+    
     # 检查缓存
     cache_file = CACHE_DIR / f"{cache_key}.pdf"
     if cache_file.exists():
@@ -244,7 +542,42 @@ def convert_office_to_pdf_advanced(file_path, cache_key=None):
     print("Office转换失败，将使用原始文件")
     return None
 
+# Office COM转换串行执行：服务器多线程处理请求且有后台预转换，并发驱动Office容易互相干扰
+office_com_lock = threading.Lock()
+
+# 各类文件对应的Office进程名
+OFFICE_PROCESS_NAMES = {
+    '.doc': 'WINWORD.EXE', '.docx': 'WINWORD.EXE',
+    '.xls': 'EXCEL.EXE', '.xlsx': 'EXCEL.EXE',
+    '.ppt': 'POWERPNT.EXE', '.pptx': 'POWERPNT.EXE',
+}
+
+def get_office_process_ids(process_name):
+    """当前运行的指定Office进程的PID集合"""
+    pids = set()
+    for proc in psutil.process_iter(['pid', 'name']):
+        try:
+            if (proc.info['name'] or '').lower() == process_name.lower():
+                pids.add(proc.info['pid'])
+        except psutil.Error:
+            continue
+    return pids
+
+def kill_started_office_processes(process_name, pids_before):
+    """结束本次转换启动后未能正常退出的Office进程，用户原先打开的Office不受影响"""
+    for pid in get_office_process_ids(process_name) - pids_before:
+        try:
+            psutil.Process(pid).kill()
+            print(f"已结束转换启动的Office进程: {process_name} (PID {pid})")
+        except psutil.Error:
+            pass
+
 def convert_with_msoffice_com(file_path, cache_file, file_ext):
+    """使用Microsoft Office COM接口转换（同一时间只执行一个转换）"""
+    with office_com_lock:
+        return _convert_with_msoffice_com(file_path, cache_file, file_ext)
+
+def _convert_with_msoffice_com(file_path, cache_file, file_ext):
     """使用Microsoft Office COM接口转换（按照用户成功示例优化）"""
     if not WIN32COM_AVAILABLE:
         raise Exception("pywin32库不可用")
@@ -266,23 +599,15 @@ def convert_with_msoffice_com(file_path, cache_file, file_ext):
     # 根据文件类型选择应用程序
     ext = file_ext.lower()
     app = None
+    process_name = OFFICE_PROCESS_NAMES.get(ext)
+    # 记录转换前已在运行的Office进程，失败时只结束本次启动的进程
+    pids_before = get_office_process_ids(process_name) if process_name else set()
     
     try:
-        # 首先尝试强制关闭可能存在的Word实例
-        if ext in ['.doc', '.docx']:
-            try:
-                import subprocess
-                subprocess.run(['taskkill', '/F', '/IM', 'WINWORD.EXE'], 
-                             stdout=subprocess.DEVNULL, 
-                             stderr=subprocess.DEVNULL,
-                             creationflags=subprocess.CREATE_NO_WINDOW)
-                print("已强制关闭现有Word实例")
-            except:
-                pass
-        
+        # DispatchEx启动独立的Office实例，不接管用户已打开的窗口，Quit时也不会关闭用户的文档
         if ext in ['.doc', '.docx']:
             print(f"使用Word转换: {file_path}")
-            app = win32com.client.Dispatch('Word.Application')
+            app = win32com.client.DispatchEx('Word.Application')
             app.Visible = False
             doc = app.Documents.Open(file_path)
             doc.SaveAs(output_path, FileFormat=17)  # 17 = PDF
@@ -290,7 +615,7 @@ def convert_with_msoffice_com(file_path, cache_file, file_ext):
             
         elif ext in ['.xls', '.xlsx']:
             print(f"使用Excel转换: {file_path}")
-            app = win32com.client.Dispatch('Excel.Application')
+            app = win32com.client.DispatchEx('Excel.Application')
             app.Visible = False
             wb = app.Workbooks.Open(file_path)
             wb.ExportAsFixedFormat(0, output_path)  # 0 = PDF
@@ -298,7 +623,7 @@ def convert_with_msoffice_com(file_path, cache_file, file_ext):
             
         elif ext in ['.ppt', '.pptx']:
             print(f"使用PowerPoint转换: {file_path}")
-            app = win32com.client.Dispatch('PowerPoint.Application')
+            app = win32com.client.DispatchEx('PowerPoint.Application')
             app.Visible = False
             ppt = app.Presentations.Open(file_path, WithWindow=False)
             ppt.SaveAs(output_path, FileFormat=32)  # 32 = PDF
@@ -326,6 +651,8 @@ def convert_with_msoffice_com(file_path, cache_file, file_ext):
                 app.Quit()
         except:
             pass
+        if process_name:
+            kill_started_office_processes(process_name, pids_before)
         
         # 如果失败，尝试使用备用方法
         try:
@@ -355,6 +682,9 @@ def convert_with_fallback_method(file_path, cache_file, file_ext):
         # 根据文件类型选择应用程序
         ext = file_ext.lower()
         app = None
+        # Dispatch可能接管用户已打开的Office实例，这种情况下转换后不退出
+        process_name = OFFICE_PROCESS_NAMES.get(ext)
+        already_running = bool(process_name and get_office_process_ids(process_name))
         
         if ext in ['.doc', '.docx']:
             print(f"备用方法：使用Word转换: {file_path}")
@@ -380,8 +710,8 @@ def convert_with_fallback_method(file_path, cache_file, file_ext):
         else:
             raise Exception(f"不支持的文件类型: {file_ext}")
         
-        # 确保应用程序正确退出
-        if app:
+        # 只退出本次启动的应用程序
+        if app and not already_running:
             app.Quit()
         
         # 验证输出文件是否存在
@@ -424,24 +754,22 @@ def check_server_running(port=80):
 
 
 
-def open_browser_with_urls(local_ip, port=80):
+def open_browser_with_urls(local_ip, port=80, scheme="http"):
     """打开浏览器并显示访问地址"""
+    # 根据端口构建正确的URL，协议默认端口不显示
+    default_port = 443 if scheme == "https" else 80
+    if port == default_port:
+        url = f"{scheme}://localhost/viewer.html"
+    else:
+        url = f"{scheme}://localhost:{port}/viewer.html"
+    
     try:
-        # 根据端口构建正确的URL
-        if port == 80:
-            url = "http://localhost/viewer.html"
-        else:
-            url = f"http://localhost:{port}/viewer.html"
-        
         # 打开浏览器
         webbrowser.open(url)
         
     except Exception as e:
         print(f"无法自动打开浏览器: {e}")
-        if port == 80:
-            print(f"请手动访问: http://localhost/viewer.html")
-        else:
-            print(f"请手动访问: http://localhost:{port}/viewer.html")
+        print(f"请手动访问: {url}")
 
 class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """
@@ -577,6 +905,10 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_clean_duplicates()
         elif self.path == '/api/check-paths':
             self.handle_check_paths()
+        elif self.path == '/api/cancel-job':
+            self.handle_cancel_job()
+        elif self.path == '/api/restore-transfer-log':
+            self.handle_restore_transfer_log()
         elif self.path == '/api/search-and-update-paths':
             self.handle_search_and_update_paths()
         elif self.path == '/api/check-and-fix-paths':
@@ -618,6 +950,10 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_data_file_path()
         elif self.path == '/api/data-file':
             self.handle_data_file()
+        elif self.path.startswith('/api/events'):
+            self.handle_events()
+        elif self.path.startswith('/api/job-status'):
+            self.handle_job_status()
         elif self.path.startswith('/api/check-file-exists'):
             self.handle_check_file_exists()
         elif self.path.startswith('/api/open-html-file'):
@@ -627,16 +963,13 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_data_file()
         elif self.path == '/viewer.html':
             # 重定向到resources目录中的viewer.html
-            self.path = '/resources/viewer.html'
-            super().do_GET()
+            self.handle_static_resource('/resources/viewer.html')
         elif self.path == '/favicon.ico':
             # 重定向到resources目录中的favicon.ico
-            self.path = '/resources/favicon.ico'
-            super().do_GET()
+            self.handle_static_resource('/resources/favicon.ico')
         elif self.path == '/weixin_article_renderer.html':
             # 重定向到resources目录中的weixin_article_renderer.html
-            self.path = '/resources/weixin_article_renderer.html'
-            super().do_GET()
+            self.handle_static_resource('/resources/weixin_article_renderer.html')
         elif self.path.startswith('/') and self.path.endswith('.json'):
             # 处理JSON文件请求，这些文件可能在用户数据目录中
             self.handle_json_file_request()
@@ -665,16 +998,13 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_data_file()
         elif self.path == '/viewer.html':
             # 重定向到resources目录中的viewer.html
-            self.path = '/resources/viewer.html'
-            super().do_HEAD()
+            self.handle_static_resource('/resources/viewer.html')
         elif self.path == '/favicon.ico':
             # 重定向到resources目录中的favicon.ico
-            self.path = '/resources/favicon.ico'
-            super().do_HEAD()
+            self.handle_static_resource('/resources/favicon.ico')
         elif self.path == '/weixin_article_renderer.html':
             # 重定向到resources目录中的weixin_article_renderer.html
-            self.path = '/resources/weixin_article_renderer.html'
-            super().do_HEAD()
+            self.handle_static_resource('/resources/weixin_article_renderer.html')
         elif self.path.startswith('/') and self.path.endswith('.json'):
             # 处理JSON文件请求，这些文件可能在用户数据目录中
             self.handle_json_file_request()
@@ -752,7 +1082,8 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             
             # 统计修复结果
             total_files = len(fixed_data)
-            valid_paths = sum(1 for item in fixed_data if os.path.exists(item.get('最终目标路径', '')))
+            exists_map = self.check_paths_batch(item.get('最终目标路径', '') for item in fixed_data)
+            valid_paths = sum(1 for item in fixed_data if exists_map.get(item.get('最终目标路径', ''), False))
             fixed_paths = sum(1 for item in fixed_data if item.get('路径已修复', False))
             not_found = total_files - valid_paths - fixed_paths
             
@@ -788,21 +1119,99 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_json_response({'success': False, 'message': f'读取JSON文件失败: {str(e)}'})
                 return
             
-            # 只进行路径检查
-            check_result = self.check_file_paths_only(data)
+            # 在后台任务中检查路径，客户端通过 /api/job-status 轮询进度
+            def run_check(job):
+                def on_progress(checked, total):
+                    job['progress'] = {'checked': checked, 'total': total}
+                
+                check_result = self.check_file_paths_only(
+                    data, progress_callback=on_progress, cancel_event=job['cancel_event']
+                )
+                return {
+                    'total_files': check_result['total'],
+                    'valid_paths': check_result['valid'],
+                    'missing_paths': check_result['missing'],
+                    'checked': check_result['checked']
+                }
+            
+            job_id = background_jobs.start_job('check_paths', run_check)
             
             self.send_json_response({
                 'success': True,
-                'message': f'路径检查完成',
-                'total_files': check_result['total'],
-                'valid_paths': check_result['valid'],
-                'missing_paths': check_result['missing'],
-                'checked': check_result['total']
+                'message': '路径检查已开始',
+                'job_id': job_id
             })
             
         except Exception as e:
             self.send_json_response({'success': False, 'message': f'路径检查失败: {str(e)}'})
     
+    def handle_job_status(self):
+        """处理后台任务状态查询请求"""
+        query_params = parse_qs(urlparse(self.path).query)
+        job_id = query_params.get('job_id', [None])[0]
+        
+        job = background_jobs.get_job(job_id) if job_id else None
+        if job is None:
+            self.send_json_response({'success': False, 'message': '任务不存在'})
+            return
+        
+        self.send_json_response({'success': True, **job})
+    
+    def handle_cancel_job(self):
+        """处理取消后台任务的请求"""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            request_data = json.loads(self.rfile.read(content_length).decode('utf-8')) if content_length else {}
+            job_id = request_data.get('job_id')
+            
+            if job_id and background_jobs.cancel_job(job_id):
+                self.send_json_response({'success': True, 'message': '已请求取消任务'})
+            else:
+                self.send_json_response({'success': False, 'message': '任务不存在'})
+        
+        except Exception as e:
+            self.send_json_response({'success': False, 'message': f'取消任务失败: {str(e)}'})
+    
+    def handle_restore_transfer_log(self):
+        """处理根据转移日志恢复文件的请求，恢复在后台任务中执行，通过 /api/job-status 轮询进度"""
+        try:
+            if TransferLogManager is None:
+                self.send_json_response({'success': False, 'message': '转移日志功能不可用'})
+                return
+            
+            content_length = int(self.headers.get('Content-Length', 0))
+            request_data = json.loads(self.rfile.read(content_length).decode('utf-8')) if content_length else {}
+            dry_run = bool(request_data.get('dry_run', True))
+            
+            # 只允许恢复转移日志目录中的日志
+            log_manager = TransferLogManager()
+            log_name = os.path.basename(request_data.get('log_file', ''))
+            log_file = log_manager.log_directory / log_name
+            if not log_name or not log_file.is_file():
+                self.send_json_response({'success': False, 'message': '日志文件不存在'})
+                return
+            
+            def run_restore(job):
+                def on_progress(done, total, detail):
+                    job['progress'] = {'checked': done, 'total': total}
+                
+                result = log_manager.restore_from_log(
+                    str(log_file), dry_run=dry_run,
+                    progress_callback=on_progress, cancel_event=job['cancel_event']
+                )
+                result.pop('restore_details', None)
+                return result
+            
+            job_id = background_jobs.start_job('restore_transfer_log', run_restore)
+            self.send_json_response({
+                'success': True,
+                'message': '恢复已开始',
+                'job_id': job_id
+            })
+        
+        except Exception as e:
+            self.send_json_response({'success': False, 'message': f'恢复失败: {str(e)}'})
+    
     def handle_search_and_update_paths(self):
         """处理搜索和更新文件路径的请求"""
         try:
@@ -832,7 +1241,8 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             
             # 统计更新结果
             total_files = len(updated_data)
-            valid_paths = sum(1 for item in updated_data if os.path.exists(item.get('最终目标路径', '')))
+            exists_map = self.check_paths_batch(item.get('最终目标路径', '') for item in updated_data)
+            valid_paths = sum(1 for item in updated_data if exists_map.get(item.get('最终目标路径', ''), False))
             fixed_paths = sum(1 for item in updated_data if item.get('路径已修复', False))
             not_found = total_files - valid_paths
             
@@ -922,9 +1332,12 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 'last_cleanup': connection_stats['last_cleanup']
             }
             
+            cache = office_pdf_cache
             self.send_json_response({
                 'success': True,
                 'stats': resource_stats,
+                'pdf_cache': cache.get_stats() if cache else None,
+                'pdf_preconversion': dict(pdf_preconversion_queue.stats) if pdf_preconversion_queue else None,
                 'config': CONNECTION_CONFIG
             })
         except Exception as e:
@@ -954,29 +1367,112 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_error(404, "数据文件不存在")
                 return
             
+            # 先记录变更版本再读取文件，客户端订阅推送时从该版本开始补齐，不会漏掉变更
+            result_version = result_change_watcher.version if result_change_watcher else None
+            
             # 读取文件内容
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
+                stat = os.stat(json_file)
+                with open(json_file, 'rb') as f:
                     data = f.read()
             except Exception as e:
                 self.send_error(500, f"读取文件失败: {str(e)}")
                 return
             
-            # 设置响应头
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            # 每次都向服务器验证（no-cache），文件未变化时返回304，不重复传输整个结果文件
+            headers = {
+                'Cache-Control': 'no-cache, must-revalidate',
+                'Access-Control-Allow-Origin': '*'
+            }
+            if result_version is not None:
+                headers['X-Result-Version'] = str(result_version)
+                headers['Access-Control-Expose-Headers'] = 'X-Result-Version'
             
-            # 发送文件内容
-            self.wfile.write(data.encode('utf-8'))
+            self.send_bytes_response(
+                data, 'application/json; charset=utf-8', headers=headers,
+                etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            )
             
         except Exception as e:
             self.send_error(500, f"处理请求失败: {str(e)}")
     
+    def handle_events(self):
+        """处理变更推送请求（Server-Sent Events），只推送新增、修改或删除的记录"""
+        if result_change_watcher is None:
+            self.send_error(503, "变更推送不可用")
+            return
+        
+        # 断线重连时EventSource会带上Last-Event-ID，首次连接使用since参数
+        query_params = parse_qs(urlparse(self.path).query)
+        since = self.headers.get('Last-Event-ID') or query_params.get('since', [None])[0]
+        try:
+            since = int(since) if since is not None else None
+        except ValueError:
+            since = None
+        
+        subscriber = result_change_watcher.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'keep-alive')
+            self.send_header('X-Accel-Buffering', 'no')
+            self.end_headers()
+            self.close_connection = True
+            
+            self.send_sse_event('hello', {'version': result_change_watcher.version})
+            
+            # 补齐客户端错过的变更
+            if since is not None:
+                missed_events = result_change_watcher.get_events_since(since)
+                if missed_events is None:
+                    self.send_sse_event('reset', {'version': result_change_watcher.version})
+                else:
+                    for event in missed_events:
+                        self.send_sse_event('changes', event, event_id=event['version'])
+            
+            keepalive_interval = CONNECTION_CONFIG['event_keepalive_interval']
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive_interval)
+                except queue.Empty:
+                    # 推送连接本身即心跳，客户端无需再轮询 /api/heartbeat
+                    if hasattr(self, 'connection_id'):
+                        with connection_manager.lock:
+                            if self.connection_id in connection_manager.connection_times:
+                                connection_manager.connection_times[self.connection_id] = time.time()
+                    stats = connection_manager.get_stats()
+                    self.send_sse_event('heartbeat', {
+                        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                        'stats': {
+                            'memory_usage_mb': round(connection_stats['memory_usage'], 2),
+                            'file_descriptors': connection_stats['file_descriptors'],
+                            'active_connections': stats['active_connections'],
+                            'total_connections': stats['total_connections']
+                        }
+                    })
+                    continue
+                
+                if event.get('reset'):
+                    self.send_sse_event('reset', {'version': event['version']})
+                else:
+                    self.send_sse_event('changes', event, event_id=event['version'])
+        
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError, socket.timeout):
+            print(f"变更推送连接已断开: {self.client_address[0]}")
+        finally:
+            result_change_watcher.unsubscribe(subscriber)
+    
+    def send_sse_event(self, event_name, data, event_id=None):
+        """发送一条SSE事件"""
+        message = ''
+        if event_id is not None:
+            message += f"id: {event_id}\n"
+        message += f"event: {event_name}\n"
+        message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        self.wfile.write(message.encode('utf-8'))
+        self.wfile.flush()
+    
     def handle_check_file_exists(self):
         """处理检查文件是否存在的请求"""
         try:
@@ -1095,23 +1591,21 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             
             # 读取文件内容
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
+                stat = os.stat(file_path)
+                with open(file_path, 'rb') as f:
                     data = f.read()
             except Exception as e:
                 self.send_error(500, f"读取文件失败: {str(e)}")
                 return
             
-            # 设置响应头
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            # 发送文件内容
-            self.wfile.write(data.encode('utf-8'))
+            self.send_bytes_response(
+                data, 'application/json; charset=utf-8',
+                headers={
+                    'Cache-Control': 'no-cache, must-revalidate',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            )
             
         except Exception as e:
             self.send_error(500, f"处理JSON文件请求失败: {str(e)}")
@@ -1119,10 +1613,14 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def check_and_fix_file_paths(self, data):
         """检查并修复文件路径"""
         fixed_data = []
+        file_index = None
+        
+        # 按目录批量检查路径是否存在
+        exists_map = self.check_paths_batch(item.get('最终目标路径', '') for item in data)
         
         for item in data:
             target_path = item.get('最终目标路径', '')
-            if target_path and os.path.exists(target_path):
+            if target_path and exists_map.get(target_path, False):
                 # 路径存在，无需修复
                 item['路径已修复'] = False
                 fixed_data.append(item)
@@ -1135,8 +1633,10 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 fixed_data.append(item)
                 continue
             
-            # 搜索文件
-            found_path = self.search_file_in_system(file_name)
+            # 搜索文件（首次需要时刷新索引，之后共用）
+            if file_index is None:
+                file_index = self.get_refreshed_file_index()
+            found_path = self.search_file_in_system(file_name, file_index)
             if found_path:
                 item['最终目标路径'] = found_path
                 item['路径已修复'] = True
@@ -1148,36 +1648,71 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         
         return fixed_data
     
-    def check_file_paths_only(self, data):
-        """只检查文件路径是否存在，不进行搜索"""
+    def check_file_paths_only(self, data, progress_callback=None, cancel_event=None):
+        """
+        只检查文件路径是否存在，不进行搜索
+        
+        Args:
+            data: 结果记录列表
+            progress_callback: 进度回调函数 (已检查数, 总数)
+            cancel_event: 取消事件
+        
+        Returns:
+            检查统计，取消时只包含已检查的部分
+        """
         # 过滤掉迁移失败的文件
         valid_data = [item for item in data if '失败' not in (item.get('处理状态', ''))]
         total_files = len(valid_data)
-        valid_count = 0
-        missing_count = 0
         
         print(f"开始检查：验证 {total_files} 个文件的路径...")
         
-        for i, item in enumerate(valid_data):
-            target_path = item.get('最终目标路径', '')
-            file_name = item.get('文件名', '')
-            
-            if not file_name:
-                missing_count += 1
-                continue
-            
-            # 检查路径是否存在
-            if target_path and os.path.exists(target_path):
-                valid_count += 1
-            else:
-                missing_count += 1
-            
-            # 每100个文件打印一次进度
-            if (i + 1) % 100 == 0:
-                print(f"进度: {i + 1}/{total_files} - 路径正常: {valid_count}个, 文件已不在原位置: {missing_count}个")
+        # 没有文件名的记录直接视为缺失，其余按目录批量检查
+        target_paths = [item.get('最终目标路径', '') for item in valid_data if item.get('文件名', '')]
+        no_name_count = total_files - len(target_paths)
+        
+        last_report = [0]
+        
+        def on_progress(checked, total):
+            # 每1000个路径打印一次进度
+            if checked - last_report[0] >= 1000 or checked == total:
+                last_report[0] = checked
+                print(f"进度: {checked}/{total}")
+            if progress_callback:
+                progress_callback(checked + no_name_count, total_files)
+        
+        exists_map = self.check_paths_batch(target_paths, on_progress, cancel_event)
+        
+        checked_paths = [path for path in target_paths if path in exists_map]
+        valid_count = sum(1 for path in checked_paths if exists_map[path])
+        missing_count = no_name_count + len(checked_paths) - valid_count
+        checked_count = no_name_count + len(checked_paths)
         
         print(f"检查完成 - 正常: {valid_count}, 文件已不在原位置: {missing_count}")
-        return {'total': total_files, 'valid': valid_count, 'missing': missing_count}
+        return {'total': total_files, 'valid': valid_count, 'missing': missing_count, 'checked': checked_count}
+    
+    def check_paths_batch(self, paths, progress_callback=None, cancel_event=None):
+        """
+        批量检查路径是否存在，返回 路径 -> 是否存在
+        
+        按父目录分组并行列出目录，避免在网络共享上逐个stat；工具模块不可用时逐个检查。
+        """
+        paths = list(paths)
+        if check_paths_exist is not None:
+            return check_paths_exist(
+                paths,
+                max_workers=CONNECTION_CONFIG['path_check_workers'],
+                progress_callback=progress_callback,
+                cancel_event=cancel_event
+            )
+        
+        exists_map = {}
+        for i, path in enumerate(paths):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            exists_map[path] = bool(path) and os.path.exists(path)
+            if progress_callback:
+                progress_callback(i + 1, len(paths))
+        return exists_map
     
     def search_and_update_file_paths(self, data):
         """搜索并更新文件路径"""
@@ -1190,7 +1725,8 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         
         print(f"开始搜索：为 {total_files} 个文件搜索当前位置...")
         
-        # 第一轮：找出需要搜索的文件
+        # 第一轮：找出需要搜索的文件（按目录批量检查路径是否存在）
+        exists_map = self.check_paths_batch(item.get('最终目标路径', '') for item in valid_data)
         for i, item in enumerate(valid_data):
             target_path = item.get('最终目标路径', '')
             file_name = item.get('文件名', '')
@@ -1199,18 +1735,21 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 continue
             
             # 如果路径不存在，需要搜索
-            if not (target_path and os.path.exists(target_path)):
+            if not (target_path and exists_map.get(target_path, False)):
                 need_search_files.append((i, item))
         
         print(f"需要搜索的文件数: {len(need_search_files)}")
         
+        # 所有文件共用一次遍历建立的文件名索引
+        file_index = self.get_refreshed_file_index() if need_search_files else None
+        
         # 第二轮：搜索文件
         for search_index, (original_index, item) in enumerate(need_search_files):
             file_name = item.get('文件名', '')
             print(f"搜索进度: {search_index + 1}/{len(need_search_files)} - 搜索文件: {file_name}")
             
             # 搜索文件
-            found_path = self.search_file_in_system(file_name)
+            found_path = self.search_file_in_system(file_name, file_index)
             
             if found_path:
                 item['最终目标路径'] = found_path
@@ -1228,122 +1767,32 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         print(f"搜索完成 - 修复: {fixed_count}, 未找到: {not_found_count}")
         return data
     
-    def search_file_in_system(self, file_name):
-        """在系统中搜索文件"""
-        # 首先尝试使用Windows API搜索
-        found_path = self.search_with_windows_api(file_name)
-        if found_path:
-            return found_path
-        
-        # 如果Windows API搜索失败，尝试在C盘用户目录搜索
-        found_path = self.search_c_drive_user_dirs(file_name)
-        if found_path:
-            return found_path
+    def search_file_in_system(self, file_name, file_index=None):
+        """
+        在系统中搜索文件
         
-        # 最后尝试备用搜索方法
-        return self.fallback_search(file_name)
-    
-    def search_with_windows_api(self, file_name):
-        """使用Windows API搜索文件"""
-        try:
-            import subprocess
-            # 使用where命令搜索文件
-            result = subprocess.run(['where', file_name], capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                if lines and lines[0]:
-                    return lines[0]
-        except Exception:
-            pass
-        return None
-    
-    def search_c_drive_user_dirs(self, file_name):
-        """在C盘用户目录搜索文件"""
-        try:
-            # 搜索常见的用户目录
-            search_dirs = [
-                os.path.expanduser("~"),  # 当前用户目录
-                os.path.expanduser("~/Desktop"),  # 桌面
-                os.path.expanduser("~/Documents"),  # 文档
-                os.path.expanduser("~/Downloads"),  # 下载
-                "C:/Users",  # 所有用户目录
-            ]
-            
-            for search_dir in search_dirs:
-                if os.path.exists(search_dir):
-                    found_path = self.search_file_recursive(search_dir, file_name, max_depth=3)
-                    if found_path:
-                        return found_path
-            
-            # 如果上述目录没找到，尝试更广泛的搜索
-            return self.search_c_drive_user_dirs_fallback(file_name)
-            
-        except Exception:
+        基于文件名索引查找，调用方在批量查找前应先刷新一次索引，
+        同一批次的所有查找共用同一份索引，不再逐个遍历磁盘。
+        """
+        if file_index is None:
+            file_index = self.get_refreshed_file_index()
+        if file_index is None:
             return None
+        return file_index.find(file_name)
     
-    def fallback_search(self, file_name):
-        """备用搜索方法"""
-        try:
-            # 在常见目录中搜索
-            common_dirs = [
-                "C:/",
-                "D:/",
-                "E:/",
-                os.path.expanduser("~"),
-            ]
-            
-            for base_dir in common_dirs:
-                if os.path.exists(base_dir):
-                    found_path = self.search_file_recursive(base_dir, file_name, max_depth=2)
-                    if found_path:
-                        return found_path
-        except Exception:
-            pass
-        return None
-    
-    def search_c_drive_user_dirs_fallback(self, file_name):
-        """在C盘用户目录的备用搜索方法"""
-        try:
-            users_dir = "C:/Users"
-            if not os.path.exists(users_dir):
-                return None
-            
-            # 遍历用户目录
-            for user_dir in os.listdir(users_dir):
-                user_path = os.path.join(users_dir, user_dir)
-                if os.path.isdir(user_path):
-                    # 在用户目录的常见子目录中搜索
-                    sub_dirs = ["Desktop", "Documents", "Downloads", "Pictures", "Videos"]
-                    for sub_dir in sub_dirs:
-                        sub_path = os.path.join(user_path, sub_dir)
-                        if os.path.exists(sub_path):
-                            found_path = self.search_file_recursive(sub_path, file_name, max_depth=2)
-                            if found_path:
-                                return found_path
-        except Exception:
-            pass
-        return None
-    
-    def search_file_recursive(self, directory, file_name, max_depth=3):
-        """递归搜索文件"""
+    def get_refreshed_file_index(self):
+        """获取并增量刷新文件名索引，索引不可用时返回None"""
+        if get_file_name_index is None:
+            return None
         try:
-            for root, dirs, files in os.walk(directory):
-                # 检查深度
-                depth = root[len(directory):].count(os.sep)
-                if depth > max_depth:
-                    continue
-                
-                # 在当前目录中搜索文件
-                if file_name in files:
-                    return os.path.join(root, file_name)
-                
-                # 模糊匹配（忽略大小写）
-                for file in files:
-                    if file.lower() == file_name.lower():
-                        return os.path.join(root, file)
-        except Exception:
-            pass
-        return None
+            file_index = get_file_name_index()
+            stats = file_index.refresh()
+            print(f"文件名索引已刷新: 遍历目录 {stats['scanned_dirs']}个, 复用缓存 {stats['reused_dirs']}个, "
+                  f"索引文件 {stats['indexed_files']}个, 耗时 {stats['elapsed_ms']}ms")
+            return file_index
+        except Exception as e:
+            print(f"刷新文件名索引失败: {e}")
+            return None
     
     def handle_local_open_file(self):
         """处理本地访问的文件打开请求 - 直接打开文件"""
@@ -1518,19 +1967,14 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def handle_remote_file_open(self, file_path, file_name, file_ext):
         """处理远程文件打开（局域网访问）"""
         try:
-            # 获取服务器IP地址
-            server_ip = get_local_ip()
-            if not server_ip:
-                server_ip = "localhost"
-            
-            # 构建文件下载URL
+            # 使用相对URL：浏览器按当前页面的协议、主机和端口访问（HTTP和HTTPS共用）
             encoded_path = quote(file_path)
-            download_url = f"http://{server_ip}/api/download-file?path={encoded_path}"
+            download_url = f"/api/download-file?path={encoded_path}"
             
             # 根据文件类型决定处理方式
             if self.should_preview_inline(file_ext):
                 # 支持内联预览的文件，直接返回预览URL
-                preview_url = f"http://{server_ip}/api/download-file?path={encoded_path}"
+                preview_url = download_url
                 self.send_json_response({
                     'success': True,
                     'message': f'文件 "{file_name}" 可以在浏览器中预览',
@@ -1749,13 +2193,200 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     
     def send_json_response(self, data):
         """发送JSON响应"""
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_bytes_response(
+            json.dumps(data, ensure_ascii=False).encode('utf-8'),
+            'application/json; charset=utf-8',
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type'
+            }
+        )
+    
+    def accepts_gzip(self):
+        """客户端是否接受gzip压缩"""
+        return 'gzip' in self.headers.get('Accept-Encoding', '').lower()
+    
+    def is_not_modified(self, etag, mtime=None):
+        """根据If-None-Match / If-Modified-Since判断客户端缓存是否仍然有效"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and mtime is not None:
+            try:
+                from email.utils import parsedate_to_datetime
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+        return False
+    
+    def send_not_modified(self, etag, headers=None):
+        """发送304响应"""
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+    
+    def send_bytes_response(self, body, content_type, status=200, headers=None, etag=None,
+                            compress=True, gzip_body=None):
+        """
+        发送内存中的响应内容，统一处理条件请求、gzip压缩和HEAD请求
+        
+        Args:
+            body: 响应内容（字节）
+            content_type: Content-Type
+            status: 状态码
+            headers: 额外的响应头
+            etag: 实体标签，提供时支持304响应
+            compress: 是否允许gzip压缩
+            gzip_body: 预先压缩好的内容（如静态资源缓存）
+        """
+        headers = headers or {}
+        if etag and status == 200 and self.is_not_modified(etag):
+            self.send_not_modified(etag, headers)
+            return
+        
+        use_gzip = (compress and self.accepts_gzip()
+                    and len(body) >= CONNECTION_CONFIG['gzip_min_size'])
+        if use_gzip:
+            body = gzip_body if gzip_body is not None else gzip.compress(
+                body, compresslevel=CONNECTION_CONFIG['gzip_level'])
+        
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        if compress:
+            self.send_header('Vary', 'Accept-Encoding')
+        if etag:
+            self.send_header('ETag', etag)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+    
+    def handle_static_resource(self, resource_path):
+        """
+        发送静态资源（viewer.html等），内容和gzip结果按文件修改时间缓存在内存中
+        
+        Args:
+            resource_path: 相对于服务器根目录的URL路径，如 /resources/viewer.html
+        """
+        file_path = self.translate_path(resource_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        
+        with STATIC_RESOURCE_CACHE_LOCK:
+            cached = STATIC_RESOURCE_CACHE.get(file_path)
+        if cached is None or cached[0] != stat.st_mtime_ns or cached[1] != stat.st_size:
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            compressed = gzip.compress(raw, compresslevel=CONNECTION_CONFIG['gzip_level'])
+            # 压缩效果不明显的资源（如图片）不压缩
+            if len(compressed) >= len(raw) * 0.9:
+                compressed = None
+            cached = (stat.st_mtime_ns, stat.st_size, raw, compressed)
+            with STATIC_RESOURCE_CACHE_LOCK:
+                STATIC_RESOURCE_CACHE[file_path] = cached
+        
+        _, _, raw, compressed = cached
+        content_type = self.guess_type(file_path)
+        if content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+        
+        # HTML需要及时更新，每次验证；其他资源允许短时间缓存
+        if file_path.endswith('.html'):
+            cache_control = 'no-cache'
+        else:
+            cache_control = f"public, max-age={CONNECTION_CONFIG['static_max_age']}"
+        
+        self.send_bytes_response(
+            raw, content_type,
+            headers={
+                'Cache-Control': cache_control,
+                'Last-Modified': self.date_time_string(int(stat.st_mtime))
+            },
+            etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            compress=compressed is not None,
+            gzip_body=compressed
+        )
+    
+    def send_file_response(self, file_path, file_name, disposition='inline', max_age=3600):
+        """
+        流式发送文件，统一处理条件请求（304）、单段Range请求（206/416）和HEAD请求
+        
+        Args:
+            file_path: 文件路径
+            file_name: 响应中使用的文件名
+            disposition: inline（预览）或attachment（下载）
+            max_age: 缓存时间（秒）
+        """
+        stat = os.stat(file_path)
+        file_size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{file_size:x}"'
+        cache_headers = {'Cache-Control': f'public, max-age={max_age}'}
+        
+        if self.is_not_modified(etag, stat.st_mtime):
+            self.send_not_modified(etag, cache_headers)
+            return
+        
+        status = 200
+        start, end = 0, file_size - 1
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        # If-Range与当前文件不一致时忽略Range，返回完整文件
+        if range_header and (not if_range or if_range.strip() == etag):
+            byte_range = parse_range_header(range_header, file_size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{file_size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range:
+                status = 206
+                start, end = byte_range
+        
+        content_length = max(0, end - start + 1)
+        quoted_name = urllib.parse.quote(file_name)
+        
+        self.send_response(status)
+        self.send_header('Content-Type', self.get_mime_type(file_name))
+        self.send_header('Content-Disposition', f'{disposition}; filename="{quoted_name}"; filename*=UTF-8\'\'{quoted_name}')
+        self.send_header('Content-Length', str(content_length))
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{file_size}')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(int(stat.st_mtime)))
+        self.send_header('Cache-Control', cache_headers['Cache-Control'])
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        # 添加X-Content-Type-Options防止MIME类型嗅探
+        self.send_header('X-Content-Type-Options', 'nosniff')
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        
+        if self.command != 'HEAD' and content_length > 0:
+            self.stream_file(file_path, start, content_length)
+    
+    def stream_file(self, file_path, offset, count):
+        """
+        发送文件的指定范围
+        
+        使用socket.sendfile：HTTP传输下由内核零拷贝发送，HTTPS传输下自动退化为分块发送，
+        两种传输方式都不会把整个文件读入内存。
+        """
+        with open(file_path, 'rb') as f:
+            self.wfile.flush()
+            self.connection.sendfile(f, offset=offset, count=count)
     
     def handle_local_download_file(self):
         """处理本地访问的文件下载请求 - 直接下载文件"""
@@ -1773,7 +2404,7 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             file_path = unquote(file_path)
             
             # 处理Windows路径分隔符和空格问题
-            file_path = file_path.replace('/', '\\')
+            file_path = file_path.replace('/', os.sep)
             
             # 调试信息
             print(f"本地访问 - 原始请求路径: {self.path}")
@@ -1850,7 +2481,7 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             file_path = unquote(file_path)
             
             # 处理Windows路径分隔符和空格问题
-            file_path = file_path.replace('/', '\\')
+            file_path = file_path.replace('/', os.sep)
             
             # 调试信息
             print(f"远程访问 - 原始请求路径: {self.path}")
@@ -1952,7 +2583,7 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             file_path = unquote(file_path)
             
             # 处理Windows路径分隔符和空格问题
-            file_path = file_path.replace('/', '\\')
+            file_path = file_path.replace('/', os.sep)
             
             # 调试信息
             print(f"原始请求路径: {self.path}")
@@ -2068,7 +2699,6 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     
     def handle_inline_preview(self, file_path, file_name, file_size):
         """处理内联预览文件"""
-        mime_type = self.get_mime_type(file_name)
         file_ext = os.path.splitext(file_name)[1].lower()
         
         # 对于PDF文件，优化处理
@@ -2076,146 +2706,29 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.handle_pdf_preview(file_path, file_name, file_size)
             return
         
-        # 其他文件类型保持原有处理方式
-        safe_filename = f"file{file_ext}" if file_ext else "file"
-        
-        # 设置响应头 - 强制浏览器预览而不是下载
-        self.send_response(200)
-        self.send_header('Content-Type', mime_type)
         # 关键：使用inline强制浏览器预览，不使用attachment
-        self.send_header('Content-Disposition', f'inline; filename="{safe_filename}"; filename*=UTF-8\'\'{urllib.parse.quote(safe_filename)}')
-        self.send_header('Content-Length', str(file_size))
-        self.send_header('Access-Control-Allow-Origin', '*')
-        # 添加缓存控制，提高加载速度
-        self.send_header('Cache-Control', 'public, max-age=3600, immutable')  # 缓存1小时，不可变
-        self.send_header('ETag', f'"{hashlib.md5(f"{file_path}_{file_size}".encode()).hexdigest()}"')
-        # 添加X-Content-Type-Options防止MIME类型嗅探
-        self.send_header('X-Content-Type-Options', 'nosniff')
-        self.end_headers()
-        
-        # 分块读取和发送，提高大文件传输性能
-        chunk_size = 1024 * 1024  # 1MB chunks
-        with open(file_path, 'rb') as f:
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                self.wfile.write(chunk)
-                self.wfile.flush()  # 立即发送数据
+        self.send_file_response(file_path, file_name, disposition='inline', max_age=3600)
     
     def handle_pdf_preview(self, file_path, file_name, file_size):
-        """专门处理PDF文件预览，优化性能"""
+        """专门处理PDF文件预览，支持Range请求，浏览器PDF阅读器可以按需加载页面"""
         try:
-            # 检查是否支持Range请求（用于大文件分块传输）
-            range_header = self.headers.get('Range')
-            
-            if range_header:
-                # 处理Range请求，支持断点续传
-                self.handle_pdf_range_request(file_path, file_name, file_size, range_header)
-            else:
-                # 完整文件请求 - 强制浏览器预览而不是下载
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/pdf')
-                # 关键：使用inline强制浏览器预览，不使用attachment
-                self.send_header('Content-Disposition', f'inline; filename="{file_name}"; filename*=UTF-8\'\'{urllib.parse.quote(file_name)}')
-                self.send_header('Content-Length', str(file_size))
-                self.send_header('Accept-Ranges', 'bytes')  # 支持Range请求
-                self.send_header('Access-Control-Allow-Origin', '*')
-                # 添加更多缓存控制，提高加载速度
-                self.send_header('Cache-Control', 'public, max-age=7200, immutable')  # 缓存2小时，不可变
-                self.send_header('ETag', f'"{hashlib.md5(f"{file_path}_{file_size}".encode()).hexdigest()}"')
-                # 添加X-Content-Type-Options防止MIME类型嗅探
-                self.send_header('X-Content-Type-Options', 'nosniff')
-                self.end_headers()
-                
-                # 分块读取和发送，避免内存占用过大
-                chunk_size = 1024 * 1024  # 1MB chunks
-                with open(file_path, 'rb') as f:
-                    while True:
-                        chunk = f.read(chunk_size)
-                        if not chunk:
-                            break
-                        self.wfile.write(chunk)
-                        self.wfile.flush()  # 立即发送数据
-                        
-        except Exception as e:
-            print(f"PDF预览处理失败: {e}")
-            # 降级到普通文件处理
-            self.handle_file_download(file_path, file_name, file_size)
+            self.send_file_response(file_path, file_name, disposition='inline', max_age=7200)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            # 浏览器取消了请求（例如切换到Range加载），无需处理
+            pass
     
     def handle_pdf_range_request(self, file_path, file_name, file_size, range_header):
-        """处理PDF文件的Range请求，支持断点续传"""
-        try:
-            # 解析Range头
-            range_str = range_header.replace('bytes=', '')
-            start, end = range_str.split('-')
-            start = int(start) if start else 0
-            end = int(end) if end else file_size - 1
-            
-            # 计算实际范围
-            if end >= file_size:
-                end = file_size - 1
-            content_length = end - start + 1
-            
-            # 发送206 Partial Content响应
-            self.send_response(206)
-            self.send_header('Content-Type', 'application/pdf')
-            self.send_header('Content-Disposition', f'inline; filename="{file_name}"')
-            self.send_header('Content-Length', str(content_length))
-            self.send_header('Content-Range', f'bytes {start}-{end}/{file_size}')
-            self.send_header('Accept-Ranges', 'bytes')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Cache-Control', 'public, max-age=7200')
-            self.end_headers()
-            
-            # 发送指定范围的数据
-            with open(file_path, 'rb') as f:
-                f.seek(start)
-                remaining = content_length
-                chunk_size = 1024 * 1024  # 1MB chunks
-                
-                while remaining > 0:
-                    read_size = min(chunk_size, remaining)
-                    chunk = f.read(read_size)
-                    if not chunk:
-                        break
-                    self.wfile.write(chunk)
-                    self.wfile.flush()
-                    remaining -= len(chunk)
-                    
-        except Exception as e:
-            print(f"PDF Range请求处理失败: {e}")
-            # 降级到完整文件响应
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/pdf')
-            self.send_header('Content-Disposition', f'inline; filename="{file_name}"')
-            self.send_header('Content-Length', str(file_size))
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            with open(file_path, 'rb') as f:
-                self.wfile.write(f.read())
+        """处理PDF文件的Range请求，支持断点续传（兼容旧调用，Range由send_file_response统一处理）"""
+        self.send_file_response(file_path, file_name, disposition='inline', max_age=7200)
     
     def handle_file_download(self, file_path, file_name, file_size):
         """处理文件下载"""
         try:
-            mime_type = self.get_mime_type(file_name)
-            
-            # 对文件名进行URL编码，避免编码错误
-            safe_filename = urllib.parse.quote(file_name)
-            
-            # 设置响应头 - 强制下载文件
-            self.send_response(200)
-            self.send_header('Content-Type', mime_type)
-            self.send_header('Content-Disposition', f'attachment; filename="{safe_filename}"; filename*=UTF-8\'\'{safe_filename}')
-            self.send_header('Content-Length', str(file_size))
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            # 强制下载文件，支持断点续传
+            self.send_file_response(file_path, file_name, disposition='attachment', max_age=0)
             
-            # 直接发送文件内容
-            with open(file_path, 'rb') as f:
-                self.wfile.write(f.read())
-                
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            print(f"下载连接已断开: {file_name}")
         except Exception as e:
             print(f"文件下载失败: {e}")
             # 使用简单的错误信息，避免编码问题
@@ -2277,14 +2790,18 @@ class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
 
-def start_local_server(port=80, bind_address="0.0.0.0"):
+def start_local_server(port=80, bind_address="0.0.0.0", ssl_context=None):
     """
-    启动本地HTTP服务器
+    启动本地查看器服务器
+    
+    HTTP和HTTPS使用同一个服务器引擎和请求处理器，只是传输方式不同。
     
     Args:
         port (int): 服务器端口号，默认80（隐藏端口）
         bind_address (str): 绑定地址，默认0.0.0.0（所有网络接口）
+        ssl_context (ssl.SSLContext): TLS上下文，提供时以HTTPS方式提供服务
     """
+    global result_change_watcher
     try:
         # 确保在正确的目录下启动服务器
         script_dir = Path(__file__).parent
@@ -2310,29 +2827,36 @@ def start_local_server(port=80, bind_address="0.0.0.0"):
         # JSON文件路径使用app_paths
         json_file = app_paths.ai_results_file
         
-        # 创建HTTP服务器
-        handler = CustomHTTPRequestHandler
-        
-        # 配置服务器参数，提高性能（简化配置，减少不必要的设置）
-        socketserver.TCPServer.allow_reuse_address = True
-        
-        # 尝试启动服务器
-        with socketserver.TCPServer((bind_address, port), handler) as httpd:
-            # 设置连接超时
-            httpd.timeout = CONNECTION_CONFIG['keepalive_timeout']
+        # 尝试启动服务器（多线程，变更推送的长连接不会阻塞其他请求）
+        with create_viewer_server(bind_address, port, ssl_context) as httpd:
+            scheme = httpd.scheme
+            default_port = 443 if scheme == 'https' else 80
             
             # 启动连接管理器监控
             print("启动连接管理器...")
             connection_manager.start_monitoring()
+            
+            # 启动结果文件变更监视，为 /api/events 提供增量推送
+            if ResultChangeWatcher is not None and result_change_watcher is None:
+                result_change_watcher = ResultChangeWatcher(
+                    str(json_file),
+                    poll_interval=CONNECTION_CONFIG['result_poll_interval']
+                )
+                result_change_watcher.start()
+            
+            # 可选：后台预转换最近分类的Office文件，远程首次打开时无需等待转换
+            if CONNECTION_CONFIG['preconvert_office_files'] and pdf_preconversion_queue is None:
+                start_pdf_preconversion(json_file)
             # 获取本机IP地址
             local_ip = get_local_ip()
             
             # 构建服务器URL
+            port_suffix = "" if port == default_port else f":{port}"
             if bind_address == "0.0.0.0":
-                server_url = f"http://{local_ip}" if port == 80 else f"http://{local_ip}:{port}"
-                localhost_url = f"http://localhost" if port == 80 else f"http://localhost:{port}"
+                server_url = f"{scheme}://{local_ip}{port_suffix}"
+                localhost_url = f"{scheme}://localhost{port_suffix}"
             else:
-                server_url = f"http://{bind_address}" if port == 80 else f"http://{bind_address}:{port}"
+                server_url = f"{scheme}://{bind_address}{port_suffix}"
                 localhost_url = server_url
             
             # 优先使用新的拆分组件viewer.html，如果不存在则使用viewer.html，最后使用ai_result_viewer.html
@@ -2362,15 +2886,15 @@ def start_local_server(port=80, bind_address="0.0.0.0"):
             print(f"连接配置: 最大连接数={CONNECTION_CONFIG['max_connections']}, 超时={CONNECTION_CONFIG['connection_timeout']}秒")
             
             # 启动服务器后立即打开浏览器
-            open_browser_with_urls(local_ip, port)
+            open_browser_with_urls(local_ip, port, scheme)
             
             # 启动服务器
             httpd.serve_forever()
             
     except OSError as e:
-        if e.errno == 10048:  # 端口被占用
+        if e.errno in (10048, errno.EADDRINUSE):  # 端口被占用
             print(f"错误: 端口 {port} 已被占用，尝试使用端口 {port + 1}")
-            return start_local_server(port + 1, bind_address)
+            return start_local_server(port + 1, bind_address, ssl_context)
         else:
             print(f"启动服务器失败: {e}")
             return False
@@ -2396,6 +2920,8 @@ def main():
             port = int(arg)
         elif arg in ["0.0.0.0", "localhost", "127.0.0.1"]:
             bind_address = arg
+        elif arg == "--preconvert":
+            CONNECTION_CONFIG['preconvert_office_files'] = True
         else:
             print(f"未知参数: {arg}")
     
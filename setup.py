@@ -46,6 +46,10 @@ setup(
     python_requires=">=3.8",
     install_requires=read_requirements(),
     extras_require={
+        # 向量预筛选（可选，未安装时跳过预筛选）
+        "embeddings": [
+            "numpy>=1.24.0",
+        ],
         "dev": [
             "pytest>=6.0",
             "black>=21.0",
@@ -51,7 +51,9 @@ import logging
 import time
 import json
 import os
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+
+from tidyfile.utils.deadline import check_deadline, request_timeout
 
 class AIClientError(Exception):
     """AI客户端异常"""
@@ -59,7 +61,7 @@ class AIClientError(Exception):
 
 class ModelConfig:
     """AI模型配置"""
-    def __init__(self, id: str, name: str, base_url: str, model_name: str, model_type: str, api_key: str, priority: int, enabled: bool = True):
+    def __init__(self, id: str, name: str, base_url: str, model_name: str, model_type: str, api_key: str, priority: int, enabled: bool = True, embedding_model: str = '', image_max_edge: int = 0):
         self.id = id
         self.name = name
         self.base_url = base_url
@@ -68,6 +70,8 @@ class ModelConfig:
         self.api_key = api_key
         self.priority = priority
         self.enabled = enabled
+        self.embedding_model = embedding_model  # 向量化模型名称，为空时该服务不用于向量化
+        self.image_max_edge = image_max_edge  # 图片缩小到的最长边（像素），为0时按模型名称确定
 
 class AIClient:
     """AI客户端基类"""
@@ -88,6 +92,15 @@ class AIClient:
     def test_connection(self) -> Dict[str, Any]:
         """测试连接"""
         raise NotImplementedError
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """计算文本向量，未配置向量化模型的客户端不支持"""
+        raise AIClientError(f"模型 {self.config.name} 未配置向量化模型")
+    
+    def _request_options(self) -> Dict[str, Any]:
+        """OpenAI SDK请求参数：有截止时间时把剩余时间作为请求超时"""
+        timeout = request_timeout()
+        return {'timeout': timeout} if timeout is not None else {}
 
 class OpenAICompatibleClient(AIClient):
     """OpenAI兼容模型客户端（适用于Qwen-Long等）"""
@@ -109,6 +122,7 @@ class OpenAICompatibleClient(AIClient):
         last_error = None
         
         for attempt in range(max_retries):
+            check_deadline()
             try:
                 logging.info(f"尝试使用OpenAI兼容模型 (第{attempt + 1}次)")
                 
@@ -120,7 +134,8 @@ class OpenAICompatibleClient(AIClient):
                 completion = self.client.chat.completions.create(
                     model=self.config.model_name,
                     messages=messages,
-                    **extra_params
+                    **extra_params,
+                    **self._request_options()
                 )
                 
                 if completion.choices and len(completion.choices) > 0:
@@ -144,6 +159,14 @@ class OpenAICompatibleClient(AIClient):
         logging.error(error_msg)
         raise AIClientError(error_msg)
     
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """通过 /embeddings 接口计算文本向量"""
+        if not self.config.embedding_model:
+            return super().embed(texts)
+        response = self.client.embeddings.create(model=self.config.embedding_model, input=texts,
+                                                 **self._request_options())
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
     def test_connection(self) -> Dict[str, Any]:
         """测试连接"""
         result = {'success': False, 'error': None, 'response_time': None}
@@ -214,6 +237,7 @@ class OllamaClient(AIClient):
         last_error = None
         
         for attempt in range(max_retries):
+            check_deadline()
             try:
                 logging.info(f"尝试使用Ollama模型 (第{attempt + 1}次)")
                 
@@ -231,7 +255,7 @@ class OllamaClient(AIClient):
                 response = requests.post(
                     f"{self.config.base_url}/api/chat",
                     json=payload,
-                    timeout=30
+                    timeout=request_timeout(30)
                 )
                 
                 if response.status_code != 200:
@@ -267,6 +291,23 @@ class OllamaClient(AIClient):
         logging.error(error_msg)
         raise AIClientError(error_msg)
     
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """通过Ollama的 /api/embed 接口计算文本向量"""
+        if not self.config.embedding_model:
+            return super().embed(texts)
+        import requests
+        response = requests.post(
+            f"{self.config.base_url}/api/embed",
+            json={"model": self.config.embedding_model, "input": texts},
+            timeout=request_timeout(60)
+        )
+        if response.status_code != 200:
+            raise AIClientError(f"向量化请求失败，状态码: {response.status_code}, 响应: {response.text}")
+        embeddings = response.json().get('embeddings')
+        if not embeddings or len(embeddings) != len(texts):
+            raise AIClientError("Ollama向量化返回无效响应格式")
+        return embeddings
+    
     def test_connection(self) -> Dict[str, Any]:
         """测试连接"""
         result = {'success': False, 'error': None, 'response_time': None}
@@ -329,6 +370,7 @@ class LMStudioClient(AIClient):
         last_error = None
         
         for attempt in range(max_retries):
+            check_deadline()
             try:
                 logging.info(f"尝试使用LM Studio模型 (第{attempt + 1}次)")
                 
@@ -336,7 +378,8 @@ class LMStudioClient(AIClient):
                     model=self.config.model_name,
                     messages=messages,
                     max_tokens=2048,
-                    temperature=0.7
+                    temperature=0.7,
+                    **self._request_options()
                 )
                 
                 if completion.choices and len(completion.choices) > 0:
@@ -360,6 +403,14 @@ class LMStudioClient(AIClient):
         logging.error(error_msg)
         raise AIClientError(error_msg)
     
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """通过 /embeddings 接口计算文本向量"""
+        if not self.config.embedding_model:
+            return super().embed(texts)
+        response = self.client.embeddings.create(model=self.config.embedding_model, input=texts,
+                                                 **self._request_options())
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
     def test_connection(self) -> Dict[str, Any]:
         """测试连接"""
         result = {'success': False, 'error': None, 'response_time': None}
@@ -450,7 +501,9 @@ class AIClientManager:
                         model_type=model_type,
                         api_key=model_data.get('api_key', ''),
                         priority=model_data.get('priority', 1),
-                        enabled=model_data.get('enabled', True)
+                        enabled=model_data.get('enabled', True),
+                        embedding_model=model_data.get('embedding_model', ''),
+                        image_max_edge=int(model_data.get('image_max_edge', 0) or 0)
                     )
                     self.models.append(model)
                 
@@ -485,7 +538,9 @@ class AIClientManager:
                         'model_type': model.model_type,
                         'api_key': model.api_key,
                         'priority': model.priority,
-                        'enabled': model.enabled
+                        'enabled': model.enabled,
+                        'embedding_model': model.embedding_model,
+                        'image_max_edge': model.image_max_edge
                     }
                     for model in self.models
                 ]
@@ -987,7 +1042,9 @@ class AIClientManager:
                                     model_type=model.model_type,
                                     api_key=model.api_key,
                                     priority=model.priority,
-                                    enabled=model.enabled
+                                    enabled=model.enabled,
+                                    embedding_model=model.embedding_model,
+                                    image_max_edge=model.image_max_edge
                                 )
                                 return LMStudioClient(matched_model)
                 except Exception as e:
@@ -1015,7 +1072,9 @@ class AIClientManager:
                                     model_type=model.model_type,
                                     api_key=model.api_key,
                                     priority=model.priority,
-                                    enabled=model.enabled
+                                    enabled=model.enabled,
+                                    embedding_model=model.embedding_model,
+                                    image_max_edge=model.image_max_edge
                                 )
                                 return OllamaClient(matched_model)
                 except Exception as e:
@@ -1044,6 +1103,7 @@ class AIClientManager:
             if model.id not in self.clients:
                 logging.warning(f"客户端未初始化，跳过: {model.name}")
                 continue
+            check_deadline()
             
             try:
                 logging.info(f"尝试使用模型: {model.name} (优先级: {model.priority})")
@@ -1060,6 +1120,53 @@ class AIClientManager:
         logging.error(error_msg)
         raise AIClientError(error_msg)
     
+    def get_embedding_model_key(self) -> Optional[str]:
+        """优先级最高的可用向量化模型标识（服务ID:模型名），没有配置时返回None"""
+        for model in sorted((m for m in self.models if m.enabled and m.embedding_model), key=lambda x: x.priority):
+            if model.id in self.clients:
+                return f"{model.id}:{model.embedding_model}"
+        return None
+    
+    def get_image_model_config(self, model_name: Optional[str] = None) -> Optional[ModelConfig]:
+        """
+        获取处理图片的模型配置
+        
+        Args:
+            model_name: 模型名称，None时返回优先级最高的可用模型
+        
+        Returns:
+            模型配置，没有匹配的模型时返回None
+        """
+        enabled_models = sorted((m for m in self.models if m.enabled), key=lambda x: x.priority)
+        if model_name:
+            for model in enabled_models:
+                if model.model_name.lower() == model_name.lower():
+                    return model
+            return None
+        for model in enabled_models:
+            if model.id in self.clients:
+                return model
+        return None
+    
+    def embed_with_priority(self, texts: List[str]) -> Tuple[str, List[List[float]]]:
+        """
+        按优先级计算文本向量，失败时尝试下一个配置了向量化模型的服务
+        
+        Returns:
+            (向量化模型标识, 向量列表)，不同模型的向量不能混用
+        """
+        last_error = None
+        for model in sorted((m for m in self.models if m.enabled and m.embedding_model), key=lambda x: x.priority):
+            client = self.clients.get(model.id)
+            if client is None:
+                continue
+            try:
+                return f"{model.id}:{model.embedding_model}", client.embed(texts)
+            except Exception as e:
+                last_error = e
+                logging.warning(f"模型 {model.name} 向量化失败: {e}")
+        raise AIClientError(f"没有可用的向量化模型，最后错误: {last_error}")
+    
     def test_all_connections(self) -> Dict[str, Dict[str, Any]]:
         """测试所有模型连接"""
         results = {}
@@ -1213,6 +1320,11 @@ def chat_with_ai(messages: List[Dict], max_retries_per_model: int = 3) -> str:
     manager = get_ai_manager()
     return manager.chat_with_priority(messages, max_retries_per_model)
 
+def embed_texts(texts: List[str]) -> Tuple[str, List[List[float]]]:
+    """计算文本向量的统一接口，返回(向量化模型标识, 向量列表)"""
+    manager = get_ai_manager()
+    return manager.embed_with_priority(texts)
+
 def test_ai_connections() -> Dict[str, Dict[str, Any]]:
     """测试所有AI连接"""
     manager = get_ai_manager()
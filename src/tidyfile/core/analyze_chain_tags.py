@@ -35,8 +35,8 @@ import json
 import os
 import sys
 import argparse
-from collections import defaultdict, Counter
-from typing import Dict, List, Any, Set
+from typing import Dict, List, Any
+from tidyfile.core.chain_tag_trie import ChainTagTrie
 
 class ChainTagsAnalyzer:
     """链式标签分析器"""
@@ -95,40 +95,17 @@ class ChainTagsAnalyzer:
     
     def analyze_chain_tags(self, chain_tags: List[str]) -> Dict[str, Any]:
         """分析链式标签的层级结构"""
-        # 各级别的标签集合
-        level_tags: Dict[int, Set[str]] = defaultdict(set)
-        # 各级别的标签计数
-        level_counts: Dict[int, int] = defaultdict(int)
-        # 各级别的具体标签列表
-        level_tag_lists: Dict[int, List[str]] = defaultdict(list)
-        
-        total_records = len(chain_tags)
-        valid_records = 0
-        
-        for chain_tag in chain_tags:
-            if not chain_tag or not isinstance(chain_tag, str):
-                continue
-            
-            valid_records += 1
-            
-            # 按"/"分割标签
-            parts = [part.strip() for part in chain_tag.split('/') if part.strip()]
-            
-            # 统计每个级别的标签
-            for level, tag in enumerate(parts, 1):
-                level_tags[level].add(tag)
-                level_tag_lists[level].append(tag)
-        
-        # 计算各级别的去重数量
-        for level in sorted(level_tags.keys()):
-            level_counts[level] = len(level_tags[level])
+        valid_tags = [chain_tag for chain_tag in chain_tags if chain_tag and isinstance(chain_tag, str)]
+        tag_trie = ChainTagTrie(valid_tags)
+        level_usage = tag_trie.level_counts()
         
         return {
-            'total_records': total_records,
-            'valid_records': valid_records,
-            'level_counts': dict(level_counts),
-            'level_tags': {level: sorted(tags) for level, tags in level_tags.items()},
-            'level_tag_lists': dict(level_tag_lists)
+            'total_records': len(chain_tags),
+            'valid_records': len(valid_tags),
+            'level_counts': {level: len(counter) for level, counter in level_usage.items()},
+            'level_tags': {level: sorted(counter) for level, counter in level_usage.items()},
+            'level_usage': level_usage,
+            'tag_trie': tag_trie
         }
     
     def show_sample_data(self, data: List[Dict[str, Any]], count: int = 5):
@@ -249,14 +226,12 @@ class ChainTagsAnalyzer:
                     print(f"  {i:2d}. {tag}")
         
         # 显示标签使用频率
-        if verbose and analysis['level_tag_lists']:
+        if verbose and analysis['level_usage']:
             print(f"\n各级别标签使用频率（前10个）:")
             print("-" * 40)
             
-            for level in sorted(analysis['level_tag_lists'].keys()):
-                tag_list = analysis['level_tag_lists'][level]
-                counter = Counter(tag_list)
-                most_common = counter.most_common(10)
+            for level in sorted(analysis['level_usage'].keys()):
+                most_common = analysis['level_usage'][level].most_common(10)
                 
                 print(f"\n{level}级标签使用频率:")
                 for tag, count in most_common:
@@ -21,6 +21,7 @@
     --remove-failed           删除"最匹配的目标目录"为"分类失败"的记录
     --remove-empty-summary    删除"文件摘要"为"文件内容为空或过短"的记录
     --smart-tags              智能标签功能：使用AI推荐三级标签并追加到链式标签
+    --per-level               智能标签时每级标签单独调用一次AI（默认一次调用推荐完整标签链）
 
 使用示例:
     # 基础功能
@@ -76,8 +77,18 @@ import argparse
 import re
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Set, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple
 from tidyfile.ai.client_manager import chat_with_ai
+from tidyfile.core.chain_tag_trie import ChainTagTrie
+from tidyfile.core.embedding_index import preselect_candidates
+from tidyfile.core.hierarchical_choice import (
+    prune_candidate_paths, render_candidate_tree, parse_path_response, validate_path
+)
+
+# 每级标签经向量预筛选后交给AI的候选数
+TAG_PRESELECT_TOP_K = 30
+# 逐层推荐的最大标签层数
+HIERARCHICAL_MAX_LEVEL = 3
 
 class ChainTagsBatchProcessor:
     """批量添加链式标签处理器"""
@@ -97,6 +108,8 @@ class ChainTagsBatchProcessor:
         
         self.result_file = result_file
         self.backup_file_path = f"{result_file}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # 智能标签时先尝试一次调用推荐完整标签链，失败时再逐层推荐
+        self.one_shot_tagging = True
         
     def backup_file(self) -> bool:
         """备份原文件"""
@@ -1093,71 +1106,147 @@ class ChainTagsBatchProcessor:
         
         return chain_tags
     
+    def build_tag_trie(self, data: List[Dict[str, Any]]) -> ChainTagTrie:
+        """从记录的链式标签构建前缀树（含各标签使用次数）"""
+        return ChainTagTrie.from_records(data)
+    
     def extract_existing_tags(self, data: List[Dict[str, Any]]) -> Dict[int, Set[str]]:
         """提取现有的各级别标签"""
-        level_tags: Dict[int, Set[str]] = {1: set(), 2: set(), 3: set(), 4: set(), 5: set()}
-        
-        for item in data:
-            if "标签" in item and isinstance(item["标签"], dict):
-                if "链式标签" in item["标签"]:
-                    chain_tag = item["标签"]["链式标签"]
-                    if chain_tag and isinstance(chain_tag, str):
-                        parts = [part.strip() for part in chain_tag.split('/') if part.strip()]
-                        for level, tag in enumerate(parts, 1):
-                            if level <= 5:  # 只统计前5级
-                                level_tags[level].add(tag)
-        
-        return level_tags
+        return self.build_tag_trie(data).level_tags()
     
     def extract_tags_from_chain_tags_list(self, chain_tags_list: List[str]) -> Dict[int, Set[str]]:
         """从链式标签列表中提取各级别标签"""
-        level_tags: Dict[int, Set[str]] = {1: set(), 2: set(), 3: set(), 4: set(), 5: set()}
-        
-        for chain_tag in chain_tags_list:
-            if chain_tag and isinstance(chain_tag, str):
-                parts = [part.strip() for part in chain_tag.split('/') if part.strip()]
-                for level, tag in enumerate(parts, 1):
-                    if level <= 5:  # 只统计前5级
-                        level_tags[level].add(tag)
-        
-        return level_tags
+        return self._get_tag_trie(chain_tags_list).level_tags()
     
     def get_sub_tags(self, chain_tags_list: List[str], parent_tags: List[str]) -> List[str]:
         """获取指定父标签下的子标签列表"""
-        sub_tags = set()
+        return self._get_tag_trie(chain_tags_list).get_children(parent_tags)
+    
+    def _get_tag_trie(self, chain_tags_list) -> ChainTagTrie:
+        """获取链式标签列表对应的前缀树，同一个列表只构建一次"""
+        if isinstance(chain_tags_list, ChainTagTrie):
+            return chain_tags_list
+        cached = getattr(self, '_tag_trie_cache', None)
+        if cached is None or cached[0] is not chain_tags_list or cached[1] != len(chain_tags_list):
+            cached = (chain_tags_list, len(chain_tags_list), ChainTagTrie(chain_tags_list))
+            self._tag_trie_cache = cached
+        return cached[2]
+    
+    def _preselect_tags(self, file_name: str, summary: str, parent_path: List[str], candidates: List[str]) -> Tuple[List[str], str]:
+        """
+        用向量相似度预筛选候选标签（向量化不可用时原样返回）
         
-        for chain_tag in chain_tags_list:
-            if chain_tag and isinstance(chain_tag, str):
-                parts = [part.strip() for part in chain_tag.split('/') if part.strip()]
-                
-                # 检查是否匹配父标签路径
-                if len(parts) >= len(parent_tags):
-                    match = True
-                    for i, parent_tag in enumerate(parent_tags):
-                        if i >= len(parts) or parts[i] != parent_tag:
-                            match = False
-                            break
-                    
-                    if match and len(parts) > len(parent_tags):
-                        # 添加下一级标签
-                        sub_tags.add(parts[len(parent_tags)])
+        Returns:
+            (交给AI的候选标签, 相似度足够高时直接采用的标签，否则为空字符串)
+        """
+        query = f"{file_name}\n{summary[:300] if summary else ''}"
+        candidate_texts = ["/".join(parent_path + [tag]) for tag in candidates]
+        selected, confident_tag, score = preselect_candidates(query, candidates, candidate_texts, top_k=TAG_PRESELECT_TOP_K)
+        if confident_tag:
+            print(f"    [AI推荐] 向量匹配度高 ({score:.2f})，跳过AI调用: {confident_tag}")
+        elif len(selected) < len(candidates):
+            print(f"    [AI推荐] 向量预筛选: {len(candidates)} -> {len(selected)} 个候选")
+        return selected, confident_tag or ""
+    
+    def get_ai_recommendation_hierarchical(self, file_name: str, summary: str, target_path: str, chain_tags_list) -> str:
+        """
+        使用AI推荐链式标签：先一次调用推荐完整标签链，返回无效时再逐层推荐
         
-        return sorted(list(sub_tags))
+        Args:
+            chain_tags_list: 链式标签列表或已构建的ChainTagTrie
+        """
+        print(f"    [AI推荐] 开始为文件 '{file_name}' 推荐标签...")
+        tag_trie = self._get_tag_trie(chain_tags_list)
+        
+        if self.one_shot_tagging:
+            chain_tag = self._recommend_tags_one_shot(file_name, summary, target_path, tag_trie)
+            if chain_tag is not None:
+                return chain_tag
+            print("    [AI推荐] 一次推荐返回无效，改为逐层推荐")
+        
+        return self._recommend_tags_per_level(file_name, summary, target_path, tag_trie)
     
-    def get_ai_recommendation_hierarchical(self, file_name: str, summary: str, target_path: str, chain_tags_list: List[str]) -> str:
-        """使用AI逐层推荐标签（参考smart_file_classifier.py的方法）"""
+    def _recommend_tags_one_shot(self, file_name: str, summary: str, target_path: str, tag_trie: ChainTagTrie) -> Optional[str]:
+        """
+        一次调用推荐完整标签链：把裁剪后的标签子树交给AI，要求以JSON返回标签路径
+        
+        Returns:
+            推荐的链式标签（AI认为没有合适标签时为空字符串），返回无效时为None
+        """
         try:
-            print(f"    [AI推荐] 开始为文件 '{file_name}' 推荐标签...")
+            query = f"{file_name}\n{summary[:300] if summary else ''}"
+            candidate_paths = prune_candidate_paths(tag_trie, query, HIERARCHICAL_MAX_LEVEL)
+            if not candidate_paths:
+                print("    [AI推荐] 错误：没有找到一级标签")
+                return ""
+            
+            print(f"    [AI推荐] 一次推荐，候选标签路径数量: {len(candidate_paths)}")
+            
+            prompt = f"""不需要思考，直接输出。
+
+你是一个专业的文件分类专家。请根据文件信息，从下面的标签树中选择一条最合适的标签路径。
+
+文件信息：
+- 文件名/文章标题：{file_name}
+- 文件摘要/文章摘要：{summary[:300] if summary else '无摘要'}
+- 最终目标路径：{target_path}
+
+标签树（每行一个标签，缩进表示层级）：
+{render_candidate_tree(candidate_paths)}
+
+要求：
+1. 路径必须从一级标签开始，沿标签树逐级向下，最多{HIERARCHICAL_MAX_LEVEL}级
+2. 每一级都必须严格使用标签树中的名称，不要添加任何序号、标点或额外字符
+3. 标签必须与文件内容高度相关，下级标签都不合适时可以只选到上一级
+4. 如果所有标签都与文件内容不相关，返回 {{"path": []}}
+
+只返回JSON，格式如下：
+{{"path": ["一级标签", "二级标签", "三级标签"]}}
+
+/no_think"""
+            
+            messages = [
+                {
+                    'role': 'system',
+                    'content': '你是一个专业的文件分类专家。专注于业务分类，推荐与文件内容最相关的标签路径。只输出JSON，不要包含任何思考过程或解释。'
+                },
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ]
+            
+            response = chat_with_ai(messages)
+            path = parse_path_response(self.clean_ai_response(response))
+            if path is None:
+                return None
+            if not path:
+                print("    [AI推荐] 没有与文件内容相关的标签")
+                return ""
+            if not validate_path(tag_trie, path, HIERARCHICAL_MAX_LEVEL):
+                print(f"    [AI推荐] 推荐的标签路径不存在: '{'/'.join(path)}'")
+                return None
             
+            final_chain = "/".join(path)
+            print(f"    [AI推荐] 最终推荐标签链: {final_chain}")
+            return final_chain
+        
+        except Exception as e:
+            print(f"    [AI推荐] 一次推荐失败: {e}")
+            return None
+    
+    def _recommend_tags_per_level(self, file_name: str, summary: str, target_path: str, tag_trie: ChainTagTrie) -> str:
+        """使用AI逐层推荐标签（参考smart_file_classifier.py的方法），每级调用一次AI"""
+        try:
             # 获取一级标签列表
-            level1_tags = self.extract_tags_from_chain_tags_list(chain_tags_list)[1]
-            level1_tags_list = sorted(list(level1_tags))
+            level1_tags_list = tag_trie.get_children()
             
             if not level1_tags_list:
                 print(f"    [AI推荐] 错误：没有找到一级标签")
                 return ""
             
             print(f"    [AI推荐] 一级标签候选数量: {len(level1_tags_list)}")
+            level1_candidates, confident_tag = self._preselect_tags(file_name, summary, [], level1_tags_list)
             
             # 第一步：推荐一级标签
             level1_prompt = f"""不需要思考，直接输出。
@@ -1170,7 +1259,7 @@ class ChainTagsBatchProcessor:
 - 最终目标路径：{target_path}
 
 现有一级标签（必须严格从以下列表中选择，不要添加任何序号、标点或额外字符）：
-{chr(10).join(level1_tags_list[:50])}{'...' if len(level1_tags_list) > 50 else ''}
+{chr(10).join(level1_candidates[:50])}{'...' if len(level1_candidates) > 50 else ''}
 
 要求：
 1. 只能从上述列表中选择一个标签
@@ -1195,23 +1284,27 @@ class ChainTagsBatchProcessor:
                 }
             ]
             
-            response = chat_with_ai(messages)
-            level1_tag = self.clean_ai_response(response).strip()
+            if confident_tag:
+                level1_tag = confident_tag
+            else:
+                response = chat_with_ai(messages)
+                level1_tag = self.clean_ai_response(response).strip()
             
-            if not level1_tag or level1_tag == "无匹配" or level1_tag not in level1_tags:
+            if not level1_tag or level1_tag == "无匹配" or level1_tag not in level1_tags_list:
                 print(f"    [AI推荐] 一级标签推荐失败或无效: '{level1_tag}'")
                 return ""
             
             print(f"    [AI推荐] 一级标签推荐成功: {level1_tag}")
             
             # 第二步：获取该一级标签下的二级标签
-            level2_tags_list = self.get_sub_tags(chain_tags_list, [level1_tag])
+            level2_tags_list = tag_trie.get_children([level1_tag])
             
             if not level2_tags_list:
                 print(f"    [AI推荐] 一级标签 '{level1_tag}' 下没有二级标签")
                 return level1_tag
             
             print(f"    [AI推荐] 二级标签候选数量: {len(level2_tags_list)}")
+            level2_candidates, confident_tag = self._preselect_tags(file_name, summary, [level1_tag], level2_tags_list)
             
             # 推荐二级标签
             level2_prompt = f"""不需要思考，直接输出。
@@ -1225,7 +1318,7 @@ class ChainTagsBatchProcessor:
 - 已选择的一级标签：{level1_tag}
 
 现有二级标签（必须严格从以下列表中选择，不要添加任何序号、标点或额外字符）：
-{chr(10).join(level2_tags_list[:50])}{'...' if len(level2_tags_list) > 50 else ''}
+{chr(10).join(level2_candidates[:50])}{'...' if len(level2_candidates) > 50 else ''}
 
 要求：
 1. 只能从上述列表中选择一个标签
@@ -1250,8 +1343,11 @@ class ChainTagsBatchProcessor:
                 }
             ]
             
-            response = chat_with_ai(messages)
-            level2_tag = self.clean_ai_response(response).strip()
+            if confident_tag:
+                level2_tag = confident_tag
+            else:
+                response = chat_with_ai(messages)
+                level2_tag = self.clean_ai_response(response).strip()
             
             if not level2_tag or level2_tag == "无匹配" or level2_tag not in level2_tags_list:
                 print(f"    [AI推荐] 二级标签推荐失败或无效: '{level2_tag}'")
@@ -1260,13 +1356,14 @@ class ChainTagsBatchProcessor:
             print(f"    [AI推荐] 二级标签推荐成功: {level2_tag}")
             
             # 第三步：获取该二级标签下的三级标签
-            level3_tags_list = self.get_sub_tags(chain_tags_list, [level1_tag, level2_tag])
+            level3_tags_list = tag_trie.get_children([level1_tag, level2_tag])
             
             if not level3_tags_list:
                 print(f"    [AI推荐] 二级标签 '{level2_tag}' 下没有三级标签")
                 return f"{level1_tag}/{level2_tag}"
             
             print(f"    [AI推荐] 三级标签候选数量: {len(level3_tags_list)}")
+            level3_candidates, confident_tag = self._preselect_tags(file_name, summary, [level1_tag, level2_tag], level3_tags_list)
             
             # 推荐三级标签
             level3_prompt = f"""不需要思考，直接输出。
@@ -1281,7 +1378,7 @@ class ChainTagsBatchProcessor:
 - 已选择的二级标签：{level2_tag}
 
 现有三级标签（必须严格从以下列表中选择，不要添加任何序号、标点或额外字符）：
-{chr(10).join(level3_tags_list[:50])}{'...' if len(level3_tags_list) > 50 else ''}
+{chr(10).join(level3_candidates[:50])}{'...' if len(level3_candidates) > 50 else ''}
 
 要求：
 1. 只能从上述列表中选择一个标签
@@ -1306,8 +1403,11 @@ class ChainTagsBatchProcessor:
                 }
             ]
             
-            response = chat_with_ai(messages)
-            level3_tag = self.clean_ai_response(response).strip()
+            if confident_tag:
+                level3_tag = confident_tag
+            else:
+                response = chat_with_ai(messages)
+                level3_tag = self.clean_ai_response(response).strip()
             
             if not level3_tag or level3_tag == "无匹配" or level3_tag not in level3_tags_list:
                 print(f"    [AI推荐] 三级标签推荐失败或无效: '{level3_tag}'")
@@ -1567,13 +1667,15 @@ class ChainTagsBatchProcessor:
             'recommendation_details': []  # 记录推荐详情
         }
         
-        # 加载链式标签列表
+        # 加载链式标签列表，构建一次前缀树，添加标签时增量更新
         chain_tags_list = self.load_chain_tags_from_file()
         if not chain_tags_list:
             print("失败 无法加载链式标签列表，将使用现有数据提取标签")
-            existing_tags = self.extract_existing_tags(data)
+            tag_trie = self.build_tag_trie(data)
+            existing_tags = tag_trie.level_tags()
             print(f"提取到现有标签：1级{len(existing_tags[1])}个，2级{len(existing_tags[2])}个，3级及以上{len(existing_tags[3] | existing_tags[4] | existing_tags[5])}个")
         else:
+            tag_trie = ChainTagTrie(chain_tags_list)
             print(f"成功 使用链式标签列表进行逐层推荐，共 {len(chain_tags_list)} 个标签")
         
         for i, item in enumerate(data):
@@ -1613,11 +1715,10 @@ class ChainTagsBatchProcessor:
                         file_name,
                         summary,
                         target_path,
-                        chain_tags_list
+                        tag_trie
                     )
                 else:
                     # 使用原有的推荐方法
-                    existing_tags = self.extract_existing_tags(data)
                     ai_recommendation = self.get_ai_recommendation(
                         file_name,
                         summary,
@@ -1640,6 +1741,11 @@ class ChainTagsBatchProcessor:
                         
                         item["标签"]["链式标签"] = final_chain_tag
                         print(f"    [成功] 添加链式标签: {final_chain_tag}")
+                        
+                        # 增量更新前缀树和各级标签
+                        tag_trie.add(final_chain_tag)
+                        if not chain_tags_list:
+                            existing_tags = tag_trie.level_tags()
                     else:
                         print(f"    [试运行] 将添加链式标签: {final_chain_tag}")
                     
@@ -1847,10 +1953,13 @@ def main():
                        help="删除'文件摘要'为'文件内容为空或过短'的记录")
     parser.add_argument("--smart-tags", action="store_true", 
                        help="智能标签功能：使用AI逐层推荐标签，自动调用analyze_chain_tags.py")
+    parser.add_argument("--per-level", action="store_true", 
+                       help="智能标签时每级标签单独调用一次AI（默认先一次调用推荐完整标签链）")
     
     args = parser.parse_args()
     
     processor = ChainTagsBatchProcessor(args.file)
+    processor.one_shot_tagging = not args.per_level
     
     if args.sample > 0:
         processor.show_sample(args.sample)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链式标签前缀树
+
+链式标签形如"一级/二级/三级"。逐层推荐时每一层都要找出某个父路径下的子标签，
+原先的做法是每次都把整个链式标签列表重新分割、扫描一遍。前缀树在每次运行时构建一次，
+之后按路径逐级查找子节点，复杂度只与层数有关；添加新标签时增量更新。
+
+每个节点记录使用次数（经过该节点的链式标签数），供标签推荐、标签分析和界面统计共用。
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+# 按层级统计标签时默认只统计前5级
+DEFAULT_MAX_LEVEL = 5
+
+
+def split_chain_tag(chain_tag: str) -> List[str]:
+    """将链式标签按"/"分割为各级标签（去掉空白和空段）"""
+    if not chain_tag or not isinstance(chain_tag, str):
+        return []
+    return [part.strip() for part in chain_tag.split('/') if part.strip()]
+
+
+def get_record_chain_tag(item: Dict[str, Any]) -> str:
+    """取记录中的链式标签，没有时返回空字符串"""
+    tags = item.get("标签")
+    if isinstance(tags, dict):
+        chain_tag = tags.get("链式标签")
+        if chain_tag and isinstance(chain_tag, str):
+            return chain_tag
+    return ""
+
+
+class TagNode:
+    """前缀树节点"""
+    
+    __slots__ = ("name", "children", "count", "terminal_count")
+    
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.children: Dict[str, "TagNode"] = {}
+        self.count = 0           # 经过该节点的链式标签数
+        self.terminal_count = 0  # 恰好在该节点结束的链式标签数
+
+
+class ChainTagTrie:
+    """链式标签前缀树"""
+    
+    def __init__(self, chain_tags: Iterable[str] = None):
+        """
+        初始化前缀树
+        
+        Args:
+            chain_tags: 初始链式标签（可重复，重复次数计入使用次数）
+        """
+        self.root = TagNode()
+        self.total = 0  # 已添加的链式标签数（含重复）
+        # 各级别标签 -> 使用次数，随添加增量更新
+        self._level_counts: Dict[int, Counter] = {}
+        if chain_tags:
+            for chain_tag in chain_tags:
+                self.add(chain_tag)
+    
+    @classmethod
+    def from_records(cls, data: Iterable[Dict[str, Any]]) -> "ChainTagTrie":
+        """从结果记录的"标签/链式标签"字段构建"""
+        return cls(get_record_chain_tag(item) for item in data if isinstance(item, dict))
+    
+    def add(self, chain_tag, count: int = 1) -> bool:
+        """
+        添加一个链式标签
+        
+        Args:
+            chain_tag: 链式标签字符串，或已分割的各级标签
+            count: 使用次数
+        
+        Returns:
+            是否添加成功（空标签、None等无效值返回False）
+        """
+        if isinstance(chain_tag, str):
+            parts = split_chain_tag(chain_tag)
+        elif isinstance(chain_tag, (list, tuple)):
+            parts = [part.strip() for part in chain_tag if isinstance(part, str) and part.strip()]
+        else:
+            return False
+        if not parts:
+            return False
+        node = self.root
+        node.count += count
+        for level, part in enumerate(parts, 1):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = TagNode(part)
+            child.count += count
+            self._level_counts.setdefault(level, Counter())[part] += count
+            node = child
+        node.terminal_count += count
+        self.total += count
+        return True
+    
+    def find(self, path: Sequence[str]) -> Optional[TagNode]:
+        """按各级标签查找节点，不存在时返回None"""
+        node = self.root
+        for part in path:
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+    
+    def contains(self, chain_tag) -> bool:
+        """判断路径是否存在（可以是某个链式标签的前缀）"""
+        parts = split_chain_tag(chain_tag) if isinstance(chain_tag, str) else chain_tag
+        return bool(parts) and self.find(parts) is not None
+    
+    def get_children(self, parent_path: Sequence[str] = ()) -> List[str]:
+        """获取父路径下的子标签（按名称排序）"""
+        node = self.find(parent_path)
+        return sorted(node.children) if node is not None else []
+    
+    def get_child_counts(self, parent_path: Sequence[str] = ()) -> List[Tuple[str, int]]:
+        """获取父路径下的子标签及使用次数（按使用次数降序）"""
+        node = self.find(parent_path)
+        if node is None:
+            return []
+        return sorted(((name, child.count) for name, child in node.children.items()),
+                      key=lambda item: (-item[1], item[0]))
+    
+    def get_count(self, chain_tag) -> int:
+        """获取路径的使用次数"""
+        parts = split_chain_tag(chain_tag) if isinstance(chain_tag, str) else chain_tag
+        node = self.find(parts)
+        return node.count if node is not None else 0
+    
+    def level_tags(self, max_level: int = DEFAULT_MAX_LEVEL) -> Dict[int, Set[str]]:
+        """各级别的标签集合（1..max_level，没有标签的级别为空集合）"""
+        return {level: set(self._level_counts.get(level, ())) for level in range(1, max_level + 1)}
+    
+    def level_counts(self) -> Dict[int, Counter]:
+        """各级别标签的使用次数"""
+        return {level: Counter(counts) for level, counts in sorted(self._level_counts.items())}
+    
+    def iter_paths(self) -> Iterator[Tuple[str, int]]:
+        """深度优先列出所有链式标签及其使用次数"""
+        stack = [(self.root, [])]
+        while stack:
+            node, path = stack.pop()
+            if node.terminal_count and path:
+                yield "/".join(path), node.terminal_count
+            for name in sorted(node.children, reverse=True):
+                stack.append((node.children[name], path + [name]))
+    
+    def iter_prefixes(self, max_level: int = None) -> Iterator[Tuple[List[str], int]]:
+        """深度优先列出所有路径（含中间层级的前缀）及其使用次数，最多到max_level级"""
+        stack = [(self.root, [])]
+        while stack:
+            node, path = stack.pop()
+            if path:
+                yield path, node.count
+            if max_level is not None and len(path) >= max_level:
+                continue
+            for name in sorted(node.children, reverse=True):
+                stack.append((node.children[name], path + [name]))
+    
+    def depth(self) -> int:
+        """最大层数"""
+        return max(self._level_counts, default=0)
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self.iter_paths())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段并发分类流水线
+
+原先整理文件时逐个执行"提取内容 → 生成摘要 → 逐层匹配目录"，每个文件都要依次等待
+多次AI调用。流水线把这三个阶段交给各自的线程池，阶段之间用有界队列连接：
+    提取线程 ──队列──> 摘要线程 ──队列──> 匹配线程 ──队列──> 调用方
+不同文件的提取、摘要和匹配同时进行；队列有上限，下游处理不过来时上游自动等待，
+内存中同时处理的文件数是有限的。
+
+每个文件的超时预算（SmartFileClassifier.timeout_seconds）按各阶段实际处理时间累计，
+在队列中等待的时间不计入。
+"""
+
+import queue
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 默认各阶段线程数
+DEFAULT_EXTRACT_WORKERS = 2
+DEFAULT_SUMMARY_WORKERS = 4
+DEFAULT_CLASSIFY_WORKERS = 4
+
+# 阶段之间的队列长度
+DEFAULT_QUEUE_SIZE = 16
+
+# 取消后线程检查取消事件的间隔（秒）
+_POLL_SECONDS = 0.2
+
+# 阶段结束标记
+_STOP = object()
+
+
+class ClassificationPipeline:
+    """分阶段并发分类流水线"""
+    
+    def __init__(self, classifier, target_directory: str,
+                 extract_workers: int = DEFAULT_EXTRACT_WORKERS,
+                 summary_workers: int = DEFAULT_SUMMARY_WORKERS,
+                 classify_workers: int = DEFAULT_CLASSIFY_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 cancel_event: Optional[threading.Event] = None):
+        """
+        初始化分类流水线
+        
+        Args:
+            classifier: SmartFileClassifier实例
+            target_directory: 目标目录
+            extract_workers: 内容提取线程数
+            summary_workers: 摘要生成线程数
+            classify_workers: 目录匹配线程数
+            queue_size: 阶段之间的队列长度
+            cancel_event: 取消事件，设置后各阶段不再处理新文件，run()提前结束
+        """
+        self.classifier = classifier
+        self.target_directory = target_directory
+        self.queue_size = max(1, queue_size)
+        self.cancel_event = cancel_event or threading.Event()
+        self.stages = [
+            ("提取", classifier.extract_stage, (), max(1, extract_workers)),
+            ("摘要", classifier.summarize_stage, (), max(1, summary_workers)),
+            ("匹配", classifier.recommend_stage, (target_directory,), max(1, classify_workers)),
+        ]
+        self._lock = threading.Lock()
+    
+    def run(self, file_paths: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        分类一批文件，按完成顺序逐个返回结果
+        
+        Args:
+            file_paths: 文件路径
+        
+        Yields:
+            (文件在输入中的序号, 分类结果字典)
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        remaining_workers = [workers for _, _, _, workers in self.stages]
+        threads: List[threading.Thread] = []
+        
+        feeder = threading.Thread(target=self._feed, args=(file_paths, queues[0]),
+                                  name="classify-feed", daemon=True)
+        threads.append(feeder)
+        for stage_index, (name, _, _, workers) in enumerate(self.stages):
+            for i in range(workers):
+                threads.append(threading.Thread(
+                    target=self._stage_worker,
+                    args=(stage_index, queues[stage_index], queues[stage_index + 1], remaining_workers),
+                    name=f"classify-{name}-{i}", daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+        
+        output = queues[-1]
+        finished = False
+        try:
+            while True:
+                item = self._get(output)
+                if item is None or item is _STOP:
+                    break
+                index, state = item
+                yield index, self.classifier.finish_classification(state)
+            finished = True
+        finally:
+            if not finished:
+                # 调用方提前结束（异常或不再迭代）时通知各线程退出
+                self.cancel_event.set()
+    
+    def cancel(self) -> None:
+        """取消：尚未开始的阶段不再执行"""
+        self.cancel_event.set()
+    
+    def _feed(self, file_paths: Iterable[str], first_queue: queue.Queue) -> None:
+        """把文件放入第一阶段的队列，结束后为第一阶段的每个线程放一个结束标记"""
+        try:
+            for index, file_path in enumerate(file_paths):
+                state = self.classifier.new_classification_state(str(file_path))
+                if not self._put(first_queue, (index, state)):
+                    return
+        except Exception as e:
+            logging.error(f"分类流水线读取文件列表失败: {e}")
+        for _ in range(self.stages[0][3]):
+            if not self._put(first_queue, _STOP):
+                return
+    
+    def _stage_worker(self, stage_index: int, in_queue: queue.Queue, out_queue: queue.Queue,
+                      remaining_workers: List[int]) -> None:
+        """阶段线程：取文件执行本阶段，结果交给下一阶段"""
+        _, stage, args, _ = self.stages[stage_index]
+        while True:
+            item = self._get(in_queue)
+            if item is None:
+                return
+            if item is _STOP:
+                with self._lock:
+                    remaining_workers[stage_index] -= 1
+                    last = remaining_workers[stage_index] == 0
+                if last:
+                    # 本阶段最后一个线程退出时，通知下一阶段的所有线程（或调用方）结束
+                    next_workers = self.stages[stage_index + 1][3] if stage_index + 1 < len(self.stages) else 1
+                    for _ in range(next_workers):
+                        self._put(out_queue, _STOP)
+                return
+            
+            _, state = item
+            self.classifier.run_classification_stage(state, stage, *args)
+            if not self._put(out_queue, item):
+                return
+    
+    def _get(self, source: queue.Queue):
+        """从队列取一项，取消时返回None"""
+        while not self.cancel_event.is_set():
+            try:
+                return source.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return None
+    
+    def _put(self, target: queue.Queue, item) -> bool:
+        """放入队列，队列满时等待；取消时放弃并返回False"""
+        while not self.cancel_event.is_set():
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目标目录树快照
+
+智能分类逐层匹配目录时，每个文件的每一层都要列出目标目录的子目录；二级以下的查找
+原先还要对整个子树做一次 rglob。整理上万个文件时同一棵目录树会被重复遍历上万次。
+
+DirectorySnapshot 在内存中保存每个目录的子目录列表，第一次访问时列出，之后直接从内存返回。
+每个目录记录列出时的修改时间，超过检查间隔后再次访问时只做一次 stat，修改时间变化
+（新建、删除、重命名了子项）才重新列出，整理过程中新建的目录也能及时看到。
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from tidyfile.core.chain_tag_trie import ChainTagTrie
+
+# 同一目录两次检查修改时间的最小间隔（秒）
+DEFAULT_CHECK_INTERVAL = 2.0
+
+
+class _DirEntry:
+    """快照中的一个目录"""
+    
+    __slots__ = ("mtime", "children", "checked_at")
+    
+    def __init__(self, mtime: int, children: List[str], checked_at: float):
+        self.mtime = mtime            # 列出子目录时的修改时间（纳秒）
+        self.children = children      # 子目录名（按名称排序）
+        self.checked_at = checked_at  # 上次检查修改时间的时刻
+
+
+class DirectorySnapshot:
+    """按目录缓存子目录列表，按修改时间刷新"""
+    
+    def __init__(self, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        """
+        初始化目录树快照
+        
+        Args:
+            check_interval: 同一目录两次检查修改时间的最小间隔（秒），0表示每次访问都检查
+        """
+        self.check_interval = check_interval
+        self.lock = threading.RLock()
+        self._entries: Dict[str, _DirEntry] = {}
+        # (目录, 层数) -> (构建时的版本, 构建时刻, 前缀树)
+        self._tries: Dict[Tuple[str, int], Tuple[int, float, ChainTagTrie]] = {}
+        # 任一目录的子目录列表变化时加一，用于判断缓存的前缀树是否过期
+        self.generation = 0
+        self.stats = {'hits': 0, 'listings': 0}
+    
+    def get_children(self, directory: str) -> List[str]:
+        """
+        获取目录的直接子目录名
+        
+        Args:
+            directory: 目录路径
+        
+        Returns:
+            子目录名列表（按名称排序），目录不存在时返回空列表
+        """
+        key = os.path.normpath(os.path.abspath(directory))
+        now = time.monotonic()
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                self.stats['hits'] += 1
+                return list(entry.children)
+            
+            try:
+                mtime = os.stat(key).st_mtime_ns
+            except OSError:
+                if self._entries.pop(key, None) is not None:
+                    self.generation += 1
+                return []
+            
+            if entry is not None and entry.mtime == mtime:
+                entry.checked_at = now
+                self.stats['hits'] += 1
+                return list(entry.children)
+            
+            children = self._list_directories(key)
+            if entry is None or entry.children != children:
+                self.generation += 1
+            self._entries[key] = _DirEntry(mtime, children, now)
+            self.stats['listings'] += 1
+            return list(children)
+    
+    def get_descendants(self, directory: str, depth: int) -> List[str]:
+        """获取目录下第depth层的所有目录名（depth=1即直接子目录）"""
+        level_paths = [directory]
+        for _ in range(depth):
+            level_paths = [os.path.join(path, name) for path in level_paths for name in self.get_children(path)]
+        return [os.path.basename(path) for path in level_paths]
+    
+    def get_trie(self, directory: str, max_depth: int) -> ChainTagTrie:
+        """
+        获取目录下max_depth层以内的子目录树（各节点为目录名）
+        
+        返回的前缀树在目录未变化时会被复用，调用方不要修改。
+        
+        Args:
+            directory: 根目录
+            max_depth: 展开的层数
+        """
+        key = (os.path.normpath(os.path.abspath(directory)), max_depth)
+        with self.lock:
+            cached = self._tries.get(key)
+            if cached is not None:
+                generation, built_at, tree = cached
+                if time.monotonic() - built_at < self.check_interval:
+                    return tree
+                # 超过检查间隔，逐个目录检查修改时间，没有变化时继续使用
+                self._walk(key[0], max_depth)
+                if generation == self.generation:
+                    self._tries[key] = (generation, time.monotonic(), tree)
+                    return tree
+            
+            tree = ChainTagTrie()
+            for parts in self._walk(key[0], max_depth):
+                tree.add(parts)
+            self._tries[key] = (self.generation, time.monotonic(), tree)
+            return tree
+    
+    def invalidate(self, directory: str = None) -> None:
+        """丢弃某个目录（或全部目录）的缓存，下次访问时重新列出"""
+        with self.lock:
+            if directory is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.normpath(os.path.abspath(directory)), None)
+            self._tries.clear()
+            self.generation += 1
+    
+    def _walk(self, directory: str, max_depth: int) -> List[List[str]]:
+        """先序列出max_depth层以内的所有子目录路径（相对各级目录名）"""
+        paths = []
+        stack = [[]]
+        while stack:
+            parts = stack.pop()
+            if parts:
+                paths.append(parts)
+            if len(parts) >= max_depth:
+                continue
+            children = self.get_children(os.path.join(directory, *parts))
+            for name in reversed(children):
+                stack.append(parts + [name])
+        return paths
+    
+    def _list_directories(self, directory: str) -> List[str]:
+        """列出目录的子目录"""
+        try:
+            with os.scandir(directory) as entries:
+                return sorted(entry.name for entry in entries if entry.is_dir())
+        except OSError as e:
+            logging.warning(f"列出子目录失败 {directory}: {e}")
+            return []
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF/Word文本提取服务
+
+PDF和Word的文本提取是纯Python解析，CPU密集且一直持有GIL，线程池或异步流水线中的
+多个提取任务实际上是串行的。本模块：
+1. 在提取进程中解析文档，不占用调用方进程的GIL。每个提取进程通过自己的管道
+   一次只处理一个文档，超时只终止卡住的那个进程，其他进程中的解析不受影响；
+   解析时崩溃的文档报告为提取失败，不会再在调用方进程中重新解析
+2. 逐页（逐段）提取，凑够所需字符数立即停止，不解析后面的页
+3. 按文件内容指纹缓存提取结果：文件被移动、重命名或重新分类时不再重复解析；
+   缓存的文本比这次需要的短且文档没有提取完时才重新解析
+4. 无法创建提取进程（如运行环境不支持多进程）时退回在当前线程中解析
+
+工作函数只在子进程中导入PyPDF2/python-docx，本模块本身不依赖它们。
+
+文本文件由read_text_excerpt读取：只读一次文件开头，按BOM和文件头特征判断编码与是否二进制，
+再按所需字符数增量解码，不再按候选编码逐个重新打开文件。
+"""
+
+import os
+import codecs
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+
+from tidyfile.utils.deadline import check_deadline, request_timeout
+
+# 提取进程数上限
+MAX_EXTRACT_WORKERS = 4
+# 单个文档的提取时间限制（秒），有更早的截止时间时以截止时间为准
+EXTRACT_TIMEOUT_SECONDS = 120
+# 缓存的提取文本总字符数上限
+DEFAULT_MEMO_CHARS = 20_000_000
+# 计算内容指纹时读取文件头尾各多少字节
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+# 判断编码和是否二进制时读取的文件开头字节数
+TEXT_SNIFF_BYTES = 8 * 1024
+# 文本文件增量解码时每次读取的字节数
+TEXT_READ_CHUNK = 16 * 1024
+# 控制字符占比超过该值时视为二进制文件
+BINARY_CONTROL_RATIO = 0.3
+
+# BOM -> 编码（长的在前，UTF-32 LE的BOM以UTF-16 LE的BOM开头）
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# 常见二进制格式的文件头
+_BINARY_MAGIC = (
+    b'%PDF', b'PK\x03\x04', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'\x7fELF',
+    b'\xd0\xcf\x11\xe0', b'Rar!', b'7z\xbc\xaf', b'\x1f\x8b', b'RIFF', b'ID3',
+)
+
+# 文本中会出现的字节：制表、换行、回车、换页、ESC以及所有可打印字节
+_TEXT_BYTES = bytes([7, 8, 9, 10, 12, 13, 27]) + bytes(range(0x20, 0x7f)) + bytes(range(0x80, 0x100))
+
+
+class DocumentExtractionError(Exception):
+    """文档提取异常"""
+    pass
+
+
+def content_fingerprint(file_path: str) -> str:
+    """
+    计算文件内容指纹：文件大小 + 文件头尾各64KB的SHA1
+    
+    与路径无关，文件移动或重命名后指纹不变；只读取头尾，大文件也很快。
+    """
+    size = os.path.getsize(file_path)
+    sha1 = hashlib.sha1(str(size).encode())
+    with open(file_path, 'rb') as f:
+        sha1.update(f.read(FINGERPRINT_BLOCK_SIZE))
+        if size > 2 * FINGERPRINT_BLOCK_SIZE:
+            f.seek(-FINGERPRINT_BLOCK_SIZE, os.SEEK_END)
+            sha1.update(f.read(FINGERPRINT_BLOCK_SIZE))
+    return sha1.hexdigest()
+
+
+def extract_pdf_text(file_path: str, max_length: int, max_pages: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    逐页提取PDF文本，凑够max_length个字符即停止（在子进程中执行）
+    
+    Args:
+        file_path: PDF文件路径
+        max_length: 需要的字符数
+        max_pages: 最多读取的页数，None表示不限
+    
+    Returns:
+        (提取的文本, 是否已读完全部内容)
+    """
+    from PyPDF2 import PdfReader
+    with open(file_path, 'rb') as f:
+        reader = PdfReader(f)
+        page_count = len(reader.pages)
+        last_page = page_count if max_pages is None else min(max_pages, page_count)
+        text = ""
+        for page_num in range(last_page):
+            text += (reader.pages[page_num].extract_text() or "") + "\n"
+            if len(text) >= max_length:
+                return text, page_num + 1 == page_count
+        return text, last_page == page_count
+
+
+def extract_docx_text(file_path: str, max_length: int) -> Tuple[str, bool]:
+    """
+    逐段提取Word文本，凑够max_length个字符即停止；没有段落文本时提取表格（在子进程中执行）
+    
+    Returns:
+        (提取的文本, 是否已读完全部内容)
+    """
+    from docx import Document
+    doc = Document(file_path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            text += paragraph.text.strip() + "\n"
+            if len(text) >= max_length:
+                return text, False
+    if not text.strip():
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    if cell.text.strip():
+                        text += cell.text.strip() + " "
+            text += "\n"
+            if len(text) >= max_length:
+                return text, False
+    return text, True
+
+
+def detect_text_encoding(sample: bytes) -> Optional[str]:
+    """
+    根据文件开头的字节判断文本编码
+    
+    Args:
+        sample: 文件开头的字节
+    
+    Returns:
+        编码名称；判断为二进制文件时返回None
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if not sample:
+        return 'utf-8'
+    if sample.startswith(_BINARY_MAGIC) or b'\x00' in sample:
+        return None
+    # bytes.translate删除文本字节后剩下的就是控制字符，不用逐字符判断
+    control_count = len(sample.translate(None, _TEXT_BYTES))
+    if control_count / len(sample) > BINARY_CONTROL_RATIO:
+        return None
+    
+    for encoding in ('utf-8', 'gb18030'):
+        try:
+            # final=False：样本末尾被截断的多字节字符不算错误
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def read_text_excerpt(file_path: str, max_chars: int) -> Optional[str]:
+    """
+    读取文本文件的前max_chars个字符
+    
+    只打开一次文件：先读开头判断编码，再按块增量解码，凑够字符数即停止。
+    
+    Args:
+        file_path: 文件路径
+        max_chars: 需要的字符数
+    
+    Returns:
+        文本内容；判断为二进制文件时返回None
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read(TEXT_SNIFF_BYTES)
+        encoding = detect_text_encoding(data)
+        if encoding is None:
+            return None
+        
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        parts = []
+        length = 0
+        while data:
+            text = decoder.decode(data)
+            parts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+            data = f.read(TEXT_READ_CHUNK)
+        else:
+            parts.append(decoder.decode(b'', final=True))
+        return "".join(parts)[:max_chars]
+
+
+def _extract_worker_main(conn) -> None:
+    """提取进程主循环：逐个接收 (工作函数, 参数)，返回 (是否成功, 结果或异常)"""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        worker, args = task
+        try:
+            reply = (True, worker(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception:
+            # 异常对象无法序列化时只传回消息
+            conn.send((False, DocumentExtractionError(str(reply[1]))))
+
+
+class _ExtractProcess:
+    """一个提取进程及其管道，一次只执行一个任务"""
+    
+    def __init__(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_extract_worker_main, args=(child_conn,),
+                                               name="document-extract", daemon=True)
+        self.process.start()
+        child_conn.close()
+    
+    def call(self, worker, args, timeout: float):
+        """
+        在进程中执行工作函数
+        
+        Raises:
+            TimeoutError: 超时未返回（进程仍在运行，调用方应终止它）
+            EOFError: 进程异常退出
+            其他异常: 工作函数抛出的异常
+        """
+        self.conn.send((worker, args))
+        if not self.conn.poll(timeout):
+            raise TimeoutError()
+        ok, value = self.conn.recv()
+        if not ok:
+            raise value
+        return value
+    
+    def close(self) -> None:
+        """通知进程退出"""
+        try:
+            self.conn.send(None)
+            self.conn.close()
+        except OSError:
+            pass
+    
+    def terminate(self) -> None:
+        """强制终止进程"""
+        try:
+            self.process.terminate()
+            self.process.join(1)
+            self.conn.close()
+        except Exception as e:
+            logging.debug(f"终止文档提取进程失败: {e}")
+
+
+class DocumentExtractor:
+    """进程池文档提取服务（带内容指纹缓存）"""
+    
+    def __init__(self, max_workers: int = None, memo_chars: int = DEFAULT_MEMO_CHARS,
+                 use_processes: bool = True):
+        """
+        初始化提取服务
+        
+        Args:
+            max_workers: 进程数，默认为CPU核数（不超过MAX_EXTRACT_WORKERS）
+            memo_chars: 缓存的提取文本总字符数上限
+            use_processes: 是否使用提取进程，False时在调用线程中解析
+        """
+        self.max_workers = max_workers or min(MAX_EXTRACT_WORKERS, os.cpu_count() or 1)
+        self.memo_chars = memo_chars
+        self.use_processes = use_processes
+        self.lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._idle: List[_ExtractProcess] = []
+        self._processes: Set[_ExtractProcess] = set()
+        # (指纹, 文档类型, 页数限制) -> (文本, 是否完整)
+        self._memo: "OrderedDict[tuple, Tuple[str, bool]]" = OrderedDict()
+        self._memo_size = 0
+        self.stats = {'hits': 0, 'parsed': 0, 'inline': 0}
+    
+    def extract(self, file_path: str, max_length: int, max_pages: Optional[int] = None) -> str:
+        """
+        提取PDF/Word文档的前max_length个字符
+        
+        Args:
+            file_path: 文档路径（.pdf、.docx）
+            max_length: 需要的字符数
+            max_pages: PDF最多读取的页数，None表示不限
+        
+        Returns:
+            提取的文本（可能为空字符串）
+        
+        Raises:
+            DocumentExtractionError: 不支持的格式或提取超时
+            其他异常: 文档解析失败时原样抛出
+        """
+        file_path = str(file_path)
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == '.pdf':
+            worker, args = extract_pdf_text, (file_path, max_length, max_pages)
+        elif extension in ('.docx', '.doc'):
+            worker, args = extract_docx_text, (file_path, max_length)
+        else:
+            raise DocumentExtractionError(f"不支持的文档格式: {extension}")
+        
+        key = (content_fingerprint(file_path), worker.__name__, max_pages)
+        with self.lock:
+            cached = self._memo.get(key)
+            if cached is not None and (cached[1] or len(cached[0]) >= max_length):
+                self._memo.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached[0][:max_length]
+        
+        text, complete = self._run(worker, args)
+        self._remember(key, text, complete)
+        return text[:max_length]
+    
+    def shutdown(self) -> None:
+        """关闭所有提取进程"""
+        with self.lock:
+            idle, self._idle = self._idle, []
+            busy = self._processes.difference(idle)
+            self._processes = set()
+        for process in idle:
+            process.close()
+        for process in busy:
+            process.terminate()
+    
+    def _run(self, worker, args) -> Tuple[str, bool]:
+        """在提取进程中执行提取，无法创建提取进程时在当前线程中执行"""
+        if not self.use_processes:
+            return self._run_inline(worker, args)
+        
+        with self._slots:
+            process = self._acquire_process()
+            if process is None:
+                return self._run_inline(worker, args)
+            try:
+                result = process.call(worker, args, request_timeout(EXTRACT_TIMEOUT_SECONDS))
+            except TimeoutError:
+                # 只终止卡住的进程，其他进程中的解析继续进行
+                self._discard_process(process)
+                check_deadline()
+                raise DocumentExtractionError(f"文档提取超时（{EXTRACT_TIMEOUT_SECONDS}秒）")
+            except (EOFError, OSError):
+                # 解析时进程崩溃，不在当前进程中重新解析同一文档
+                self._discard_process(process)
+                raise DocumentExtractionError(f"文档提取进程异常退出（退出码 {process.process.exitcode}）")
+            except BaseException:
+                # 工作函数抛出的异常，进程仍可复用
+                self._release_process(process)
+                raise
+            self._release_process(process)
+        
+        with self.lock:
+            self.stats['parsed'] += 1
+        return result
+    
+    def _run_inline(self, worker, args) -> Tuple[str, bool]:
+        with self.lock:
+            self.stats['inline'] += 1
+        return worker(*args)
+    
+    def _acquire_process(self) -> Optional[_ExtractProcess]:
+        """取一个空闲的提取进程，没有时新建；无法创建时改为在当前线程中解析并返回None"""
+        with self.lock:
+            while self._idle:
+                process = self._idle.pop()
+                if process.process.is_alive():
+                    return process
+                self._processes.discard(process)
+        try:
+            process = _ExtractProcess()
+        except (OSError, NotImplementedError, ValueError, RuntimeError) as e:
+            logging.warning(f"无法创建文档提取进程，将在当前线程中解析: {e}")
+            self.use_processes = False
+            return None
+        with self.lock:
+            self._processes.add(process)
+        return process
+    
+    def _release_process(self, process: _ExtractProcess) -> None:
+        with self.lock:
+            if process in self._processes:
+                self._idle.append(process)
+                return
+        # 提取服务已关闭
+        process.close()
+    
+    def _discard_process(self, process: _ExtractProcess) -> None:
+        """终止并丢弃一个提取进程，下次需要时重新创建"""
+        with self.lock:
+            self._processes.discard(process)
+        process.terminate()
+    
+    def _remember(self, key: tuple, text: str, complete: bool) -> None:
+        """缓存提取结果，超过字符数上限时淘汰最久未使用的条目"""
+        with self.lock:
+            old = self._memo.pop(key, None)
+            if old is not None:
+                self._memo_size -= len(old[0])
+            self._memo[key] = (text, complete)
+            self._memo_size += len(text)
+            while self._memo_size > self.memo_chars and len(self._memo) > 1:
+                _, (evicted, _) = self._memo.popitem(last=False)
+                self._memo_size -= len(evicted)
+
+
+# 全局提取服务
+_document_extractor: Optional[DocumentExtractor] = None
+_extractor_lock = threading.Lock()
+
+
+def get_document_extractor() -> DocumentExtractor:
+    """获取全局文档提取服务实例"""
+    global _document_extractor
+    with _extractor_lock:
+        if _document_extractor is None:
+            _document_extractor = DocumentExtractor()
+        return _document_extractor
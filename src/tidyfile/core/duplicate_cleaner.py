@@ -2,16 +2,32 @@
 # -*- coding: utf-8 -*-
 """
 文件去重功能模块
+
+重复文件的处理方式:
+- delete: 移入隔离区（或永久删除）
+- link: 逐字节确认内容相同后，用指向保留文件的reflink（btrfs/XFS等支持的写时复制克隆）
+        或硬链接替换重复文件，释放空间的同时保留所有路径
 """
 import os
+import sys
+import stat
+import uuid
 import logging
 from pathlib import Path
 import hashlib
 from tidyfile.core.transfer_log_manager import TransferLogManager
+from tidyfile.core.quarantine_store import QUARANTINE_DIRNAME, get_quarantine_store
+from tidyfile.core.near_duplicate_detector import find_similar_groups
 
 class DuplicateCleanerError(Exception):
     pass
 
+# Linux ioctl FICLONE：让目标文件共享源文件的数据块（写时复制）
+FICLONE = 0x40049409
+
+DEDUP_MODES = ("delete", "link")
+LINK_TYPES = ("auto", "reflink", "hardlink")
+
 def _calc_md5(file_path, chunk_size=65536):
     md5 = hashlib.md5()
     with open(file_path, 'rb') as f:
@@ -19,7 +35,78 @@ def _calc_md5(file_path, chunk_size=65536):
             md5.update(chunk)
     return md5.hexdigest()
 
-def remove_duplicate_files(target_folder_paths: list, dry_run: bool = True, log_session_name: str = None, keep_oldest: bool = True) -> dict:
+def _files_identical(path_a, path_b, chunk_size=1024 * 1024) -> bool:
+    """逐字节比较两个文件的内容"""
+    if os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    with open(path_a, 'rb') as fa, open(path_b, 'rb') as fb:
+        while True:
+            chunk_a = fa.read(chunk_size)
+            chunk_b = fb.read(chunk_size)
+            if chunk_a != chunk_b:
+                return False
+            if not chunk_a:
+                return True
+
+def _reflink(source, target):
+    """创建source的reflink克隆target，文件系统不支持时抛出OSError"""
+    if not sys.platform.startswith('linux'):
+        raise OSError("当前平台不支持reflink")
+    import fcntl
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+def _copy_metadata(source_stat, target_path):
+    """把source_stat中的权限、属主和时间戳应用到target_path，属主无法保留时抛出OSError"""
+    if hasattr(os, 'chown'):
+        target_stat = os.stat(target_path)
+        if (target_stat.st_uid, target_stat.st_gid) != (source_stat.st_uid, source_stat.st_gid):
+            os.chown(target_path, source_stat.st_uid, source_stat.st_gid)
+    os.chmod(target_path, stat.S_IMODE(source_stat.st_mode))
+    os.utime(target_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+def _replace_with_link(kept_path, duplicate_path, link_type="auto") -> str:
+    """
+    用指向保留文件的链接替换重复文件
+    
+    先在重复文件所在目录创建临时链接，成功后再原子替换重复文件，
+    任何一步失败都不会影响原来的重复文件。
+    
+    reflink是独立的文件，替换前把重复文件的权限、属主和时间戳复制到临时文件上；
+    硬链接与保留文件共用同一个inode，无法单独保留这些属性，因此只在权限和属主
+    与保留文件相同时使用，链接后的修改时间与保留文件相同。
+    
+    Returns:
+        实际使用的链接方式：reflink 或 hardlink
+    """
+    temp_path = os.path.join(os.path.dirname(duplicate_path), f".{uuid.uuid4().hex}.dedup_link")
+    duplicate_stat = os.stat(duplicate_path)
+    methods = ["reflink", "hardlink"] if link_type == "auto" else [link_type]
+    errors = []
+    for method in methods:
+        try:
+            if method == "reflink":
+                _reflink(kept_path, temp_path)
+                _copy_metadata(duplicate_stat, temp_path)
+            else:
+                kept_stat = os.stat(kept_path)
+                if (kept_stat.st_mode, kept_stat.st_uid, kept_stat.st_gid) != (
+                        duplicate_stat.st_mode, duplicate_stat.st_uid, duplicate_stat.st_gid):
+                    raise OSError("重复文件的权限或属主与保留文件不同，硬链接会改变它们")
+                os.link(kept_path, temp_path)
+            os.replace(temp_path, duplicate_path)
+            return method
+        except OSError as e:
+            errors.append(f"{method}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    raise OSError("; ".join(errors))
+
+def remove_duplicate_files(target_folder_paths: list, dry_run: bool = True, log_session_name: str = None, keep_oldest: bool = True,
+                           use_quarantine: bool = True, dedup_mode: str = "delete", link_type: str = "auto",
+                           find_similar: bool = False, similarity_options: dict = None) -> dict:
     """
     删除指定目标文件夹中的重复文件（文件大小+MD5判断），并写入日志
     
@@ -28,7 +115,18 @@ def remove_duplicate_files(target_folder_paths: list, dry_run: bool = True, log_
         dry_run: 试运行模式，True为只检查不删除
         log_session_name: 日志会话名称
         keep_oldest: 保留策略，True为保留最早的文件，False为保留最新的文件
+        use_quarantine: 是否将重复文件移入同一卷上的隔离区（可通过undo_duplicate_delete恢复），
+                        为False时直接永久删除
+        dedup_mode: 处理方式，delete为删除重复文件，link为用链接替换重复文件
+        link_type: link模式的链接方式，auto优先reflink、不支持时使用硬链接
+        find_similar: 是否额外查找相似文件（图片感知哈希、文档MinHash），结果放在similar_groups中，
+                      只供人工确认，不会被删除或链接
+        similarity_options: 传给near_duplicate_detector.find_similar_groups的参数
     """
+    if dedup_mode not in DEDUP_MODES:
+        raise DuplicateCleanerError(f"不支持的处理方式: {dedup_mode}")
+    if link_type not in LINK_TYPES:
+        raise DuplicateCleanerError(f"不支持的链接方式: {link_type}")
     try:
         transfer_log_manager = TransferLogManager()
         if not log_session_name:
@@ -49,6 +147,8 @@ def remove_duplicate_files(target_folder_paths: list, dry_run: bool = True, log_
         all_files = []
         for target_path in target_paths:
             for file_path in target_path.rglob('*'):
+                if QUARANTINE_DIRNAME in file_path.parts:
+                    continue
                 if file_path.is_file():
                     try:
                         file_size = file_path.stat().st_size
@@ -107,9 +207,34 @@ def remove_duplicate_files(target_folder_paths: list, dry_run: bool = True, log_
             'files_to_delete': [],
             'files_deleted': [],
             'deletion_errors': [],
+            'files_linked': [],
+            'already_linked': 0,
+            'dedup_mode': dedup_mode,
+            'similar_groups': [],
+            'similar_groups_found': 0,
             'dry_run': dry_run,
             'log_session_name': log_session_name
         }
+        if find_similar:
+            # 完全相同的文件每组只取第一个参与相似性检测
+            exact_duplicates = {id(file_info) for group in duplicate_groups for file_info in group['files'][1:]}
+            similar_groups = find_similar_groups(
+                [file_info for file_info in all_files if id(file_info) not in exact_duplicates],
+                **(similarity_options or {})
+            )
+            results['similar_groups'] = [{
+                'type': group['type'],
+                'similarity': group['similarity'],
+                'files': [{
+                    'path': str(file_info['path']),
+                    'relative_path': str(file_info['relative_path']),
+                    'size': file_info['size'],
+                    'ctime': file_info['ctime'],
+                    'source_folder': file_info.get('source_folder', '')
+                } for file_info in group['files']]
+            } for group in similar_groups]
+            results['similar_groups_found'] = len(similar_groups)
+        used_stores = {}
         for group in duplicate_groups:
             files = group['files']
             for idx, file_info in enumerate(files):
@@ -123,22 +248,35 @@ def remove_duplicate_files(target_folder_paths: list, dry_run: bool = True, log_
                         'ctime': file_info['ctime'],
                         'source_folder': file_info.get('source_folder', '')
                     })
-                    if not dry_run:
+                    if not dry_run and dedup_mode == "link":
+                        _link_duplicate(files[0], file_info, group, results, transfer_log_manager, link_type)
+                    elif not dry_run:
                         try:
-                            file_info['path'].unlink()
+                            quarantine_path = ""
+                            quarantine_root = ""
+                            if use_quarantine:
+                                # 重命名到隔离区，撤销时再重命名回来
+                                store = get_quarantine_store(str(file_info['path']))
+                                entry = store.quarantine(str(file_info['path']), group['md5'], file_info['ctime'])
+                                quarantine_path = entry['object_path']
+                                quarantine_root = str(store.root)
+                                used_stores[quarantine_root] = store
+                            else:
+                                file_info['path'].unlink()
                             results['files_deleted'].append({
                                 'path': str(file_info['path']),
                                 'relative_path': str(file_info['relative_path']),
                                 'size': group['size'],
                                 'md5': group['md5'],
                                 'ctime': file_info['ctime'],
-                                'source_folder': file_info.get('source_folder', '')
+                                'source_folder': file_info.get('source_folder', ''),
+                                'quarantine_path': quarantine_path
                             })
                             transfer_log_manager.log_transfer_operation(
                                 source_path=str(file_info['path']),
-                                target_path="",
+                                target_path=quarantine_path,
                                 operation_type="delete_duplicate",
-                                target_folder="",
+                                target_folder=quarantine_root,
                                 success=True,
                                 file_size=group['size'],
                                 md5=group['md5'],
@@ -158,23 +296,89 @@ def remove_duplicate_files(target_folder_paths: list, dry_run: bool = True, log_
             logging.info(f"重复文件扫描完成 [试运行模式]: 扫描文件 {results['total_files_scanned']} 个, "
                        f"发现重复组 {results['duplicate_groups_found']} 个, "
                        f"待删除重复文件 {results['total_duplicates_found']} 个")
+        elif dedup_mode == "link":
+            logging.info(f"重复文件链接完成: 扫描文件 {results['total_files_scanned']} 个, "
+                       f"发现重复组 {results['duplicate_groups_found']} 个, "
+                       f"成功链接 {len(results['files_linked'])} 个, "
+                       f"已是硬链接 {results['already_linked']} 个, "
+                       f"失败 {len(results['deletion_errors'])} 个")
+            transfer_log_manager.end_transfer_session()
         else:
             logging.info(f"重复文件删除完成: 扫描文件 {results['total_files_scanned']} 个, "
                        f"发现重复组 {results['duplicate_groups_found']} 个, "
                        f"成功删除 {len(results['files_deleted'])} 个, "
                        f"删除失败 {len(results['deletion_errors'])} 个")
             transfer_log_manager.end_transfer_session()
+            # 按保留天数和大小上限清理隔离区
+            for store in used_stores.values():
+                try:
+                    store.purge()
+                except Exception as e:
+                    logging.warning(f"清理隔离区失败 {store.root}: {e}")
         return results
     except Exception as e:
         raise DuplicateCleanerError(f"删除重复文件失败: {e}")
 
-def undo_duplicate_delete(log_file_path: str, operation_ids: list = None, dry_run: bool = True) -> dict:
+def _link_duplicate(kept_info, file_info, group, results, transfer_log_manager, link_type):
+    """逐字节确认后用链接替换一个重复文件，并记录结果和转移日志"""
+    kept_path = str(kept_info['path'])
+    duplicate_path = str(file_info['path'])
+    try:
+        kept_stat = os.stat(kept_path)
+        duplicate_stat = os.stat(duplicate_path)
+        if (kept_stat.st_dev, kept_stat.st_ino) == (duplicate_stat.st_dev, duplicate_stat.st_ino):
+            # 已经是同一个文件的硬链接
+            results['already_linked'] += 1
+            return
+        if not _files_identical(kept_path, duplicate_path):
+            raise DuplicateCleanerError("逐字节比较发现内容不同，未替换")
+        
+        method = _replace_with_link(kept_path, duplicate_path, link_type)
+        results['files_linked'].append({
+            'path': duplicate_path,
+            'relative_path': str(file_info['relative_path']),
+            'kept_path': kept_path,
+            'link_type': method,
+            'size': group['size'],
+            'md5': group['md5'],
+            'source_folder': file_info.get('source_folder', '')
+        })
+        transfer_log_manager.log_transfer_operation(
+            source_path=duplicate_path,
+            target_path=kept_path,
+            operation_type="link_duplicate",
+            target_folder=method,
+            success=True,
+            file_size=group['size'],
+            md5=group['md5'],
+            ctime=file_info['ctime']
+        )
+        logging.info(f"已用{method}替换重复文件: {file_info['relative_path']}")
+    except Exception as e:
+        results['deletion_errors'].append({
+            'path': duplicate_path,
+            'relative_path': str(file_info['relative_path']),
+            'error': str(e),
+            'source_folder': file_info.get('source_folder', '')
+        })
+        logging.error(f"链接替换失败: {file_info['relative_path']}, 错误: {e}")
+
+def undo_duplicate_delete(log_file_path: str, operation_ids: list = None, dry_run: bool = True,
+                          max_workers: int = 4, progress_callback=None, cancel_event=None) -> dict:
     """
-    根据日志恢复被删除的重复文件（需配合日志和备份/回收站机制）
+    根据日志恢复被删除的重复文件
+    
+    移入隔离区的文件会从隔离区重命名回原位置；直接永久删除的文件（use_quarantine=False
+    或旧版本的日志）无法恢复，会被跳过。
+    恢复并行执行并记录检查点，中断后再次调用会从上次的进度继续，
+    progress_callback 签名为 (已完成数, 总数, 恢复详情)。
     """
     transfer_log_manager = TransferLogManager()
     return transfer_log_manager.restore_from_log(
         log_file_path=log_file_path,
         operation_ids=operation_ids,
-        dry_run=dry_run
+        dry_run=dry_run,
+        max_workers=max_workers,
+        progress_callback=progress_callback,
+        cancel_event=cancel_event
     ) 
\ No newline at end of file
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于向量的候选预筛选
+
+标签推荐和目录匹配原先把全部候选（或前50个）直接放进提示词，候选多时提示词很长、
+被截断的候选永远选不到。这里先用向量相似度从全部候选中选出最相关的前K个再交给模型，
+相似度足够高且明显领先时直接采用，不再调用模型。
+
+向量通过AI配置中的向量化模型（Ollama /api/embed 或 OpenAI兼容 /embeddings）计算，
+按"向量化模型 + 文本"缓存到应用缓存目录，候选标签和目录名只需计算一次。
+numpy是可选依赖（pip install tidyfile[embeddings]），没有安装numpy、没有配置向量化模型
+或调用失败时不做预筛选，保持原有流程。
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 每次向量化请求的文本数
+EMBED_BATCH_SIZE = 64
+# 向量化不可用时，多久之后再尝试（秒）
+UNAVAILABLE_RETRY_SECONDS = 300
+# 内存中保留的查询文本向量数
+RECENT_QUERY_LIMIT = 64
+
+# 预筛选默认参数
+DEFAULT_TOP_K = 20
+CONFIDENT_SCORE = 0.88   # 最高相似度达到此值
+CONFIDENT_MARGIN = 0.06  # 且比第二名高出此值时，直接采用
+
+
+class EmbeddingCache:
+    """按向量化模型分文件保存的文本向量缓存（向量已归一化）"""
+    
+    def __init__(self, cache_dir=None):
+        """
+        初始化向量缓存
+        
+        Args:
+            cache_dir: 缓存目录，默认为应用缓存目录下的embeddings
+        """
+        if cache_dir is None:
+            try:
+                from tidyfile.utils.app_paths import get_app_paths
+                cache_dir = get_app_paths().cache_dir / "embeddings"
+            except ImportError:
+                cache_dir = Path("cache") / "embeddings"
+        self.cache_dir = Path(cache_dir)
+        self.lock = threading.Lock()
+        self._model_key: Optional[str] = None
+        self._vectors: Dict[str, "np.ndarray"] = {}
+        self._dirty = False
+        self._unavailable_until = 0.0
+        # 最近的查询文本向量（不写入磁盘），同一文件逐层匹配时复用
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+    
+    @property
+    def available(self) -> bool:
+        """是否可以计算向量"""
+        return np is not None and time.time() >= self._unavailable_until
+    
+    def get_vectors(self, texts: Sequence[str], store: bool = True) -> Optional["np.ndarray"]:
+        """
+        获取文本向量矩阵（每行一个归一化向量），缺失的向量批量计算
+        
+        Args:
+            texts: 文本列表
+            store: 是否把新计算的向量加入缓存（一次性的查询文本不需要缓存）
+        
+        Returns:
+            向量矩阵，向量化不可用时返回None
+        """
+        if not self.available or not texts:
+            return None
+        try:
+            with self.lock:
+                model_key = self._embedding_model_key()
+                if model_key is None:
+                    raise ValueError("没有配置向量化模型")
+                if model_key != self._model_key:
+                    self._load(model_key)
+                    self._recent.clear()
+                known = self._vectors if store else self._recent
+                vectors = {text: known[text] for text in texts if text in known}
+            
+            # 向量化请求在锁外进行，其他线程的缓存命中不必等待网络请求
+            missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+            computed = {}
+            for start in range(0, len(missing), EMBED_BATCH_SIZE):
+                batch = missing[start:start + EMBED_BATCH_SIZE]
+                used_key, raw_vectors = self._embed(batch)
+                if used_key != model_key:
+                    # 首选的向量化模型失败，换用的模型向量不能与缓存混用
+                    raise ValueError(f"向量化模型不一致: {used_key}")
+                matrix = np.asarray(raw_vectors, dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix /= np.where(norms == 0, 1, norms)
+                computed.update(zip(batch, matrix))
+            vectors.update(computed)
+            
+            if computed:
+                with self.lock:
+                    # 计算期间向量化模型可能已切换，只合并到同一模型的缓存
+                    if self._model_key == model_key:
+                        if store:
+                            self._vectors.update(computed)
+                            self._dirty = True
+                        else:
+                            self._recent.update(computed)
+                            while len(self._recent) > RECENT_QUERY_LIMIT:
+                                self._recent.popitem(last=False)
+            return np.stack([vectors[text] for text in texts])
+        except Exception as e:
+            self._unavailable_until = time.time() + UNAVAILABLE_RETRY_SECONDS
+            logging.info(f"向量化不可用，{UNAVAILABLE_RETRY_SECONDS}秒内不再尝试: {e}")
+            return None
+    
+    def flush(self) -> None:
+        """把新计算的向量写入磁盘"""
+        with self.lock:
+            if not self._dirty or self._model_key is None:
+                return
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file = self._cache_file(self._model_key)
+            temp_file = cache_file.with_name(cache_file.stem + ".tmp.npz")
+            texts = list(self._vectors)
+            np.savez(temp_file, texts=np.array(texts, dtype=str),
+                     vectors=np.stack([self._vectors[text] for text in texts]))
+            os.replace(temp_file, cache_file)
+            self._dirty = False
+    
+    def _embedding_model_key(self) -> Optional[str]:
+        from tidyfile.ai.client_manager import get_ai_manager
+        return get_ai_manager().get_embedding_model_key()
+    
+    def _embed(self, texts: List[str]) -> Tuple[str, List[List[float]]]:
+        from tidyfile.ai.client_manager import embed_texts
+        return embed_texts(texts)
+    
+    def _cache_file(self, model_key: str) -> Path:
+        return self.cache_dir / (re.sub(r'[^\w.-]+', '_', model_key) + ".npz")
+    
+    def _load(self, model_key: str) -> None:
+        """切换到指定向量化模型的缓存（调用方持有锁）"""
+        self._model_key = model_key
+        self._vectors = {}
+        self._dirty = False
+        cache_file = self._cache_file(model_key)
+        if not cache_file.exists():
+            return
+        try:
+            with np.load(cache_file) as cached:
+                self._vectors = dict(zip(cached["texts"].tolist(), cached["vectors"]))
+        except Exception as e:
+            logging.warning(f"读取向量缓存失败，将重新计算: {e}")
+
+
+def preselect_candidates(query: str, candidates: List[str], candidate_texts: List[str] = None,
+                         top_k: int = DEFAULT_TOP_K) -> Tuple[List[str], Optional[str], float]:
+    """
+    按与查询文本的相似度预筛选候选
+    
+    Args:
+        query: 查询文本（文件名 + 摘要）
+        candidates: 候选名称
+        candidate_texts: 用于计算向量的候选文本（如带上级路径的标签），默认为候选名称
+        top_k: 保留的候选数
+    
+    Returns:
+        (按相似度排序的前top_k个候选, 高置信度时直接采用的候选或None, 最高相似度)；
+        向量化不可用时原样返回候选
+    """
+    if len(candidates) < 2 or not query:
+        return candidates, None, 0.0
+    cache = get_embedding_cache()
+    texts = list(candidate_texts or candidates)
+    candidate_vectors = cache.get_vectors(texts)
+    query_vectors = cache.get_vectors([query], store=False) if candidate_vectors is not None else None
+    if query_vectors is None:
+        return candidates, None, 0.0
+    cache.flush()
+    
+    scores = candidate_vectors @ query_vectors[0]
+    k = min(top_k, len(candidates))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    selected = [candidates[i] for i in top]
+    
+    best_score = float(scores[top[0]])
+    second_score = float(scores[top[1]]) if len(top) > 1 else -1.0
+    confident = selected[0] if best_score >= CONFIDENT_SCORE and best_score - second_score >= CONFIDENT_MARGIN else None
+    return selected, confident, best_score
+
+
+# 全局向量缓存
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取全局向量缓存实例"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件内容提取器注册表
+
+原先文件解读模块在导入时就加载PyPDF2、python-docx和Pillow（缺少任何一个直接退出），
+按扩展名提取内容的逻辑写成一串if分支，不认识的格式（.xlsx、.pptx、.epub、.odt等）
+被当作文本读取，得到的是乱码。
+
+这里每种格式是一个提取器插件：
+1. 按扩展名（或MIME类型）注册，查找时先按扩展名、再按MIME类型匹配
+2. 只在提取时才导入所需的第三方库，导入本模块不加载任何重量级依赖
+3. 声明开销类别：COST_CHEAP（直接读取）、COST_CPU（需要解析，耗CPU）、COST_AI（内容需要模型分析）
+4. extract(file_path, max_chars) 按字符预算提取，凑够字符数即停止
+
+Office Open XML、OpenDocument和EPUB都是zip包中的XML，用标准库逐个读取XML元素，
+不需要额外安装依赖。新格式只需实现一个提取器并调用register_extractor。
+"""
+
+import os
+import re
+import zipfile
+import mimetypes
+import threading
+import posixpath
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from tidyfile.utils.deadline import check_deadline
+from tidyfile.core.document_extraction import (
+    DocumentExtractionError, get_document_extractor, read_text_excerpt
+)
+
+# 开销类别
+COST_CHEAP = "cheap"  # 直接读取，几乎不耗时
+COST_CPU = "cpu"      # 需要解析文档，耗CPU
+COST_AI = "ai"        # 内容需要多模态模型分析，extract()只返回基本信息
+
+
+class BinaryContentError(DocumentExtractionError):
+    """文件内容为二进制格式，无法作为文本读取"""
+    pass
+
+
+def _local_name(tag: str) -> str:
+    """去掉XML标签的命名空间"""
+    return tag.rsplit('}', 1)[-1]
+
+
+class Extractor:
+    """提取器基类：子类实现iter_text()逐块产出文本，或直接覆盖extract()"""
+    
+    name = ""
+    label = "文件"                 # 用于提示信息，如"PDF文件读取失败"
+    extensions: tuple = ()
+    mime_types: tuple = ()
+    cost = COST_CHEAP
+    requires: tuple = ()           # 需要的第三方模块（用于available()）
+    
+    def available(self) -> bool:
+        """所需的第三方库是否已安装（不导入）"""
+        import importlib.util
+        return all(importlib.util.find_spec(module) is not None for module in self.requires)
+    
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        """逐块产出文本"""
+        raise NotImplementedError
+    
+    def extract(self, file_path: str, max_chars: int) -> str:
+        """
+        提取文件的前max_chars个字符
+        
+        Args:
+            file_path: 文件路径
+            max_chars: 字符预算
+        
+        Returns:
+            提取的文本
+        """
+        parts = []
+        length = 0
+        for chunk in self.iter_text(str(file_path)):
+            check_deadline()
+            if not chunk:
+                continue
+            parts.append(chunk)
+            length += len(chunk)
+            if length >= max_chars:
+                break
+        return "".join(parts)[:max_chars]
+
+
+class TextExtractor(Extractor):
+    """纯文本（自动判断编码）"""
+    
+    name = "text"
+    label = "文本文件"
+    extensions = ('.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv',
+                  '.log', '.ini', '.yaml', '.yml', '.rst')
+    mime_types = ('text/*',)
+    
+    def extract(self, file_path: str, max_chars: int) -> str:
+        content = read_text_excerpt(str(file_path), max_chars)
+        if content is None:
+            raise BinaryContentError("文件内容为二进制格式，无法读取")
+        return content
+
+
+class PdfExtractor(Extractor):
+    """PDF（在提取进程中逐页解析）"""
+    
+    name = "pdf"
+    label = "PDF文件"
+    extensions = ('.pdf',)
+    mime_types = ('application/pdf',)
+    cost = COST_CPU
+    requires = ('PyPDF2',)
+    
+    def extract(self, file_path: str, max_chars: int, max_pages: Optional[int] = None) -> str:
+        return get_document_extractor().extract(file_path, max_chars, max_pages=max_pages)
+
+
+class DocxExtractor(Extractor):
+    """Word文档（在提取进程中逐段解析）"""
+    
+    name = "docx"
+    label = "Word文档"
+    extensions = ('.docx', '.doc')
+    mime_types = ('application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                  'application/msword')
+    cost = COST_CPU
+    requires = ('docx',)
+    
+    def extract(self, file_path: str, max_chars: int) -> str:
+        try:
+            return get_document_extractor().extract(file_path, max_chars)
+        except Exception:
+            if str(file_path).lower().endswith('.doc'):
+                raise DocumentExtractionError("不支持.doc格式，请转换为.docx格式")
+            raise
+
+
+class ZipXmlExtractor(Extractor):
+    """zip包中XML文档的通用提取器：按顺序读取成员，逐个产出文本元素的内容"""
+    
+    cost = COST_CPU
+    # 视为一段文字的元素（不含命名空间）
+    paragraph_tags: tuple = ()
+    # 需要读取文字的元素
+    text_tags: tuple = ()
+    
+    def members(self, archive: zipfile.ZipFile) -> List[str]:
+        """按阅读顺序返回需要读取的成员"""
+        raise NotImplementedError
+    
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        with zipfile.ZipFile(file_path) as archive:
+            for member in self.members(archive):
+                with archive.open(member) as f:
+                    yield from self._iter_xml(f)
+    
+    def _iter_xml(self, source) -> Iterator[str]:
+        """流式解析XML，每段文字结束时产出"""
+        buffer = []
+        for event, element in ET.iterparse(source, events=('end',)):
+            tag = _local_name(element.tag)
+            if tag in self.text_tags and element.text:
+                buffer.append(element.text)
+            if tag in self.paragraph_tags:
+                if buffer:
+                    yield "".join(buffer).strip() + "\n"
+                    buffer = []
+                element.clear()
+        if buffer:
+            yield "".join(buffer).strip() + "\n"
+
+
+class XlsxExtractor(ZipXmlExtractor):
+    """Excel工作簿：工作表名和共享字符串（单元格中的文字）"""
+    
+    name = "xlsx"
+    label = "Excel表格"
+    extensions = ('.xlsx', '.xlsm')
+    mime_types = ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',)
+    paragraph_tags = ('si',)
+    text_tags = ('t',)
+    
+    def members(self, archive: zipfile.ZipFile) -> List[str]:
+        names = set(archive.namelist())
+        return [name for name in ('xl/sharedStrings.xml',) if name in names]
+    
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        with zipfile.ZipFile(file_path) as archive:
+            if 'xl/workbook.xml' in archive.namelist():
+                with archive.open('xl/workbook.xml') as f:
+                    sheets = [element.get('name') for _, element in ET.iterparse(f)
+                              if _local_name(element.tag) == 'sheet' and element.get('name')]
+                if sheets:
+                    yield "工作表: " + ", ".join(sheets) + "\n"
+            for member in self.members(archive):
+                with archive.open(member) as f:
+                    yield from self._iter_xml(f)
+
+
+class PptxExtractor(ZipXmlExtractor):
+    """PowerPoint演示文稿：按幻灯片顺序提取文字"""
+    
+    name = "pptx"
+    label = "PowerPoint演示文稿"
+    extensions = ('.pptx',)
+    mime_types = ('application/vnd.openxmlformats-officedocument.presentationml.presentation',)
+    paragraph_tags = ('p',)
+    text_tags = ('t',)
+    
+    def members(self, archive: zipfile.ZipFile) -> List[str]:
+        slides = [name for name in archive.namelist() if re.fullmatch(r'ppt/slides/slide\d+\.xml', name)]
+        return sorted(slides, key=lambda name: int(re.search(r'(\d+)\.xml$', name).group(1)))
+
+
+class OpenDocumentExtractor(ZipXmlExtractor):
+    """OpenDocument文本、表格和演示文稿（content.xml中的段落和标题）"""
+    
+    name = "opendocument"
+    label = "OpenDocument文档"
+    extensions = ('.odt', '.ods', '.odp')
+    mime_types = ('application/vnd.oasis.opendocument.text',
+                  'application/vnd.oasis.opendocument.spreadsheet',
+                  'application/vnd.oasis.opendocument.presentation')
+    paragraph_tags = ('p', 'h')
+    
+    def members(self, archive: zipfile.ZipFile) -> List[str]:
+        return ['content.xml'] if 'content.xml' in archive.namelist() else []
+    
+    def _iter_xml(self, source) -> Iterator[str]:
+        # OpenDocument的段落内有span、空格等子元素，取整段的全部文字
+        for event, element in ET.iterparse(source, events=('end',)):
+            if _local_name(element.tag) in self.paragraph_tags:
+                text = "".join(element.itertext()).strip()
+                if text:
+                    yield text + "\n"
+                element.clear()
+
+
+class _HTMLTextParser(HTMLParser):
+    """提取HTML正文文字（跳过script/style）"""
+    
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skip = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._skip += 1
+    
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self._skip:
+            self._skip -= 1
+        elif tag in ('p', 'div', 'br', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'tr'):
+            self.parts.append("\n")
+    
+    def handle_data(self, data):
+        if not self._skip and data.strip():
+            self.parts.append(data.strip())
+
+
+class EpubExtractor(Extractor):
+    """EPUB电子书：按目录顺序（spine）提取各章节正文"""
+    
+    name = "epub"
+    label = "EPUB电子书"
+    extensions = ('.epub',)
+    mime_types = ('application/epub+zip',)
+    cost = COST_CPU
+    
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        with zipfile.ZipFile(file_path) as archive:
+            for member in self._spine(archive):
+                parser = _HTMLTextParser()
+                with archive.open(member) as f:
+                    parser.feed(f.read().decode('utf-8', errors='replace'))
+                parser.close()
+                text = re.sub(r'\n\s*\n+', '\n', "".join(parser.parts)).strip()
+                if text:
+                    yield text + "\n"
+    
+    def _spine(self, archive: zipfile.ZipFile) -> List[str]:
+        """按container.xml找到OPF文件，返回spine中的章节路径"""
+        names = set(archive.namelist())
+        with archive.open('META-INF/container.xml') as f:
+            opf_path = next((element.get('full-path') for _, element in ET.iterparse(f)
+                             if _local_name(element.tag) == 'rootfile'), None)
+        if not opf_path or opf_path not in names:
+            return sorted(name for name in names if name.endswith(('.xhtml', '.html', '.htm')))
+        
+        root = ET.fromstring(archive.read(opf_path))
+        base = posixpath.dirname(opf_path)
+        manifest = {item.get('id'): item.get('href') for item in root.iter()
+                    if _local_name(item.tag) == 'item'}
+        chapters = []
+        for itemref in root.iter():
+            if _local_name(itemref.tag) == 'itemref':
+                href = manifest.get(itemref.get('idref'))
+                if href:
+                    path = posixpath.normpath(posixpath.join(base, href))
+                    if path in names:
+                        chapters.append(path)
+        return chapters
+
+
+class ImageExtractor(Extractor):
+    """图片：内容需要多模态模型分析，extract()只返回格式、尺寸等基本信息"""
+    
+    name = "image"
+    label = "图片文件"
+    extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp')
+    mime_types = ('image/*',)
+    cost = COST_AI
+    requires = ('PIL',)
+    
+    def extract(self, file_path: str, max_chars: int) -> str:
+        from PIL import Image
+        with Image.open(file_path) as img:
+            info = "图片文件信息:\n"
+            info += f"格式: {img.format}\n"
+            info += f"尺寸: {img.size[0]} x {img.size[1]}\n"
+            info += f"模式: {img.mode}\n"
+            # 读取EXIF只解析文件头，不解码像素
+            if img.getexif():
+                info += "包含EXIF信息\n"
+        return info[:max_chars]
+
+
+class ExtractorRegistry:
+    """按扩展名和MIME类型查找提取器"""
+    
+    def __init__(self, extractors: Iterable[Extractor] = ()):
+        self.lock = threading.Lock()
+        self._by_extension: Dict[str, Extractor] = {}
+        self._by_mime: Dict[str, Extractor] = {}
+        for extractor in extractors:
+            self.register(extractor)
+    
+    def register(self, extractor: Extractor) -> None:
+        """注册提取器，已注册的扩展名和MIME类型会被覆盖"""
+        with self.lock:
+            for extension in extractor.extensions:
+                self._by_extension[extension.lower()] = extractor
+            for mime_type in extractor.mime_types:
+                self._by_mime[mime_type.lower()] = extractor
+    
+    def get(self, file_path: str, fallback: bool = False) -> Optional[Extractor]:
+        """
+        查找文件对应的提取器：先按扩展名，再按MIME类型（支持"text/*"这类通配）
+        
+        Args:
+            file_path: 文件路径
+            fallback: 没有匹配时是否返回文本提取器
+        
+        Returns:
+            提取器，没有匹配且fallback为False时返回None
+        """
+        extension = os.path.splitext(str(file_path))[1].lower()
+        with self.lock:
+            extractor = self._by_extension.get(extension)
+            if extractor is None:
+                mime_type, _ = mimetypes.guess_type(str(file_path), strict=False)
+                if mime_type:
+                    mime_type = mime_type.lower()
+                    extractor = self._by_mime.get(mime_type) or self._by_mime.get(mime_type.split('/')[0] + '/*')
+            if extractor is None and fallback:
+                extractor = self._by_extension.get('.txt')
+            return extractor
+    
+    def extensions(self, costs: Iterable[str] = None) -> List[str]:
+        """已注册的扩展名（可按开销类别筛选）"""
+        with self.lock:
+            return sorted(extension for extension, extractor in self._by_extension.items()
+                          if costs is None or extractor.cost in costs)
+    
+    def extract(self, file_path: str, max_chars: int) -> str:
+        """
+        用对应的提取器提取文件内容；没有匹配的提取器时按文本读取
+        
+        Raises:
+            BinaryContentError: 没有匹配的提取器且文件不是文本
+        """
+        return self.get(file_path, fallback=True).extract(file_path, max_chars)
+
+
+# 全局注册表
+_registry: Optional[ExtractorRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_extractor_registry() -> ExtractorRegistry:
+    """获取全局提取器注册表（首次调用时注册内置提取器）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ExtractorRegistry([
+                TextExtractor(), PdfExtractor(), DocxExtractor(), XlsxExtractor(),
+                PptxExtractor(), OpenDocumentExtractor(), EpubExtractor(), ImageExtractor(),
+            ])
+        return _registry
+
+
+def register_extractor(extractor: Extractor) -> None:
+    """向全局注册表注册提取器"""
+    get_extractor_registry().register(extractor)
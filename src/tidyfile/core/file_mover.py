@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行文件转移器
+
+将"分类"和"转移"两个阶段解耦：分类结果提交到有界队列，由I/O工作线程池完成转移，
+AI分类的等待时间和磁盘/网络I/O可以重叠。
+
+转移策略：
+1. 移动且源和目标在同一设备上时直接重命名，不复制数据
+2. 复制或跨设备移动时分块复制到临时文件，完成后再重命名为目标文件，避免留下半截文件
+3. 可选的校验：比较大小，开启verify时再比较MD5；跨设备移动只有校验通过才删除源文件
+4. 每个完成的转移都会记录到转移日志（如果提供了TransferLogManager）
+"""
+
+import os
+import queue
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# 默认分块大小（8MB）
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _file_md5(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """分块计算文件MD5"""
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _existing_ancestor(path: str) -> str:
+    """返回路径自身或最近的已存在上级目录"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def is_same_device(source_path: str, target_path: str) -> bool:
+    """判断源文件和目标位置是否在同一设备（文件系统）上"""
+    try:
+        return os.stat(source_path).st_dev == os.stat(_existing_ancestor(os.path.dirname(target_path))).st_dev
+    except OSError:
+        return False
+
+
+class ParallelFileMover:
+    """基于有界队列和I/O线程池的并行文件转移器"""
+    
+    def __init__(self, max_workers: int = 4, max_pending: int = 64,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, verify: bool = False,
+                 transfer_log_manager=None,
+                 on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None):
+        """
+        初始化文件转移器
+        
+        Args:
+            max_workers: I/O工作线程数
+            max_pending: 等待转移的任务数上限，队列满时submit会阻塞，形成背压
+            chunk_size: 复制时的分块大小（字节）
+            verify: 复制后是否用MD5校验目标文件（默认只比较大小）
+            transfer_log_manager: 转移日志管理器，需已调用start_transfer_session
+            on_complete: 每个任务完成后调用 on_complete(结果)，在工作线程中串行调用
+            cancel_event: 取消事件，设置后队列中尚未开始的任务直接丢弃，不产生结果
+        """
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.verify = verify
+        self.transfer_log_manager = transfer_log_manager
+        self.on_complete = on_complete
+        self.cancel_event = cancel_event
+        
+        self.queue = queue.Queue(maxsize=max(1, max_pending))
+        self.results: List[Dict[str, Any]] = []
+        self.stats = {'renamed': 0, 'copied': 0, 'failed': 0, 'bytes_copied': 0}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+    
+    def start(self) -> 'ParallelFileMover':
+        """启动工作线程"""
+        if not self._threads:
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._worker, name=f"file-mover-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+    
+    def submit(self, source_path: str, target_path: str, operation_type: str = 'copy',
+               target_folder: str = None, context: Any = None) -> None:
+        """
+        提交转移任务，队列满时阻塞直到有空位
+        
+        Args:
+            source_path: 源文件路径
+            target_path: 目标文件路径（已存在时会被覆盖）
+            operation_type: copy（保留源文件）或 move
+            target_folder: 目标文件夹名称，用于转移日志
+            context: 调用方附加数据，原样放入结果中
+        """
+        if operation_type not in ('copy', 'move'):
+            raise ValueError(f"不支持的操作类型: {operation_type}")
+        self.start()
+        self.queue.put({
+            'source_path': source_path,
+            'target_path': target_path,
+            'operation_type': operation_type,
+            'target_folder': target_folder,
+            'context': context
+        })
+    
+    def wait(self) -> List[Dict[str, Any]]:
+        """
+        等待所有已提交的任务完成并停止工作线程
+        
+        Returns:
+            转移结果列表（按完成顺序）
+        """
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        return self.results
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.wait()
+        return False
+    
+    def _worker(self) -> None:
+        """工作线程：从队列取任务执行转移"""
+        while True:
+            task = self.queue.get()
+            if task is None:
+                break
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                continue
+            result = self._transfer(task)
+            with self._lock:
+                self.results.append(result)
+                self._log_result(result)
+                if self.on_complete is not None:
+                    try:
+                        self.on_complete(result)
+                    except Exception as e:
+                        logging.warning(f"转移完成回调失败: {e}")
+    
+    def _transfer(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """执行单个转移任务"""
+        source_path = task['source_path']
+        target_path = task['target_path']
+        result = dict(task, success=False, method=None, error=None, file_size=None, md5=None)
+        
+        try:
+            result['file_size'] = os.path.getsize(source_path)
+            os.makedirs(os.path.dirname(target_path) or '.', exist_ok=True)
+            
+            if task['operation_type'] == 'move' and is_same_device(source_path, target_path):
+                os.replace(source_path, target_path)
+                result['method'] = 'rename'
+                with self._lock:
+                    self.stats['renamed'] += 1
+            else:
+                result['md5'] = self._copy_and_verify(source_path, target_path)
+                result['method'] = 'copy'
+                if task['operation_type'] == 'move':
+                    os.remove(source_path)
+                with self._lock:
+                    self.stats['copied'] += 1
+                    self.stats['bytes_copied'] += result['file_size']
+            
+            result['success'] = True
+        except Exception as e:
+            result['error'] = str(e)
+            with self._lock:
+                self.stats['failed'] += 1
+            logging.error(f"文件转移失败 {source_path} -> {target_path}: {e}")
+        
+        return result
+    
+    def _copy_and_verify(self, source_path: str, target_path: str) -> Optional[str]:
+        """
+        分块复制到临时文件，校验后重命名为目标文件
+        
+        Returns:
+            开启verify时返回源文件MD5，否则返回None
+        """
+        temp_path = f"{target_path}.{threading.get_ident()}.part"
+        source_md5 = hashlib.md5() if self.verify else None
+        try:
+            with open(source_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(self.chunk_size), b''):
+                    dst.write(chunk)
+                    if source_md5 is not None:
+                        source_md5.update(chunk)
+            shutil.copystat(source_path, temp_path)
+            
+            if os.path.getsize(temp_path) != os.path.getsize(source_path):
+                raise IOError("复制后文件大小不一致")
+            if source_md5 is not None and _file_md5(temp_path, self.chunk_size) != source_md5.hexdigest():
+                raise IOError("复制后文件MD5校验失败")
+            
+            os.replace(temp_path, target_path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        
+        return source_md5.hexdigest() if source_md5 is not None else None
+    
+    def _log_result(self, result: Dict[str, Any]) -> None:
+        """将转移结果记录到转移日志（调用方持有锁）"""
+        if self.transfer_log_manager is None or not self.transfer_log_manager.current_log_file:
+            return
+        try:
+            self.transfer_log_manager.log_transfer_operation(
+                source_path=result['source_path'],
+                target_path=result['target_path'],
+                operation_type=result['operation_type'],
+                target_folder=result['target_folder'],
+                success=result['success'],
+                error_message=result['error'],
+                file_size=result['file_size'],
+                md5=result['md5']
+            )
+        except Exception as e:
+            logging.warning(f"记录转移日志失败: {e}")
@@ -24,7 +24,7 @@
 
 支持的文件格式:
     - 文本文件: .txt, .md, .py, .js, .html, .css, .json, .xml, .csv
-    - 文档文件: .pdf, .docx, .doc
+    - 文档文件: .pdf, .docx, .doc, .xlsx, .pptx, .epub, .odt, .ods, .odp
     - 图片文件: .jpg, .jpeg, .png, .bmp, .gif, .tiff, .webp
 
 功能说明:
@@ -38,11 +38,8 @@
 创建时间: 2025-01-15
 更新时间: 2025-07-27
 """
-import concurrent.futures
 import os
-import sys
 import logging
-import base64
 import time
 import json
 from pathlib import Path
@@ -50,34 +47,13 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 from io import BytesIO
 
-# 第三方库导入
-try:
-    import PyPDF2
-    # 兼容新版本PyPDF2
-    from PyPDF2 import PdfReader, PdfWriter
-except ImportError:
-    print("请安装PyPDF2库: pip install PyPDF2")
-    sys.exit(1)
-
-try:
-    import docx
-    from docx import Document
-except ImportError:
-    print("请安装python-docx库: pip install python-docx")
-    sys.exit(1)
-
-try:
-    from PIL import Image
-    # 兼容新版本Pillow
-    try:
-        from PIL import ImageDraw, ImageFont
-    except ImportError:
-        pass
-except ImportError:
-    print("请安装Pillow库: pip install Pillow")
-    sys.exit(1)
-
 from tidyfile.ai.client_manager import chat_with_ai
+from tidyfile.core.extractors import DocumentExtractionError, get_extractor_registry
+from tidyfile.core.image_preprocessing import image_to_model_base64
+from tidyfile.utils.deadline import DeadlineExceeded, deadline_scope
+
+# 单个文件解读（提取内容 + 生成摘要）的时间限制（秒）
+SUMMARY_TIMEOUT_SECONDS = 180
 
 
 class FileReaderError(Exception):
@@ -98,6 +74,8 @@ class FileReader:
         """
         self.model_name = model_name
         self.summary_length = 200  # 默认摘要长度
+        # 各提取器的额外参数：PDF只读取前3页
+        self.extract_options = {'pdf': {'max_pages': 3}}
         # 多模态模型列表（支持图像处理的模型）- 根据官方文档更新
         self.multimodal_models = ['llava', 'llava-llama3', 'llava-phi3', 'moondream', 
                                  'bakllava', 'llama3.2-vision', 'qwen2-vl', 'qwen-vl',
@@ -228,175 +206,44 @@ class FileReader:
             file_extension = file_path.suffix.lower()
             logging.info(f"正在提取文件内容: {file_path.name} (类型: {file_extension})")
             
-            # 根据文件类型选择不同的提取方法
-            if file_extension == '.pdf':
-                return self._extract_pdf_content(file_path, max_length)
-            elif file_extension in ['.docx', '.doc']:
-                return self._extract_docx_content(file_path, max_length)
-            elif file_extension in ['.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv']:
-                return self._extract_text_content(file_path, max_length)
-            elif file_extension in ['.jpg', '.jpeg', '.png', '.bmp', '.gif']:
-                return self._extract_image_info(file_path)
-            else:
-                # 尝试作为文本文件读取
-                return self._extract_text_content(file_path, max_length)
+            # 按扩展名（或MIME类型）查找提取器，没有匹配时按文本读取
+            extractor = get_extractor_registry().get(file_path, fallback=True)
+            try:
+                content = extractor.extract(file_path, max_length, **self.extract_options.get(extractor.name, {}))
+            except DocumentExtractionError as e:
+                # 二进制文件、.doc格式、提取超时等
+                return str(e)
+            except Exception as e:
+                return f"{extractor.label}读取失败: {str(e)}"
+            return content[:max_length] if content.strip() else f"{extractor.label}内容为空或无法提取"
                 
         except Exception as e:
             logging.error(f"提取文件内容失败: {e}")
             return f"无法提取文件内容: {str(e)}"
     
-    def _extract_pdf_content(self, file_path: Path, max_length: int) -> str:
-        """提取PDF文件内容"""
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                content = ""
-                
-                # 读取前几页内容
-                for page_num in range(min(3, len(pdf_reader.pages))):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
-                    
-                    if len(content) >= max_length:
-                        break
-                
-                return content[:max_length] if content else "PDF文件内容为空或无法提取"
-                
-        except Exception as e:
-            return f"PDF文件读取失败: {str(e)}"
-    
-    def _extract_docx_content(self, file_path: Path, max_length: int) -> str:
-        """提取Word文档内容"""
-        try:
-            # 检查文件是否存在且可读
-            if not file_path.exists():
-                return "文件不存在"
-            
-            if not file_path.is_file():
-                return "路径不是文件"
-            
-            # 检查文件大小
-            file_size = file_path.stat().st_size
-            if file_size == 0:
-                return "文件为空"
-            
-            # 尝试读取Word文档
-            try:
-                doc = Document(file_path)
-                content = ""
-                
-                # 提取段落内容
-                for paragraph in doc.paragraphs:
-                    if paragraph.text.strip():  # 跳过空段落
-                        content += paragraph.text.strip() + "\n"
-                        if len(content) >= max_length:
-                            break
-                
-                # 如果段落内容为空，尝试提取表格内容
-                if not content.strip():
-                    for table in doc.tables:
-                        for row in table.rows:
-                            for cell in row.cells:
-                                if cell.text.strip():
-                                    content += cell.text.strip() + " "
-                        content += "\n"
-                        if len(content) >= max_length:
-                            break
-                
-                return content[:max_length].strip() if content.strip() else "Word文档内容为空或无法提取"
-                
-            except Exception as docx_error:
-                # 如果是.doc文件或损坏的.docx文件，尝试其他方法
-                if file_path.suffix.lower() == '.doc':
-                    return "不支持.doc格式，请转换为.docx格式"
-                else:
-                    return f"Word文档格式错误或文件损坏: {str(docx_error)}"
-            
-        except Exception as e:
-            return f"Word文档读取失败: {str(e)}"
-    
-    def _extract_text_content(self, file_path: Path, max_length: int) -> str:
-        """提取文本文件内容"""
-        try:
-            # 尝试多种编码格式
-            encodings = ['utf-8', 'gbk', 'gb2312', 'latin-1']
-            
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-                        content = f.read(max_length)
-                        
-                        # 检查内容是否可读
-                        printable_ratio = sum(1 for c in content if c.isprintable() or c.isspace()) / len(content) if content else 0
-                        if printable_ratio > 0.7:
-                            return content
-                        
-                except Exception:
-                    continue
-            
-            return "文件内容为二进制格式，无法读取"
-            
-        except Exception as e:
-            return f"文本文件读取失败: {str(e)}"
-    
-    def _extract_image_info(self, file_path: Path) -> str:
-        """提取图片文件信息"""
-        try:
-            with Image.open(file_path) as img:
-                info = f"图片文件信息:\n"
-                info += f"格式: {img.format}\n"
-                info += f"尺寸: {img.size[0]} x {img.size[1]}\n"
-                info += f"模式: {img.mode}\n"
-                
-                # 如果有EXIF信息，提取一些基本信息
-                if hasattr(img, '_getexif') and img._getexif():
-                    info += "包含EXIF信息\n"
-                
-                return info
-                
-        except Exception as e:
-            return f"图片文件信息提取失败: {str(e)}"
-    
     def _image_to_base64(self, file_path: Path) -> str:
-        """将图片转换为base64编码"""
+        """将图片缩小后转换为base64编码"""
         try:
             # 检查文件是否存在
             if not file_path.exists():
                 logging.error(f"图片文件不存在: {file_path}")
                 return ""
             
-            # 检查文件大小（避免过大的图片）
-            file_size = file_path.stat().st_size
-            max_size = 10 * 1024 * 1024  # 10MB限制
-            if file_size > max_size:
-                logging.error(f"图片文件过大: {file_size} bytes > {max_size} bytes")
-                return ""
-            
             # 验证图片格式
             supported_formats = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']
             if file_path.suffix.lower() not in supported_formats:
                 logging.error(f"不支持的图片格式: {file_path.suffix}")
                 return ""
             
-            # 尝试用PIL验证图片
+            # 解码一次并缩小到模型使用的分辨率，重新编码为JPEG（按内容指纹缓存）
             try:
-                with Image.open(file_path) as img:
-                    # 验证图片可以正常打开
-                    img.verify()
+                encoded_string = image_to_model_base64(str(file_path), self.model_name)
             except Exception as img_error:
                 logging.error(f"图片文件损坏或格式错误: {img_error}")
                 return ""
             
-            # 读取并编码图片
-            with open(file_path, 'rb') as image_file:
-                image_data = image_file.read()
-                if not image_data:
-                    logging.error("图片文件为空")
-                    return ""
-                
-                encoded_string = base64.b64encode(image_data).decode('utf-8')
-                logging.info(f"图片转base64成功，编码长度: {len(encoded_string)}")
-                return encoded_string
+            logging.info(f"图片转base64成功，编码长度: {len(encoded_string)}")
+            return encoded_string
                 
         except Exception as e:
             logging.error(f"图片转base64失败: {e}")
@@ -670,15 +517,11 @@ class FileReader:
                 }
             }
         
-        # 超时控制
-        def _inner_summary():
-            return self._generate_summary_inner(file_path, max_summary_length)
-        
+        # 超时控制：在当前线程中执行，截止时间传递到AI请求，到期后立即停止
         try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(_inner_summary)
-                return future.result(timeout=180)  # 3分钟超时
-        except concurrent.futures.TimeoutError:
+            with deadline_scope(SUMMARY_TIMEOUT_SECONDS):
+                return self._generate_summary_inner(file_path, max_summary_length)
+        except DeadlineExceeded:
             logging.error(f"文件处理超时: {file_path}")
             return {
                 'file_path': file_path,
@@ -765,7 +608,7 @@ class FileReader:
                     else:
                         # 没有可用的多模态模型，提取图像基本信息
                         logging.warning("没有可用的多模态模型，仅提取图像基本信息")
-                        image_info = self._extract_image_info(file_path_obj)
+                        image_info = self.extract_file_content(file_path)
                         summary = f"图像文件基本信息: {image_info}"
                         result['extracted_text'] = "[图像文件，无文本内容]"
             else:
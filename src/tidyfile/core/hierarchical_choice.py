@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+一次调用完成的层级选择
+
+逐层推荐标签或匹配目录时，每一层都要调用一次模型，每次都重复发送文件名、摘要和路径。
+这里把裁剪后的候选子树一次性交给模型，要求模型以JSON返回完整路径：
+    {"path": ["一级", "二级", "三级"]}
+返回的路径沿前缀树逐级校验，格式不对或路径不存在时由调用方退回逐层调用。
+"""
+
+import re
+import json
+from typing import List, Optional
+
+from tidyfile.core.chain_tag_trie import ChainTagTrie
+from tidyfile.core.embedding_index import preselect_candidates
+
+# 一次交给模型的候选路径数上限（含中间层级）
+ONE_SHOT_MAX_PATHS = 150
+
+
+def prune_candidate_paths(tree: ChainTagTrie, query: str, max_level: int,
+                          max_paths: int = ONE_SHOT_MAX_PATHS) -> List[List[str]]:
+    """
+    裁剪候选子树
+    
+    候选路径不超过max_paths时全部保留；否则按与查询文本的向量相似度选出前max_paths个，
+    向量化不可用时按使用次数（相同时层级浅的优先）选取。选中路径的上级路径一并保留，
+    保证结果仍是一棵从一级开始的树。
+    
+    Args:
+        tree: 候选前缀树
+        query: 查询文本（文件名 + 摘要）
+        max_level: 最多展开的层数
+        max_paths: 保留的路径数上限
+    
+    Returns:
+        按树的先序排列的路径列表
+    """
+    prefixes = list(tree.iter_prefixes(max_level))
+    if len(prefixes) > max_paths:
+        paths = [path for path, _ in prefixes]
+        texts = ["/".join(path) for path in paths]
+        selected, _, _ = preselect_candidates(query, texts, top_k=max_paths)
+        if len(selected) > max_paths:
+            ranked = sorted(prefixes, key=lambda item: (-item[1], len(item[0])))
+            selected = ["/".join(path) for path, _ in ranked[:max_paths]]
+        keep = set()
+        for text in selected:
+            parts = text.split("/")
+            for end in range(1, len(parts) + 1):
+                keep.add(tuple(parts[:end]))
+        prefixes = [(path, count) for path, count in prefixes if tuple(path) in keep]
+    return [path for path, _ in prefixes]
+
+
+def render_candidate_tree(paths: List[List[str]]) -> str:
+    """把先序排列的路径渲染为缩进的树（每级缩进两个空格）"""
+    return "\n".join("  " * (len(path) - 1) + path[-1] for path in paths)
+
+
+def parse_path_response(response: str) -> Optional[List[str]]:
+    """
+    解析模型返回的JSON路径
+    
+    Returns:
+        各级名称列表（空列表表示模型认为没有合适的路径），无法解析时返回None
+    """
+    if not response:
+        return None
+    json_match = re.search(r'\{.*\}', response, re.DOTALL)
+    if not json_match:
+        return None
+    try:
+        result = json.loads(json_match.group(0))
+    except json.JSONDecodeError:
+        return None
+    path = result.get("path") if isinstance(result, dict) else None
+    if isinstance(path, str):
+        path = re.split(r'[/\\]', path)
+    if not isinstance(path, list) or not all(isinstance(part, str) for part in path):
+        return None
+    return [part.strip() for part in path if part.strip()]
+
+
+def validate_path(tree: ChainTagTrie, path: List[str], max_level: int = None) -> bool:
+    """校验路径是否从一级开始沿前缀树存在（且不超过max_level级）"""
+    if not path or (max_level is not None and len(path) > max_level):
+        return False
+    return tree.find(path) is not None
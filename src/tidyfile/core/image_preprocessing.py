@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多模态模型的图片预处理
+
+原先图片原样base64编码后放进请求，一张手机照片就是十几MB的JSON请求体，而视觉模型
+实际只使用几百到一千多像素的分辨率，多出的像素只会增加上传时间和模型的预填充时间。
+本模块：
+1. 只解码一次图片（JPEG解码时直接按目标尺寸缩小），按EXIF方向旋转
+2. 缩小到模型实际使用的分辨率，重新编码为JPEG。AI模型配置中的image_max_edge优先，
+   未配置时按模型名称查MODEL_MAX_EDGE
+3. 按文件内容指纹把缩略图缓存到应用缓存目录，同一图片再次分析时直接使用
+"""
+
+import os
+import re
+import time
+import base64
+import logging
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+from tidyfile.core.document_extraction import content_fingerprint
+
+# 未配置且名称无法识别的模型使用的最长边（像素）
+DEFAULT_MAX_EDGE = 1024
+# 各模型使用的最长边（模型配置未指定image_max_edge时使用）。按模型名称包含的关键字匹配，
+# 匹配时忽略标点，关键字越长越优先
+MODEL_MAX_EDGE = {
+    'llava': 672,
+    'bakllava': 672,
+    'moondream': 378,
+    'llama3.2-vision': 1120,
+    'qwen2-vl': 1280,
+    'qwen2.5-vl': 1280,
+    'qwen3-vl': 1280,
+    'qwen-vl': 896,
+    'gemma3': 896,
+    'minicpm-v': 1344,
+    'cogvlm2': 1344,
+}
+# 重新编码的JPEG质量
+JPEG_QUALITY = 85
+# 不超过目标尺寸且小于该大小的JPEG直接使用原文件
+PASSTHROUGH_BYTES = 512 * 1024
+# 可处理的原图大小上限
+MAX_SOURCE_BYTES = 64 * 1024 * 1024
+# 缩略图缓存的总大小上限
+DEFAULT_CACHE_BYTES = 200 * 1024 * 1024
+
+
+# 已提示过使用默认尺寸的模型名称
+_default_edge_models = set()
+
+
+def _normalize_model_name(name: str) -> str:
+    """去掉模型名称中的标点，qwen2.5vl和qwen2.5-vl按同一个名称匹配"""
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def _get_configured_model(model_name: Optional[str]):
+    """获取AI模型配置，AI管理器不可用时返回None"""
+    try:
+        from tidyfile.ai.client_manager import get_ai_manager
+        return get_ai_manager().get_image_model_config(model_name)
+    except Exception as e:
+        logging.warning(f"读取AI模型配置失败，按模型名称确定图片尺寸: {e}")
+        return None
+
+
+def get_model_max_edge(model_name: Optional[str]) -> int:
+    """
+    获取模型使用的图片最长边
+    
+    Args:
+        model_name: 模型名称，None时使用优先级最高的可用模型
+    
+    Returns:
+        模型配置的image_max_edge；未配置时按模型名称查MODEL_MAX_EDGE，都没有时返回DEFAULT_MAX_EDGE
+    """
+    model = _get_configured_model(model_name)
+    if model is not None and model.image_max_edge > 0:
+        return model.image_max_edge
+    
+    name = model_name or (model.model_name if model is not None else "")
+    normalized = _normalize_model_name(name)
+    for keyword in sorted(MODEL_MAX_EDGE, key=lambda k: len(_normalize_model_name(k)), reverse=True):
+        if _normalize_model_name(keyword) in normalized:
+            return MODEL_MAX_EDGE[keyword]
+    
+    if name not in _default_edge_models:
+        _default_edge_models.add(name)
+        logging.info(f"模型 {name or '(未知)'} 没有配置图片尺寸，使用默认最长边{DEFAULT_MAX_EDGE}px，"
+                     f"可在AI模型配置中设置image_max_edge")
+    return DEFAULT_MAX_EDGE
+
+
+def encode_image(file_path: str, max_edge: int, quality: int = JPEG_QUALITY) -> bytes:
+    """
+    解码图片并缩小到最长边不超过max_edge，编码为JPEG
+    
+    Args:
+        file_path: 图片路径
+        max_edge: 最长边（像素）
+        quality: JPEG质量
+    
+    Returns:
+        JPEG数据
+    
+    Raises:
+        图片损坏或格式不支持时抛出PIL的异常
+    """
+    # 在用到时才导入Pillow，导入本模块不加载图片库
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise ImportError("请安装Pillow库: pip install Pillow")
+    with Image.open(file_path) as img:
+        if img.format == 'JPEG' and max(img.size) <= max_edge and os.path.getsize(file_path) <= PASSTHROUGH_BYTES:
+            img.verify()
+            with open(file_path, 'rb') as f:
+                return f.read()
+        
+        # JPEG按DCT缩放解码，大照片不必解码全尺寸
+        img.draft('RGB', (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            # JPEG没有透明通道，透明部分填白色
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel('A'))
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+        return buffer.getvalue()
+
+
+class ImageThumbnailCache:
+    """按内容指纹缓存的缩略图（磁盘），超过总大小时淘汰最久未使用的"""
+    
+    def __init__(self, cache_dir=None, max_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        初始化缩略图缓存
+        
+        Args:
+            cache_dir: 缓存目录，默认为应用缓存目录下的thumbnails
+            max_bytes: 缓存总大小上限
+        """
+        if cache_dir is None:
+            try:
+                from tidyfile.utils.app_paths import get_app_paths
+                cache_dir = get_app_paths().cache_dir / "thumbnails"
+            except ImportError:
+                cache_dir = Path("cache") / "thumbnails"
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'encoded': 0, 'evicted': 0}
+    
+    def get_thumbnail(self, file_path: str, max_edge: int, quality: int = JPEG_QUALITY) -> bytes:
+        """
+        获取图片的缩略图（JPEG），缓存中没有时生成并缓存
+        
+        Args:
+            file_path: 图片路径
+            max_edge: 最长边（像素）
+            quality: JPEG质量
+        
+        Returns:
+            JPEG数据
+        """
+        file_path = str(file_path)
+        cache_file = self.cache_dir / f"{content_fingerprint(file_path)}_{max_edge}_{quality}.jpg"
+        try:
+            data = cache_file.read_bytes()
+            os.utime(cache_file)
+            with self.lock:
+                self.stats['hits'] += 1
+            return data
+        except OSError:
+            pass
+        
+        data = encode_image(file_path, max_edge, quality)
+        with self.lock:
+            self.stats['encoded'] += 1
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = cache_file.with_suffix(f".{threading.get_ident()}.tmp")
+            temp_file.write_bytes(data)
+            os.replace(temp_file, cache_file)
+            self._prune()
+        except OSError as e:
+            logging.warning(f"写入缩略图缓存失败: {e}")
+        return data
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self.lock:
+            for cache_file in self.cache_dir.glob("*.jpg"):
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    pass
+    
+    def _prune(self) -> None:
+        """总大小超过上限时按最后使用时间淘汰"""
+        with self.lock:
+            entries = []
+            total = 0
+            for cache_file in self.cache_dir.glob("*.jpg"):
+                try:
+                    stat = cache_file.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, cache_file))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, cache_file in sorted(entries):
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    continue
+                total -= size
+                self.stats['evicted'] += 1
+                if total <= self.max_bytes:
+                    break
+
+
+# 全局缩略图缓存
+_thumbnail_cache: Optional[ImageThumbnailCache] = None
+_thumbnail_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ImageThumbnailCache:
+    """获取全局缩略图缓存实例"""
+    global _thumbnail_cache
+    with _thumbnail_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ImageThumbnailCache()
+        return _thumbnail_cache
+
+
+def image_to_model_base64(file_path: str, model_name: Optional[str] = None, max_edge: int = None) -> str:
+    """
+    把图片处理为适合多模态模型的base64编码JPEG
+    
+    Args:
+        file_path: 图片路径
+        model_name: 模型名称，用于确定缩小到的尺寸
+        max_edge: 指定最长边，None时按模型配置确定
+    
+    Returns:
+        base64编码的JPEG数据
+    """
+    if os.path.getsize(file_path) > MAX_SOURCE_BYTES:
+        raise ValueError(f"图片文件过大: {os.path.getsize(file_path)} bytes > {MAX_SOURCE_BYTES} bytes")
+    start = time.time()
+    edge = max_edge or get_model_max_edge(model_name)
+    data = get_thumbnail_cache().get_thumbnail(file_path, edge)
+    logging.info(f"图片预处理完成: 最长边{edge}px，{os.path.getsize(file_path)} -> {len(data)} bytes，"
+                 f"耗时{time.time() - start:.2f}秒")
+    return base64.b64encode(data).decode('utf-8')
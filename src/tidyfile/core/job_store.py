@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可恢复的作业状态存储
+
+大批量解读和分类任务中途崩溃或被关闭后，重新运行时按已记录的状态从中断处继续，
+不对已完成的文件重复做去重查询、摘要生成和分类。
+
+每个作业一个目录（应用数据目录下的 data/jobs/<作业ID>/）:
+    meta.json       作业信息：类型、文件夹、参数、状态、游标
+    files.txt       扫描得到的文件列表，每行一个路径；恢复时与重新扫描的结果合并
+    events.jsonl    追加式事件，每行记录一个文件完成或失败
+
+作业ID由作业类型、文件夹、参数和模型决定，同一文件夹的同一种作业重新运行时自动找到上次的状态，
+换用其他模型时作为新作业重新处理。
+失败的文件有重试次数上限，按指数退避安排下次重试时间；超过上限的文件不再重试。
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 作业状态
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_PARTIAL = "partial"      # 已跑完一轮，但还有等待重试的失败文件
+JOB_STATUS_COMPLETED = "completed"
+
+# 失败重试策略：第n次失败后等待 RETRY_BASE_SECONDS * 2^(n-1) 秒，最长 RETRY_MAX_SECONDS
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
+# 每累计多少条事件同步一次到磁盘
+FSYNC_EVERY = 50
+
+
+def retry_delay(attempts: int) -> float:
+    """第attempts次失败后的退避时间（秒）"""
+    return min(RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)), RETRY_MAX_SECONDS)
+
+
+def make_job_id(kind: str, folder_path: str, params: Dict[str, Any] = None, model_name: str = None) -> str:
+    """根据作业类型、文件夹、参数和模型生成稳定的作业ID"""
+    key = json.dumps([kind, os.path.abspath(folder_path), params or {}, model_name or ""],
+                     sort_keys=True, ensure_ascii=False)
+    return f"{kind}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+
+
+class JobStore:
+    """单个作业的持久化状态"""
+    
+    def __init__(self, job_dir, kind: str = "", folder_path: str = "", params: Dict[str, Any] = None,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        打开（或创建）作业状态目录
+        
+        Args:
+            job_dir: 作业目录
+            kind: 作业类型，如 read
+            folder_path: 作业处理的文件夹
+            params: 影响处理结果的参数（如摘要长度）
+            max_attempts: 单个文件的最大尝试次数
+        """
+        self.job_dir = Path(job_dir)
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self.meta_file = self.job_dir / "meta.json"
+        self.files_file = self.job_dir / "files.txt"
+        self.events_file = self.job_dir / "events.jsonl"
+        self.max_attempts = max_attempts
+        
+        self.lock = threading.Lock()
+        self._events_handle = None
+        self._unsynced = 0
+        
+        self.meta = self._read_meta() or {
+            "job_id": self.job_dir.name,
+            "kind": kind,
+            "folder_path": folder_path,
+            "params": params or {},
+            "status": JOB_STATUS_RUNNING,
+            "created_at": time.time(),
+            "cursor": 0
+        }
+        self.done = set()
+        self.failures: Dict[str, Dict[str, Any]] = {}  # 路径 -> {attempts, next_retry, error}
+        self._load_events()
+    
+    # ---- 文件列表 ----
+    
+    def has_files(self) -> bool:
+        """是否已保存扫描结果"""
+        return self.files_file.exists()
+    
+    def save_files(self, files: List[str]) -> None:
+        """保存扫描得到的文件列表（原子写入）"""
+        temp_file = self.files_file.with_suffix(".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for file_path in files:
+                f.write(file_path + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.files_file)
+        self.meta["total_files"] = len(files)
+        self._write_meta()
+    
+    def load_files(self) -> List[str]:
+        """读取保存的文件列表"""
+        with open(self.files_file, 'r', encoding='utf-8') as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+    
+    def merge_files(self, scanned: List[str]) -> List[str]:
+        """
+        把重新扫描的结果合并到保存的文件列表：保留仍存在的文件的原有顺序，
+        新增的文件追加到末尾，已不存在的文件移除
+        
+        Args:
+            scanned: 重新扫描得到的文件列表
+        
+        Returns:
+            合并后的文件列表（已保存）
+        """
+        scanned_set = set(scanned)
+        saved = [file_path for file_path in self.load_files() if file_path in scanned_set]
+        saved_set = set(saved)
+        added = [file_path for file_path in scanned if file_path not in saved_set]
+        files = saved + added
+        if added or len(saved) != self.meta.get("total_files"):
+            # 列表变化后游标失效，从头按完成集合跳过
+            self.meta["cursor"] = 0
+            self.save_files(files)
+            logging.info(f"作业 {self.job_dir.name} 合并扫描结果: 新增 {len(added)} 个文件，共 {len(files)} 个")
+        return files
+    
+    # ---- 进度 ----
+    
+    def iter_pending(self, files: List[str], now: float = None) -> Iterator[str]:
+        """
+        按扫描顺序列出需要处理的文件：从游标处开始，跳过已完成、重试次数用尽
+        和尚未到重试时间的文件
+        """
+        now = time.time() if now is None else now
+        for file_path in files[self.meta.get("cursor", 0):]:
+            if file_path in self.done:
+                continue
+            failure = self.failures.get(file_path)
+            if failure is not None and (failure["attempts"] >= self.max_attempts or failure["next_retry"] > now):
+                continue
+            yield file_path
+    
+    def mark_done(self, file_path: str) -> None:
+        """记录文件已完成"""
+        with self.lock:
+            self.done.add(file_path)
+            self.failures.pop(file_path, None)
+            self._append_event({"f": file_path, "s": "done"})
+    
+    def mark_failed(self, file_path: str, error: str = "") -> Dict[str, Any]:
+        """
+        记录文件失败，安排下次重试
+        
+        Returns:
+            失败记录：attempts、next_retry、error
+        """
+        with self.lock:
+            attempts = self.failures.get(file_path, {}).get("attempts", 0) + 1
+            failure = {"attempts": attempts, "next_retry": time.time() + retry_delay(attempts), "error": error}
+            self.failures[file_path] = failure
+            self._append_event({"f": file_path, "s": "failed", "a": attempts,
+                                "n": failure["next_retry"], "e": error})
+            return failure
+    
+    def get_progress(self) -> Dict[str, int]:
+        """统计已完成、等待重试和放弃的文件数"""
+        with self.lock:
+            exhausted = sum(1 for failure in self.failures.values() if failure["attempts"] >= self.max_attempts)
+            return {
+                "total_files": self.meta.get("total_files", 0),
+                "done": len(self.done),
+                "retrying": len(self.failures) - exhausted,
+                "exhausted": exhausted
+            }
+    
+    def checkpoint(self, files: List[str] = None) -> None:
+        """同步事件到磁盘，并把游标推进到第一个未完成的文件"""
+        with self.lock:
+            self._sync_events()
+            if files is not None:
+                cursor = self.meta.get("cursor", 0)
+                while cursor < len(files) and files[cursor] in self.done:
+                    cursor += 1
+                self.meta["cursor"] = cursor
+            self.meta["updated_at"] = time.time()
+            self._write_meta()
+    
+    def finish(self, files: List[str]) -> str:
+        """
+        一轮处理结束：没有等待重试的失败文件时标记为完成，否则标记为部分完成
+        
+        Returns:
+            作业状态
+        """
+        progress = self.get_progress()
+        status = JOB_STATUS_PARTIAL if progress["retrying"] else JOB_STATUS_COMPLETED
+        self.meta["status"] = status
+        self.checkpoint(files)
+        self.close()
+        return status
+    
+    def close(self) -> None:
+        """关闭事件文件"""
+        with self.lock:
+            if self._events_handle is not None:
+                self._sync_events()
+                self._events_handle.close()
+                self._events_handle = None
+    
+    def discard(self) -> None:
+        """删除作业状态"""
+        self.close()
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+    
+    # ---- 内部方法 ----
+    
+    def _append_event(self, event: Dict[str, Any]) -> None:
+        """追加事件（调用方持有锁），每条都写入系统缓冲，每FSYNC_EVERY条同步一次"""
+        if self._events_handle is None:
+            self._events_handle = open(self.events_file, 'a', encoding='utf-8')
+        self._events_handle.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._events_handle.flush()
+        self._unsynced += 1
+        if self._unsynced >= FSYNC_EVERY:
+            self._sync_events()
+    
+    def _sync_events(self) -> None:
+        if self._events_handle is not None and self._unsynced:
+            os.fsync(self._events_handle.fileno())
+            self._unsynced = 0
+    
+    def _load_events(self) -> None:
+        """重放事件，重建完成集合和失败记录（容忍截断的最后一行）"""
+        if not self.events_file.exists():
+            return
+        with open(self.events_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                file_path = event.get("f")
+                if event.get("s") == "done":
+                    self.done.add(file_path)
+                    self.failures.pop(file_path, None)
+                elif event.get("s") == "failed":
+                    self.failures[file_path] = {"attempts": event.get("a", 1),
+                                                "next_retry": event.get("n", 0),
+                                                "error": event.get("e", "")}
+    
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+    
+    def _write_meta(self) -> None:
+        temp_file = self.meta_file.with_suffix(".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.meta_file)
+
+
+def get_jobs_dir() -> Path:
+    """作业状态根目录"""
+    try:
+        from tidyfile.utils.app_paths import get_app_paths
+        return get_app_paths().jobs_dir
+    except ImportError:
+        return Path("jobs")
+
+
+def open_job(kind: str, folder_path: str, params: Dict[str, Any] = None,
+             max_attempts: int = DEFAULT_MAX_ATTEMPTS, model_name: str = None) -> JobStore:
+    """
+    打开文件夹对应的作业状态：上次未完成（或有等待重试的文件）时继续使用，
+    上次已完成时重新开始。继续使用时调用方应重新扫描文件夹并用merge_files合并，
+    以包含中断后新增的文件
+    
+    Args:
+        kind: 作业类型
+        folder_path: 作业处理的文件夹
+        params: 影响处理结果的参数
+        max_attempts: 单个文件的最大尝试次数
+        model_name: 使用的模型，换模型时作为新作业
+    """
+    job_dir = get_jobs_dir() / make_job_id(kind, folder_path, params, model_name)
+    store = JobStore(job_dir, kind, folder_path, params, max_attempts)
+    if store.meta.get("status") == JOB_STATUS_COMPLETED:
+        store.discard()
+        store = JobStore(job_dir, kind, folder_path, params, max_attempts)
+    elif store.has_files():
+        progress = store.get_progress()
+        logging.info(f"恢复作业 {job_dir.name}: 已完成 {progress['done']}/{progress['total_files']}，"
+                     f"等待重试 {progress['retrying']}，已放弃 {progress['exhausted']}")
+    store.meta["model_name"] = model_name
+    store.meta["status"] = JOB_STATUS_RUNNING
+    return store
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    """列出所有保存的作业信息"""
+    jobs = []
+    jobs_dir = get_jobs_dir()
+    if not jobs_dir.exists():
+        return jobs
+    for meta_file in jobs_dir.glob("*/meta.json"):
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                jobs.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return sorted(jobs, key=lambda meta: meta.get("created_at", 0))
@@ -39,21 +39,14 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import ttkbootstrap as tb
-# 兼容新版本ttkbootstrap
-try:
-    from ttkbootstrap import Style, Window
-except ImportError:
-    pass
 from ttkbootstrap.constants import *
 import threading
 import time
-import json
 import os
 import logging
 import multiprocessing
-from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict
 import queue
 
 # 可选导入psutil，如果不可用则使用备用方法
@@ -64,120 +57,6 @@ except ImportError:
     PSUTIL_AVAILABLE = False
     print("警告: psutil库未安装，将使用备用方法获取系统信息")
 
-# 全局文件锁，防止多任务同时写入
-_result_file_lock = threading.Lock()
-
-class ProcessFileReader:
-    """进程级文件解读器，每个进程独立运行"""
-    
-    def __init__(self, process_id: int, model_name: str = None):
-        self.process_id = process_id
-        self.model_name = model_name
-        self.setup_logging()
-    
-    def setup_logging(self):
-        """设置日志记录"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format=f'%(asctime)s - Process-{self.process_id} - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler()
-            ]
-        )
-    
-    def process_file(self, file_path: str, summary_length: int = 200) -> Dict[str, Any]:
-        """处理单个文件"""
-        try:
-            from tidyfile.core.file_reader import FileReader
-            
-            # 初始化文件解读器
-            file_reader = FileReader(model_name=self.model_name)
-            file_reader.summary_length = summary_length
-            
-            # 生成摘要（确保指定结果文件路径以正确进行去重检查）
-            # 使用新的路径管理获取正确的文件路径
-        from tidyfile.utils.app_paths import get_app_paths
-        app_paths = get_app_paths()
-        ai_result_file = str(app_paths.ai_results_file)
-        
-        result = file_reader.generate_summary(file_path, summary_length, ai_result_file)
-            
-            # 添加进程信息
-            result['process_id'] = self.process_id
-            result['processing_time'] = time.time()
-            
-            return result
-            
-        except Exception as e:
-            logging.error(f"进程 {self.process_id} 处理文件失败: {file_path} - {e}")
-            return {
-                'file_path': file_path,
-                'file_name': Path(file_path).name,
-                'success': False,
-                'extracted_text': '',
-                'summary': '',
-                'error': str(e),
-                'model_used': self.model_name,
-                'timestamp': datetime.now().isoformat(),
-                'process_id': self.process_id,
-                'processing_time': time.time()
-            }
-
-def process_file_worker(process_id: int, file_queue: multiprocessing.Queue, result_queue: multiprocessing.Queue, 
-                       summary_length: int, model_name: str = None, working_dir: str = None):
-    """进程工作函数"""
-    try:
-        # 确保子进程在正确的工作目录下运行
-        if working_dir and os.path.exists(working_dir):
-            os.chdir(working_dir)
-            logging.info(f"进程 {process_id} 切换到工作目录: {working_dir}")
-        
-        # 初始化进程级文件解读器
-        reader = ProcessFileReader(process_id, model_name)
-        
-        while True:
-            try:
-                # 从队列获取文件路径
-                file_path = file_queue.get(timeout=1)
-                
-                # 检查是否为结束信号
-                if file_path == "STOP":
-                    break
-                
-                # 处理文件
-                result = reader.process_file(file_path, summary_length)
-                
-                # 将结果放入结果队列
-                result_queue.put(result)
-                
-            except queue.Empty:
-                # 队列超时，继续等待
-                continue
-            except Exception as e:
-                logging.error(f"进程 {process_id} 工作异常: {e}")
-                # 即使出现异常也要继续处理下一个文件
-                continue
-                
-    except Exception as e:
-        logging.error(f"进程 {process_id} 初始化失败: {e}")
-        # 发送错误结果到队列，确保主线程知道进程失败
-        try:
-            error_result = {
-                'file_path': '',
-                'file_name': '',
-                'success': False,
-                'extracted_text': '',
-                'summary': '',
-                'error': f'进程 {process_id} 初始化失败: {str(e)}',
-                'model_used': model_name,
-                'timestamp': datetime.now().isoformat(),
-                'process_id': process_id,
-                'processing_time': time.time()
-            }
-            result_queue.put(error_result)
-        except:
-            pass
-
 class MultiProcessFileReadTask:
     """多进程文件解读任务"""
     
@@ -201,11 +80,8 @@ class MultiProcessFileReadTask:
         self.error_message = ""
         self.stop_flag = False
         
-        # 多进程相关
-        self.processes = []
-        self.file_queue = None
-        self.result_queue = None
-        self.result_thread = None
+        # 解读作业（进程池由作业引擎管理）
+        self.job = None
         
         # 设置日志
         self.setup_logging()
@@ -252,118 +128,36 @@ class MultiProcessFileReadTask:
         logging.info(f"任务 {self.task_id} 已停止")
         self.gui_log("任务已停止")
         
-        # 停止所有进程
-        self._stop_processes()
-    
-    def _stop_processes(self):
-        """停止所有子进程"""
-        try:
-            # 发送停止信号到文件队列
-            if self.file_queue:
-                for _ in range(len(self.processes)):
-                    self.file_queue.put("STOP")
-            
-            # 等待进程结束
-            for process in self.processes:
-                if process.is_alive():
-                    process.terminate()
-                    process.join(timeout=5)
-                    if process.is_alive():
-                        process.kill()
-            
-            self.processes.clear()
-            
-        except Exception as e:
-            logging.error(f"停止进程失败: {e}")
-    
-    def _safe_append_result(self, result):
-        """安全地追加结果到文件，使用全局锁防止并发冲突"""
-        with _result_file_lock:
-            try:
-                from tidyfile.core.file_reader import FileReader
-                file_reader = FileReader()
-                # 使用文件解读器的安全写入方法，确保与multi_task_file_reader.py一致
-                # 使用新的路径管理获取正确的文件路径
-                from tidyfile.utils.app_paths import get_app_paths
-                app_paths = get_app_paths()
-                ai_result_file = str(app_paths.ai_results_file)
-                
-                file_reader.append_result_to_file(ai_result_file, result, self.folder_path)
-                return True
-            except Exception as e:
-                logging.error(f"任务 {self.task_id}: 写入结果失败: {e}")
-                return False
-    
-    def _result_processor(self):
-        """结果处理线程"""
-        try:
-            while not self.stop_flag:
-                try:
-                    # 从结果队列获取结果
-                    result = self.result_queue.get(timeout=1)
-                    
-                    # 检查处理状态
-                    processing_status = result.get('processing_status', '')
-                    
-                    if processing_status == '已跳过':
-                        # 完全重复的文件，跳过处理
-                        self.skipped_reads += 1
-                        logging.info(f"文件完全重复，跳过: {result['file_name']}")
-                        continue
-                    elif processing_status == '路径已更新':
-                        # 同名但路径不同的文件，复用摘要并更新路径
-                        self.path_updated_reads += 1
-                        logging.info(f"文件路径已更新: {result['file_name']}")
-                        # 使用安全写入方法
-                        self._safe_append_result(result)
-                        continue
-                    
-                    # 检查处理结果
-                    if result['success']:
-                        # 提取路径标签（如果不是路径更新情况）
-                        if not result.get('tags'):
-                            from tidyfile.core.file_reader import FileReader
-                            file_reader = FileReader()
-                            result['tags'] = file_reader.extract_path_tags(result['file_path'], self.folder_path)
-                        self.successful_reads += 1
-                        
-                        # 使用安全写入方法
-                        if self._safe_append_result(result):
-                            logging.info(f"文件解读成功: {result['file_name']} (进程: {result.get('process_id', 'N/A')})")
-                        else:
-                            logging.warning(f"文件解读成功但写入失败: {result['file_name']}")
-                    else:
-                        self.failed_reads += 1
-                        logging.warning(f"文件解读失败: {result['file_name']} - {result.get('error', '未知错误')}")
-                    
-                    # 更新进度
-                    self.processed_files += 1
-                    if self.total_files > 0:
-                        self.progress = (self.processed_files / self.total_files) * 100
-                    
-                except queue.Empty:
-                    # 队列超时，继续等待
-                    continue
-                except Exception as e:
-                    logging.error(f"结果处理异常: {e}")
-                    # 即使出现异常也要更新进度，避免卡死
-                    self.processed_files += 1
-                    self.failed_reads += 1
-                    if self.total_files > 0:
-                        self.progress = (self.processed_files / self.total_files) * 100
-                    continue
-                    
-        except Exception as e:
-            logging.error(f"结果处理线程异常: {e}")
-            # 确保任务状态正确更新
-            if not self.stop_flag:
-                self.status = "失败"
-                self.error_message = f"结果处理线程异常: {str(e)}"
+        # 尚未开始的文件不再处理，正在处理的文件完成后进程池退出
+        if self.job is not None:
+            self.job.cancel()
+    
+    def _on_progress(self, processed, total, filename):
+        """作业进度回调"""
+        self.current_file = filename
+        self.total_files = total
+        self.processed_files = processed
+        self.progress = (processed / total) * 100 if total > 0 else 0
+    
+    def _on_result(self, result, outcome):
+        """作业结果回调，同步各类计数"""
+        if outcome == 'success':
+            self.successful_reads += 1
+            logging.info(f"文件解读成功: {result.get('file_name')}")
+        elif outcome == 'failed':
+            self.failed_reads += 1
+        elif outcome == 'skipped':
+            self.skipped_reads += 1
+            logging.info(f"文件完全重复，跳过: {result.get('file_name')}")
+        elif outcome == 'path_updated':
+            self.path_updated_reads += 1
+            logging.info(f"文件路径已更新: {result.get('file_name')}")
     
     def _run_task(self):
         """运行任务的具体实现"""
         try:
             from tidyfile.ai.client_manager import get_ai_manager
+            from tidyfile.core.read_job_engine import FileReadJob
             
             # 确保AI客户端管理器正常工作
             ai_manager = get_ai_manager()
@@ -385,76 +179,31 @@ class MultiProcessFileReadTask:
             selected_model = min(available_models, key=lambda x: x.priority)
             model_name = selected_model.model_name
             
-            # 扫描文件夹中的文件
-            folder_path_obj = Path(self.folder_path)
-            
-            # 支持的文件扩展名
-            supported_extensions = [
-                '.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv',
-                '.pdf', '.docx', '.doc',
-                '.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'
-            ]
-            
-            # 收集所有支持的文件
-            files = []
-            for file_path in folder_path_obj.rglob('*'):
-                if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                    files.append(str(file_path))
+            self.gui_log(f"使用 {self.max_processes} 个进程处理文件")
+            self.job = FileReadJob(
+                folder_path=self.folder_path,
+                summary_length=self.summary_length,
+                executor='processes',
+                max_workers=self.max_processes,
+                model_name=model_name,
+                progress_callback=self._on_progress,
+                result_callback=self._on_result,
+                resumable=True
+            )
+            if self.stop_flag:
+                self.job.cancel()
+            summary = self.job.run()
+            self.total_files = summary['total_files']
             
-            if not files:
+            if summary['total_files'] == 0:
                 self.status = "失败"
                 self.error_message = f"文件夹中没有找到可解读的文件: {self.folder_path}"
                 return
             
-            self.total_files = len(files)
-            logging.info(f"任务 {self.task_id} 开始处理 {self.total_files} 个文件，使用 {self.max_processes} 个进程")
-            self.gui_log(f"开始处理 {self.total_files} 个文件，使用 {self.max_processes} 个进程")
-            
-            # 创建多进程队列
-            self.file_queue = multiprocessing.Queue()
-            self.result_queue = multiprocessing.Queue()
-            
-            # 启动结果处理线程
-            self.result_thread = threading.Thread(target=self._result_processor, daemon=True)
-            self.result_thread.start()
-            
-            # 启动工作进程
-            for i in range(self.max_processes):
-                process = multiprocessing.Process(
-                    target=process_file_worker,
-                    args=(i + 1, self.file_queue, self.result_queue, self.summary_length, model_name, os.getcwd())
-                )
-                process.start()
-                self.processes.append(process)
-                logging.info(f"启动进程 {i + 1}")
-                self.gui_log(f"启动进程 {i + 1}")
-            
-            # 将文件路径放入队列
-            for file_path in files:
-                if self.stop_flag:
-                    break
-                self.file_queue.put(file_path)
-            
-            # 等待所有文件处理完成
-            while self.processed_files < self.total_files and not self.stop_flag:
-                time.sleep(0.1)
-            
-            # 发送停止信号
-            for _ in range(len(self.processes)):
-                self.file_queue.put("STOP")
-            
-            # 等待进程结束
-            for process in self.processes:
-                process.join(timeout=10)
-            
-            # 等待结果处理线程结束
-            if self.result_thread and self.result_thread.is_alive():
-                self.result_thread.join(timeout=5)
-            
             if not self.stop_flag:
                 self.status = "已完成"
                 completion_msg = f"任务完成: 成功 {self.successful_reads}, 失败 {self.failed_reads}, 跳过 {self.skipped_reads}, 路径更新 {self.path_updated_reads}"
-                logging.info(f"任务 {self.task_id} {completion_msg}")
+                logging.info(f"任务 {self.task_id} {completion_msg}, 耗时 {summary['timings']}")
                 self.gui_log(completion_msg)
             self.end_time = datetime.now()
             
@@ -463,13 +212,6 @@ class MultiProcessFileReadTask:
             self.error_message = str(e)
             self.end_time = datetime.now()
             logging.error(f"任务 {self.task_id} 执行失败: {e}")
-        finally:
-            # 清理资源
-            self._stop_processes()
-            # 确保结果处理线程也结束
-            if hasattr(self, 'result_thread') and self.result_thread and self.result_thread.is_alive():
-                self.stop_flag = True
-                self.result_thread.join(timeout=5)
 
 class MultiProcessFileReaderGUI:
     """多进程文件解读GUI"""
@@ -37,23 +37,13 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import ttkbootstrap as tb
-# 兼容新版本ttkbootstrap
-try:
-    from ttkbootstrap import Style, Window
-except ImportError:
-    pass
 from ttkbootstrap.constants import *
 import threading
 import time
-import json
 import os
 import logging
-from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
-
-# 全局文件锁，防止多任务同时写入
-_result_file_lock = threading.Lock()
+from typing import Dict
 
 class FileReadTask:
     """单个文件解读任务"""
@@ -75,6 +65,7 @@ class FileReadTask:
         self.end_time = None
         self.error_message = ""
         self.thread = None
+        self.job = None
         self.stop_flag = False
         
         # 设置日志
@@ -110,28 +101,35 @@ class FileReadTask:
         """停止任务"""
         self.stop_flag = True
         self.status = "已停止"
+        if self.job is not None:
+            self.job.cancel()
     
-    def _safe_append_result(self, file_reader, result, folder_path):
-        """安全地追加结果到文件，使用全局锁防止并发冲突"""
-        with _result_file_lock:
-            try:
-                # 使用文件解读器的安全写入方法
-                # 使用新的路径管理获取正确的文件路径
-                from tidyfile.utils.app_paths import get_app_paths
-                app_paths = get_app_paths()
-                ai_result_file = str(app_paths.ai_results_file)
-        
-        file_reader.append_result_to_file(ai_result_file, result, folder_path)
-                return True
-            except Exception as e:
-                logging.error(f"任务 {self.task_id}: 写入结果失败: {e}")
-                return False
+    def _on_progress(self, processed, total, filename):
+        """作业进度回调"""
+        self.current_file = filename
+        self.total_files = total
+        self.processed_files = processed
+        self.progress = processed / total * 100 if total > 0 else 0
+    
+    def _on_result(self, result, outcome):
+        """作业结果回调，同步各类计数"""
+        if outcome == 'success':
+            self.successful_reads += 1
+            logging.info(f"文件解读成功: {result.get('file_name')}")
+        elif outcome == 'failed':
+            self.failed_reads += 1
+        elif outcome == 'skipped':
+            self.skipped_reads += 1
+            logging.info(f"文件完全重复，跳过: {result.get('file_name')}")
+        elif outcome == 'path_updated':
+            self.path_updated_reads += 1
+            logging.info(f"文件路径已更新: {result.get('file_name')}")
     
     def _run_task(self):
         """运行任务的具体实现"""
         try:
-            from tidyfile.core.file_reader import FileReader
             from tidyfile.ai.client_manager import get_ai_manager
+            from tidyfile.core.read_job_engine import FileReadJob
             
             # 确保AI客户端管理器正常工作
             ai_manager = get_ai_manager()
@@ -142,94 +140,28 @@ class FileReadTask:
                     self.error_message = "没有可用的AI模型，请检查Ollama服务"
                     return
             
-            # 初始化文件解读器
-            file_reader = FileReader()
-            file_reader.summary_length = self.summary_length
-            
-            # 扫描文件夹中的文件
-            folder_path_obj = Path(self.folder_path)
-            
-            # 支持的文件扩展名（与file_reader.py保持一致）
-            supported_extensions = [
-                '.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv',
-                '.pdf', '.docx', '.doc',
-                '.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'
-            ]
-            
-            # 收集所有支持的文件
-            files = []
-            for file_path in folder_path_obj.rglob('*'):
-                if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                    files.append(str(file_path))
+            # 逐个文件解读，扫描、去重和结果写入由作业引擎完成
+            self.job = FileReadJob(
+                folder_path=self.folder_path,
+                summary_length=self.summary_length,
+                executor='inline',
+                progress_callback=self._on_progress,
+                result_callback=self._on_result,
+                resumable=True
+            )
+            if self.stop_flag:
+                self.job.cancel()
+            summary = self.job.run()
+            self.total_files = summary['total_files']
             
-            if not files:
+            if summary['total_files'] == 0:
                 self.status = "失败"
                 self.error_message = f"文件夹中没有找到可解读的文件: {self.folder_path}"
                 return
             
-            self.total_files = len(files)
-            logging.info(f"任务 {self.task_id} 开始处理 {self.total_files} 个文件")
-            
-            for i, file_path in enumerate(files):
-                if self.stop_flag:
-                    break
-                
-                filename = Path(file_path).name
-                self.current_file = filename
-                self.processed_files = i + 1
-                self.progress = (i + 1) / self.total_files * 100
-                
-                try:
-                    # 解读单个文件（使用与file_reader.py相同的流程）
-                    # 使用新的路径管理获取正确的文件路径
-                    from tidyfile.utils.app_paths import get_app_paths
-                    app_paths = get_app_paths()
-                    ai_result_file = str(app_paths.ai_results_file)
-        
-        result = file_reader.generate_summary(file_path, self.summary_length, ai_result_file)
-                    
-                    # 检查处理状态
-                    processing_status = result.get('processing_status', '')
-                    
-                    if processing_status == '已跳过':
-                        # 完全重复的文件，跳过处理
-                        self.skipped_reads += 1
-                        logging.info(f"文件完全重复，跳过: {filename}")
-                        continue
-                    elif processing_status == '路径已更新':
-                        # 同名但路径不同的文件，复用摘要并更新路径
-                        self.path_updated_reads += 1
-                        logging.info(f"文件路径已更新: {filename}")
-                        # 使用安全写入方法
-                        self._safe_append_result(file_reader, result, self.folder_path)
-                        continue
-                    
-                    # 检查处理结果
-                    if result['success']:
-                        # 提取路径标签（如果不是路径更新情况）
-                        if not result.get('tags'):
-                            result['tags'] = file_reader.extract_path_tags(file_path, self.folder_path)
-                        self.successful_reads += 1
-                        
-                        # 使用安全写入方法
-                        if self._safe_append_result(file_reader, result, self.folder_path):
-                            logging.info(f"文件解读成功: {filename}")
-                        else:
-                            logging.warning(f"文件解读成功但写入失败: {filename}")
-                    else:
-                        self.failed_reads += 1
-                        logging.warning(f"文件解读失败: {filename} - {result.get('error', '未知错误')}")
-                    
-                except Exception as e:
-                    self.failed_reads += 1
-                    logging.error(f"文件解读异常: {filename} - {e}")
-                
-                # 稍微延迟，避免过于频繁的更新
-                time.sleep(0.1)
-            
             if not self.stop_flag:
                 self.status = "已完成"
-                logging.info(f"任务 {self.task_id} 完成: 成功 {self.successful_reads}, 失败 {self.failed_reads}, 跳过 {self.skipped_reads}, 路径更新 {self.path_updated_reads}")
+                logging.info(f"任务 {self.task_id} 完成: 成功 {self.successful_reads}, 失败 {self.failed_reads}, 跳过 {self.skipped_reads}, 路径更新 {self.path_updated_reads}, 耗时 {summary['timings']}")
             self.end_time = datetime.now()
             
         except Exception as e:
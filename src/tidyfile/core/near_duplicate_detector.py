@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似文件（近似重复）检测
+
+按大小+MD5只能找出字节完全相同的文件，重新编码的JPEG、缩放过的截图、重新导出的PDF都会漏掉。
+本模块提供可选的相似性检测：
+1. 图片：感知哈希（pHash，32x32灰度图的DCT低频分量），汉明距离小于阈值视为相似
+2. 文档（PDF/DOCX/文本）：提取文本后按字符k-gram分片计算MinHash，估计Jaccard相似度
+3. 候选对通过局部敏感哈希（LSH）分桶得到，只比较落入同一桶的文件，
+   百万级文件的聚类耗时接近线性，而不是两两比较。图片哈希切成较宽的分段，
+   查询时每段额外探测翻转1位的键（multi-probe），桶足够小且不丢失满足阈值的候选对
+4. 特征完全相同的文件（如大量纯色图片）先直接合并，不进入LSH桶
+5. 相似文件通过并查集聚成组，只返回供人工确认的分组，不会删除任何文件
+
+Pillow在计算图片哈希时才导入；文档文本通过提取器注册表获取（PDF/Word在提取进程池中解析）。
+"""
+
+import os
+import re
+import math
+import struct
+import hashlib
+import logging
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from tidyfile.core.extractors import get_extractor_registry
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.tif', '.webp'}
+DOCUMENT_EXTENSIONS = {'.pdf', '.docx', '.txt', '.md'}
+
+# MinHash使用的梅森素数和随机排列参数种子
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# 图片哈希位数（8x8 DCT低频分量）
+IMAGE_HASH_BITS = 64
+
+
+def _dct_matrix(size: int) -> List[List[float]]:
+    """DCT-II变换矩阵"""
+    matrix = []
+    for k in range(size):
+        scale = math.sqrt(1.0 / size) if k == 0 else math.sqrt(2.0 / size)
+        matrix.append([scale * math.cos(math.pi * (2 * n + 1) * k / (2 * size)) for n in range(size)])
+    return matrix
+
+
+_DCT_SIZE = 32
+_DCT_MATRIX = _dct_matrix(_DCT_SIZE)
+
+
+def compute_image_phash(file_path: str, hash_size: int = 8) -> Optional[int]:
+    """
+    计算图片的感知哈希
+    
+    Args:
+        file_path: 图片路径
+        hash_size: 取DCT左上角 hash_size x hash_size 的低频分量，得到 hash_size² 位哈希
+    
+    Returns:
+        整数形式的哈希，Pillow不可用或图片无法读取时返回None
+    """
+    # 在用到时才导入Pillow，导入本模块不加载图片库
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(file_path) as img:
+            img = img.convert('L').resize((_DCT_SIZE, _DCT_SIZE), Image.LANCZOS)
+            pixels = list(img.getdata())
+    except Exception as e:
+        logging.debug(f"读取图片失败 {file_path}: {e}")
+        return None
+    
+    rows = [pixels[i * _DCT_SIZE:(i + 1) * _DCT_SIZE] for i in range(_DCT_SIZE)]
+    # 先对行做DCT，再只对需要的低频列做DCT
+    row_dct = [[sum(c * p for c, p in zip(basis, row)) for basis in _DCT_MATRIX[:hash_size]] for row in rows]
+    low_freq = []
+    for k in range(hash_size):
+        basis = _DCT_MATRIX[k]
+        for j in range(hash_size):
+            low_freq.append(sum(basis[n] * row_dct[n][j] for n in range(_DCT_SIZE)))
+    
+    # 与中位数比较（不含直流分量）
+    median = sorted(low_freq[1:])[len(low_freq[1:]) // 2]
+    value = 0
+    for coefficient in low_freq:
+        value = (value << 1) | (1 if coefficient > median else 0)
+    return value
+
+
+def extract_document_text(file_path: str, max_length: int = 20000) -> str:
+    """通过提取器注册表提取文档文本，用于MinHash；无法提取时返回空字符串"""
+    try:
+        return get_extractor_registry().extract(file_path, max_length)
+    except Exception as e:
+        logging.debug(f"提取文档文本失败 {file_path}: {e}")
+        return ""
+
+
+_PERMUTATION_CACHE: Dict[int, List[Tuple[int, int]]] = {}
+
+
+def _permutations(num_perm: int) -> List[Tuple[int, int]]:
+    """生成固定的MinHash排列参数，保证不同运行之间签名可比较"""
+    params = _PERMUTATION_CACHE.get(num_perm)
+    if params is None:
+        params = []
+        for i in range(num_perm):
+            digest = hashlib.sha256(f"minhash-{i}".encode()).digest()
+            a, b = struct.unpack('<QQ', digest[:16])
+            params.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+        _PERMUTATION_CACHE[num_perm] = params
+    return params
+
+
+def compute_minhash(text: str, num_perm: int = 64, shingle_size: int = 5) -> Optional[List[int]]:
+    """
+    计算文本的MinHash签名
+    
+    文本先去掉空白并转为小写，再按字符k-gram分片（对中文同样有效）。
+    
+    Returns:
+        长度为num_perm的签名，文本太短时返回None
+    """
+    normalized = re.sub(r'\s+', '', text).lower()
+    if len(normalized) < shingle_size * 4:
+        return None
+    
+    shingle_hashes = {
+        int.from_bytes(hashlib.blake2b(normalized[i:i + shingle_size].encode('utf-8'), digest_size=4).digest(), 'little')
+        for i in range(len(normalized) - shingle_size + 1)
+    }
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in shingle_hashes)
+        for a, b in _permutations(num_perm)
+    ]
+
+
+def minhash_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """由MinHash签名估计Jaccard相似度"""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    return bin(hash_a ^ hash_b).count('1')
+
+
+class LSHIndex:
+    """局部敏感哈希索引：每个条目提供若干分段键，任一分段键相同的条目成为候选对"""
+    
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, Hashable], List[int]] = {}
+    
+    def add(self, item_id: int, band_keys: Iterable[Hashable]) -> None:
+        for band_index, band_key in enumerate(band_keys):
+            self._buckets.setdefault((band_index, band_key), []).append(item_id)
+    
+    def query(self, band_probes: Iterable[Iterable[Hashable]]) -> Set[int]:
+        """
+        查找候选条目
+        
+        Args:
+            band_probes: 每段要探测的键（multi-probe时一段可以有多个键）
+        
+        Returns:
+            任一段的任一探测键命中的条目ID
+        """
+        found = set()
+        for band_index, probes in enumerate(band_probes):
+            for band_key in probes:
+                items = self._buckets.get((band_index, band_key))
+                if items:
+                    found.update(items)
+        return found
+    
+    def candidate_pairs(self) -> Set[Tuple[int, int]]:
+        """返回所有候选对 (较小ID, 较大ID)"""
+        pairs = set()
+        for items in self._buckets.values():
+            for i in range(len(items)):
+                for j in range(i + 1, len(items)):
+                    a, b = items[i], items[j]
+                    pairs.add((a, b) if a < b else (b, a))
+        return pairs
+
+
+def _image_band_widths(max_distance: int, bits: int = IMAGE_HASH_BITS) -> List[int]:
+    """
+    图片哈希的分段宽度
+    
+    分为 max_distance//2+1 段时，汉明距离不超过max_distance的两个哈希至少有一段
+    相差不超过1位（抽屉原理），查询时每段探测原键和翻转1位的键即可找全。
+    """
+    num_bands = min(bits, max_distance // 2 + 1)
+    return [bits // num_bands + (1 if i < bits % num_bands else 0) for i in range(num_bands)]
+
+
+def _image_bands(value: int, band_widths: List[int]) -> List[int]:
+    """按分段宽度切分图片哈希"""
+    bands = []
+    shift = 0
+    for width in band_widths:
+        bands.append((value >> shift) & ((1 << width) - 1))
+        shift += width
+    return bands
+
+
+def image_candidate_pairs(hashes: List[int], max_distance: int) -> Set[Tuple[int, int]]:
+    """
+    找出汉明距离可能不超过max_distance的图片哈希对
+    
+    每个哈希先查询已加入的哈希（每段探测原键和翻转1位的键），再加入索引，
+    满足阈值的哈希对一定出现在结果中。
+    
+    Args:
+        hashes: 图片哈希列表
+        max_distance: 最大汉明距离
+    
+    Returns:
+        候选对 (较小下标, 较大下标)，需再用hamming_distance验证
+    """
+    band_widths = _image_band_widths(max_distance)
+    index = LSHIndex()
+    pairs = set()
+    for item_id, value in enumerate(hashes):
+        bands = _image_bands(value, band_widths)
+        probes = [[band] + [band ^ (1 << bit) for bit in range(width)]
+                  for band, width in zip(bands, band_widths)]
+        for other_id in index.query(probes):
+            pairs.add((other_id, item_id))
+        index.add(item_id, bands)
+    return pairs
+
+
+def _minhash_bands(signature: List[int], num_bands: int) -> List[Tuple[int, ...]]:
+    rows = len(signature) // num_bands
+    return [tuple(signature[i * rows:(i + 1) * rows]) for i in range(num_bands)]
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+    
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+    
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def find_similar_groups(files: List[Dict[str, Any]],
+                        image_max_distance: int = 8,
+                        text_min_similarity: float = 0.8,
+                        num_perm: int = 64,
+                        text_bands: int = 16,
+                        max_workers: int = 4,
+                        progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
+    """
+    查找相似文件分组
+    
+    Args:
+        files: 文件信息列表，每项至少包含 path（str或Path），其余字段原样放入结果
+        image_max_distance: 图片感知哈希的最大汉明距离
+        text_min_similarity: 文档MinHash估计的最小Jaccard相似度
+        num_perm: MinHash排列数
+        text_bands: 文档LSH分段数（num_perm需能被整除），分段越多召回越高、候选越多
+        max_workers: 并行计算特征的线程数
+        progress_callback: 特征计算进度回调 (已处理数, 总数)
+    
+    Returns:
+        分组列表，每组为 {'type': 'image'|'document', 'files': [...], 'similarity': 组内已验证的最低相似度}
+    """
+    candidates = []
+    for file_info in files:
+        extension = os.path.splitext(str(file_info['path']))[1].lower()
+        if extension in IMAGE_EXTENSIONS:
+            candidates.append(('image', file_info))
+        elif extension in DOCUMENT_EXTENSIONS:
+            candidates.append(('document', file_info))
+    
+    if importlib.util.find_spec('PIL') is None and any(kind == 'image' for kind, _ in candidates):
+        logging.warning("未安装Pillow，跳过图片相似性检测")
+    
+    def compute_feature(candidate):
+        kind, file_info = candidate
+        if kind == 'image':
+            return compute_image_phash(str(file_info['path']))
+        return compute_minhash(extract_document_text(str(file_info['path'])), num_perm)
+    
+    features = []
+    total = len(candidates)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for done, feature in enumerate(executor.map(compute_feature, candidates), 1):
+            features.append(feature)
+            if progress_callback:
+                progress_callback(done, total)
+    
+    groups = []
+    for kind in ('image', 'document'):
+        items = [(file_info, feature) for (item_kind, file_info), feature in zip(candidates, features)
+                 if item_kind == kind and feature is not None]
+        if len(items) < 2:
+            continue
+        
+        # 特征完全相同的文件直接合并，每种特征只取一个代表进入LSH
+        union_find = _UnionFind(len(items))
+        edge_similarity = {}
+        representatives: Dict[Hashable, int] = {}
+        for item_id, (_, feature) in enumerate(items):
+            key = feature if kind == 'image' else tuple(feature)
+            representative = representatives.setdefault(key, item_id)
+            if representative != item_id:
+                union_find.union(representative, item_id)
+                edge_similarity[(representative, item_id)] = 1.0
+        unique_ids = list(representatives.values())
+        
+        if kind == 'image':
+            pairs = image_candidate_pairs([items[item_id][1] for item_id in unique_ids], image_max_distance)
+        else:
+            index = LSHIndex()
+            for position, item_id in enumerate(unique_ids):
+                index.add(position, _minhash_bands(items[item_id][1], text_bands))
+            pairs = index.candidate_pairs()
+        
+        # 验证候选对并聚类
+        for position_a, position_b in pairs:
+            a, b = unique_ids[position_a], unique_ids[position_b]
+            if kind == 'image':
+                distance = hamming_distance(items[a][1], items[b][1])
+                if distance > image_max_distance:
+                    continue
+                similarity = 1 - distance / IMAGE_HASH_BITS
+            else:
+                similarity = minhash_similarity(items[a][1], items[b][1])
+                if similarity < text_min_similarity:
+                    continue
+            union_find.union(a, b)
+            edge_similarity[(a, b)] = similarity
+        
+        clusters: Dict[int, List[int]] = {}
+        for item_id in range(len(items)):
+            clusters.setdefault(union_find.find(item_id), []).append(item_id)
+        
+        cluster_similarity: Dict[int, float] = {}
+        for (a, _), similarity in edge_similarity.items():
+            root = union_find.find(a)
+            cluster_similarity[root] = min(similarity, cluster_similarity.get(root, 1.0))
+        
+        for root, members in clusters.items():
+            if len(members) < 2:
+                continue
+            groups.append({
+                'type': kind,
+                'files': [items[item_id][0] for item_id in members],
+                'similarity': round(cluster_similarity.get(root, 1.0), 3)
+            })
+    
+    logging.info(f"相似文件检测完成: 检测文件 {total} 个, 相似组 {len(groups)} 个")
+    return groups
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Office转PDF缓存
+
+查看器远程打开Office文档时需要先转换为PDF，首次转换可能耗时数十秒。本模块提供：
+1. 按总大小和存放时间限制的LRU缓存，超出限制时淘汰最久未使用的PDF
+2. 缓存统计（命中、未命中、转换、失败、淘汰）
+3. 同一文件的并发转换只执行一次
+4. 可选的后台预转换队列，提前转换最近分类的Office文件
+5. 可插拔的转换器：Windows上使用Microsoft Office COM，其他平台可使用LibreOffice作为本地替代
+"""
+
+import os
+import time
+import queue
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, Optional
+
+# 转换器签名：converter(源文件路径, 目标PDF路径) -> 是否成功
+PdfConverter = Callable[[str, str], bool]
+
+OFFICE_EXTENSIONS = {'.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'}
+
+# 同一用户配置目录下只能运行一个soffice，后启动的实例会把任务交给已运行的实例后直接退出，
+# 不产生输出文件，因此LibreOffice转换串行执行，并使用独立的用户配置目录
+libreoffice_lock = threading.Lock()
+LIBREOFFICE_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "tidyfile_libreoffice_profile")
+
+
+def get_conversion_cache_key(file_path: str) -> str:
+    """根据文件路径、修改时间和大小生成缓存键，文件变化后自动使用新的缓存"""
+    file_stat = os.stat(file_path)
+    return hashlib.md5(f"{file_path}_{file_stat.st_mtime}_{file_stat.st_size}".encode()).hexdigest()
+
+
+def is_office_file(file_path: str) -> bool:
+    """判断是否为可转换的Office文件"""
+    return os.path.splitext(file_path)[1].lower() in OFFICE_EXTENSIONS
+
+
+def libreoffice_converter(file_path: str, output_path: str, timeout: int = 120) -> bool:
+    """
+    使用LibreOffice无界面模式转换（非Windows平台的本地替代转换器）
+    
+    Args:
+        file_path: Office文件路径
+        output_path: 输出PDF路径
+        timeout: 转换超时（秒）
+    """
+    soffice = shutil.which('soffice') or shutil.which('libreoffice')
+    if not soffice:
+        raise RuntimeError("未找到LibreOffice（soffice）")
+    
+    # LibreOffice按源文件名输出，先输出到临时目录再移动到缓存文件
+    profile_url = Path(LIBREOFFICE_PROFILE_DIR).as_uri()
+    with tempfile.TemporaryDirectory() as temp_dir, libreoffice_lock:
+        subprocess.run(
+            [soffice, f'-env:UserInstallation={profile_url}', '--headless',
+             '--convert-to', 'pdf', '--outdir', temp_dir, file_path],
+            check=True, capture_output=True, timeout=timeout
+        )
+        converted = os.path.join(temp_dir, Path(file_path).stem + '.pdf')
+        if not os.path.exists(converted):
+            return False
+        shutil.move(converted, output_path)
+    return True
+
+
+def get_default_converter() -> Optional[PdfConverter]:
+    """获取当前平台可用的本地转换器（LibreOffice），不可用时返回None"""
+    if shutil.which('soffice') or shutil.which('libreoffice'):
+        return libreoffice_converter
+    return None
+
+
+class OfficePdfCache:
+    """按大小和存放时间限制的Office转PDF LRU缓存"""
+    
+    def __init__(self, cache_dir, converter: Optional[PdfConverter] = None,
+                 max_size_mb: int = 1024, max_age_days: int = 30):
+        """
+        初始化缓存
+        
+        Args:
+            cache_dir: 缓存目录，PDF以 <缓存键>.pdf 保存
+            converter: 转换器，为None时只能读取已有缓存
+            max_size_mb: 缓存总大小上限（MB）
+            max_age_days: 缓存文件最长保留天数，超过后即使未满也会淘汰
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.converter = converter
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.max_age_seconds = max_age_days * 24 * 3600
+        
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()  # 缓存键 -> (大小, 最后使用时间)，按使用顺序排列
+        self._total_size = 0
+        self._converting = {}  # 缓存键 -> threading.Event，正在进行的转换
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'conversions': 0,
+            'failures': 0,
+            'evictions': 0,
+            'conversion_time': 0.0
+        }
+        
+        self._load_existing_entries()
+    
+    def get_cached_pdf(self, file_path: str, cache_key: str = None) -> Optional[str]:
+        """只查询缓存，不触发转换，也不计入命中统计"""
+        if cache_key is None:
+            cache_key = get_conversion_cache_key(file_path)
+        return self._lookup(cache_key, record_stats=False)
+    
+    def get_or_convert(self, file_path: str, cache_key: str = None) -> Optional[str]:
+        """
+        获取文件对应的PDF，缓存未命中时调用转换器转换
+        
+        同一文件同时有多个请求时只转换一次，其他请求等待转换结果。
+        
+        Returns:
+            PDF路径，转换失败或没有转换器时返回None
+        """
+        if cache_key is None:
+            cache_key = get_conversion_cache_key(file_path)
+        
+        cached = self._lookup(cache_key)
+        if cached:
+            return cached
+        
+        with self.lock:
+            pending = self._converting.get(cache_key)
+            owner = pending is None
+            if owner:
+                pending = threading.Event()
+                self._converting[cache_key] = pending
+        
+        if not owner:
+            # 等待其他线程的转换完成后重新查询缓存
+            pending.wait()
+            return self._lookup(cache_key, record_stats=False)
+        
+        try:
+            return self._convert(file_path, cache_key)
+        finally:
+            with self.lock:
+                self._converting.pop(cache_key, None)
+            pending.set()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['size_mb'] = round(self._total_size / 1024 / 1024, 2)
+            stats['max_size_mb'] = round(self.max_size_bytes / 1024 / 1024, 2)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+            stats['converting'] = len(self._converting)
+        return stats
+    
+    def evict(self) -> int:
+        """淘汰过期文件和超出大小上限的最久未使用文件，返回淘汰数量"""
+        now = time.time()
+        to_remove = []
+        with self.lock:
+            for cache_key, (size, last_used) in list(self._entries.items()):
+                if now - last_used > self.max_age_seconds:
+                    to_remove.append(cache_key)
+                    self._remove_entry(cache_key)
+            
+            while self._total_size > self.max_size_bytes and self._entries:
+                cache_key = next(iter(self._entries))
+                to_remove.append(cache_key)
+                self._remove_entry(cache_key)
+            
+            self.stats['evictions'] += len(to_remove)
+        
+        for cache_key in to_remove:
+            try:
+                (self.cache_dir / f"{cache_key}.pdf").unlink()
+            except OSError:
+                pass
+        
+        if to_remove:
+            logging.info(f"PDF缓存淘汰 {len(to_remove)} 个文件")
+        return len(to_remove)
+    
+    def _lookup(self, cache_key: str, record_stats: bool = True) -> Optional[str]:
+        """查询缓存，命中时更新使用顺序"""
+        cache_file = self.cache_dir / f"{cache_key}.pdf"
+        with self.lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and cache_file.exists():
+                self._entries[cache_key] = (entry[0], time.time())
+                self._entries.move_to_end(cache_key)
+                if record_stats:
+                    self.stats['hits'] += 1
+                return str(cache_file)
+            
+            if entry is not None:
+                # 缓存文件被外部删除
+                self._remove_entry(cache_key)
+            if record_stats:
+                self.stats['misses'] += 1
+        return None
+    
+    def _convert(self, file_path: str, cache_key: str) -> Optional[str]:
+        """调用转换器并登记缓存"""
+        if self.converter is None:
+            return None
+        
+        cache_file = self.cache_dir / f"{cache_key}.pdf"
+        # 先输出到临时文件，避免其他请求读到未写完的PDF
+        temp_file = self.cache_dir / f"{cache_key}.converting.pdf"
+        start_time = time.time()
+        try:
+            success = self.converter(file_path, str(temp_file))
+            if not success or not temp_file.exists():
+                raise RuntimeError("转换后未找到输出文件")
+            os.replace(temp_file, cache_file)
+        except Exception as e:
+            with self.lock:
+                self.stats['failures'] += 1
+            logging.warning(f"Office转PDF失败 {file_path}: {e}")
+            try:
+                temp_file.unlink()
+            except OSError:
+                pass
+            return None
+        
+        size = cache_file.stat().st_size
+        with self.lock:
+            self._entries[cache_key] = (size, time.time())
+            self._total_size += size
+            self.stats['conversions'] += 1
+            self.stats['conversion_time'] += time.time() - start_time
+        
+        self.evict()
+        return str(cache_file) if cache_file.exists() else None
+    
+    def _remove_entry(self, cache_key: str) -> None:
+        """从索引中移除条目（调用方持有锁）"""
+        size, _ = self._entries.pop(cache_key)
+        self._total_size -= size
+    
+    def _load_existing_entries(self) -> None:
+        """扫描缓存目录中已有的PDF，按最后访问时间建立LRU顺序"""
+        existing = []
+        for cache_file in self.cache_dir.glob('*.pdf'):
+            if cache_file.name.endswith('.converting.pdf'):
+                # 上次未完成的转换
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    pass
+                continue
+            try:
+                stat = cache_file.stat()
+            except OSError:
+                continue
+            existing.append((max(stat.st_atime, stat.st_mtime), cache_file.stem, stat.st_size))
+        
+        for last_used, cache_key, size in sorted(existing):
+            self._entries[cache_key] = (size, last_used)
+            self._total_size += size
+        
+        self.evict()
+
+
+class PdfPreconversionQueue:
+    """后台预转换队列，在用户打开之前把Office文件转换为PDF"""
+    
+    def __init__(self, cache: OfficePdfCache, max_pending: int = 200,
+                 thread_initializer: Callable[[], None] = None,
+                 thread_finalizer: Callable[[], None] = None):
+        """
+        初始化预转换队列
+        
+        Args:
+            cache: PDF缓存
+            max_pending: 等待转换的文件数上限，队列满时丢弃新的请求
+            thread_initializer: 工作线程启动时调用（如COM初始化）
+            thread_finalizer: 工作线程退出时调用
+        """
+        self.cache = cache
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread_initializer = thread_initializer
+        self.thread_finalizer = thread_finalizer
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.stats = {'queued': 0, 'converted': 0, 'skipped': 0, 'dropped': 0}
+    
+    def start(self) -> None:
+        """启动后台转换线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """停止后台转换线程（当前正在进行的转换会完成）"""
+        self._stop_event.set()
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+    
+    def enqueue(self, file_paths: Iterable[str]) -> int:
+        """
+        加入待转换文件，非Office文件、不存在的文件和已排队的文件会被忽略
+        
+        Returns:
+            实际加入队列的文件数
+        """
+        added = 0
+        for file_path in file_paths:
+            if not file_path or not is_office_file(file_path) or not os.path.exists(file_path):
+                continue
+            with self._lock:
+                if file_path in self._queued:
+                    continue
+                try:
+                    self.queue.put_nowait(file_path)
+                except queue.Full:
+                    self.stats['dropped'] += 1
+                    continue
+                self._queued.add(file_path)
+                self.stats['queued'] += 1
+            added += 1
+        return added
+    
+    def _worker(self) -> None:
+        """后台转换工作线程"""
+        if self.thread_initializer:
+            self.thread_initializer()
+        try:
+            while not self._stop_event.is_set():
+                file_path = self.queue.get()
+                if file_path is None:
+                    break
+                with self._lock:
+                    self._queued.discard(file_path)
+                
+                try:
+                    if not os.path.exists(file_path) or self.cache.get_cached_pdf(file_path):
+                        self.stats['skipped'] += 1
+                        continue
+                    if self.cache.get_or_convert(file_path):
+                        self.stats['converted'] += 1
+                except Exception as e:
+                    logging.warning(f"预转换失败 {file_path}: {e}")
+        finally:
+            if self.thread_finalizer:
+                self.thread_finalizer()
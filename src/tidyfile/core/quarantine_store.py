@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复文件隔离区（回收站）
+
+删除重复文件时不直接unlink，而是重命名到同一卷上的隔离区，恢复时再重命名回原位置，
+删除和撤销都只是元数据操作，不复制文件内容。
+
+存储结构（隔离区根目录下）:
+    objects/<md5前两位>/<md5>    文件内容，按MD5保存，同一内容只保存一份
+    manifest.jsonl                 追加式清单，每行一条 add / restore / purge 记录
+    manifest.lock                  清单文件锁，多个进程（如GUI和命令行）共用一个隔离区时串行化修改
+
+同一内容的多个副本被删除时，第一个副本重命名为对象文件，之后的副本直接删除
+（内容已在隔离区中），恢复时从对象文件复制出独立的文件（支持时用reflink克隆）；最后一个引用恢复时直接重命名。
+
+隔离区按卷选择：优先使用应用数据目录下的quarantine目录，文件不在同一卷上时
+使用该卷根目录下的 .tidyfile_quarantine 目录。超过保留天数或总大小上限的内容由purge清理。
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl  # Unix系统文件锁
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+try:
+    import msvcrt  # Windows系统文件锁
+    HAS_MSVCRT = True
+except ImportError:
+    HAS_MSVCRT = False
+
+# 卷根目录下的隔离区目录名，扫描重复文件时会跳过此目录
+QUARANTINE_DIRNAME = ".tidyfile_quarantine"
+MANIFEST_FILENAME = "manifest.jsonl"
+MANIFEST_LOCK_FILENAME = "manifest.lock"
+# Linux ioctl FICLONE：让目标文件共享源文件的数据块（写时复制）
+FICLONE = 0x40049409
+
+
+class QuarantineError(Exception):
+    pass
+
+
+def _volume_root(path: str) -> str:
+    """返回路径所在卷（挂载点）的根目录"""
+    path = os.path.abspath(path)
+    device = os.stat(path).st_dev
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return path
+        try:
+            if os.stat(parent).st_dev != device:
+                return path
+        except OSError:
+            return path
+        path = parent
+
+
+def _copy_object(object_path: str, target_path: str) -> None:
+    """
+    把隔离内容复制为独立的文件：支持时使用reflink克隆（不复制数据），否则完整复制；
+    先写入临时文件，完成后再重命名，失败时不留下半截文件
+    """
+    temp_path = os.path.join(os.path.dirname(target_path), f".{uuid.uuid4().hex}.restore")
+    try:
+        try:
+            if not HAS_FCNTL:
+                raise OSError("当前平台不支持reflink")
+            with open(object_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            shutil.copyfile(object_path, temp_path)
+        shutil.copystat(object_path, temp_path)
+        os.rename(temp_path, target_path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class QuarantineStore:
+    """单个卷上的隔离区"""
+    
+    def __init__(self, root, max_age_days: int = 30, max_size_mb: int = 10240):
+        """
+        初始化隔离区
+        
+        Args:
+            root: 隔离区根目录，必须与被隔离的文件在同一卷上
+            max_age_days: 隔离内容的保留天数
+            max_size_mb: 隔离区总大小上限（MB）
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = self.root / MANIFEST_FILENAME
+        self.manifest_lock_file = self.root / MANIFEST_LOCK_FILENAME
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.device = os.stat(self.root).st_dev
+        
+        self.lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}  # 条目ID -> 条目，只包含未恢复、未清理的条目
+        self._load_manifest()
+    
+    def quarantine(self, file_path: str, md5: str, ctime: float = None) -> Dict:
+        """
+        将文件移入隔离区
+        
+        Args:
+            file_path: 文件路径
+            md5: 文件内容的MD5（调用方已计算）
+            ctime: 文件创建时间
+        
+        Returns:
+            隔离条目，object_path为隔离区中的内容文件
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        if stat.st_dev != self.device:
+            raise QuarantineError(f"文件与隔离区不在同一卷上: {file_path}")
+        
+        object_path = self._object_path(md5)
+        with self._locked():
+            if object_path.exists():
+                # 内容已在隔离区中，删除这个副本即可
+                os.remove(file_path)
+            else:
+                object_path.parent.mkdir(parents=True, exist_ok=True)
+                os.rename(file_path, object_path)
+            
+            entry = {
+                "entry_id": uuid.uuid4().hex,
+                "md5": md5,
+                "original_path": file_path,
+                "object_path": str(object_path),
+                "size": stat.st_size,
+                "ctime": ctime,
+                "quarantined_at": time.time()
+            }
+            self._entries[entry["entry_id"]] = entry
+            self._append_manifest(dict(entry, action="add"))
+        
+        return entry
+    
+    def restore(self, original_path: str, md5: str = None) -> str:
+        """
+        将文件从隔离区恢复到原位置
+        
+        Args:
+            original_path: 文件原路径
+            md5: 文件MD5，同一路径被隔离过多次时用于区分
+        
+        Returns:
+            恢复后的文件路径
+        """
+        original_path = os.path.abspath(original_path)
+        with self._locked():
+            entry = self._find_entry(original_path, md5)
+            if entry is None:
+                raise QuarantineError(f"隔离区中没有该文件: {original_path}")
+            if os.path.exists(original_path):
+                raise QuarantineError(f"原位置已存在文件: {original_path}")
+            
+            object_path = entry["object_path"]
+            if not os.path.exists(object_path):
+                raise QuarantineError(f"隔离内容已被清理: {original_path}")
+            
+            os.makedirs(os.path.dirname(original_path), exist_ok=True)
+            if self._reference_count(entry["md5"]) > 1:
+                # 还有其他条目引用同一内容，保留对象文件，恢复出独立的副本
+                # （硬链接会让恢复的文件和对象文件共用内容，修改一个会改变其他）
+                _copy_object(object_path, original_path)
+            else:
+                os.rename(object_path, original_path)
+            
+            del self._entries[entry["entry_id"]]
+            self._append_manifest({"action": "restore", "entry_id": entry["entry_id"]})
+        
+        return original_path
+    
+    def contains(self, original_path: str, md5: str = None) -> bool:
+        """判断隔离区中是否有该文件的可恢复内容"""
+        with self.lock:
+            entry = self._find_entry(os.path.abspath(original_path), md5)
+            return entry is not None and os.path.exists(entry["object_path"])
+    
+    def list_entries(self) -> List[Dict]:
+        """列出所有可恢复的条目（按隔离时间排序）"""
+        with self.lock:
+            return sorted((dict(entry) for entry in self._entries.values()),
+                          key=lambda entry: entry["quarantined_at"])
+    
+    def purge(self, max_age_days: int = None, max_size_mb: int = None) -> int:
+        """
+        按保留策略永久删除隔离内容：先清理超过保留天数的条目，
+        总大小仍超过上限时从最早隔离的条目开始清理
+        
+        Returns:
+            清理的条目数
+        """
+        max_age_seconds = self.max_age_seconds if max_age_days is None else max_age_days * 24 * 3600
+        max_size_bytes = self.max_size_bytes if max_size_mb is None else max_size_mb * 1024 * 1024
+        now = time.time()
+        
+        with self._locked():
+            entries = sorted(self._entries.values(), key=lambda entry: entry["quarantined_at"])
+            purged = [entry for entry in entries if now - entry["quarantined_at"] > max_age_seconds]
+            remaining = [entry for entry in entries if now - entry["quarantined_at"] <= max_age_seconds]
+            
+            # 按内容统计剩余引用数，内容的最后一个引用被清理时才释放其大小
+            references = {}
+            for entry in remaining:
+                references[entry["md5"]] = references.get(entry["md5"], 0) + 1
+            total_size = self._objects_size(remaining)
+            for entry in remaining:
+                if total_size <= max_size_bytes:
+                    break
+                purged.append(entry)
+                references[entry["md5"]] -= 1
+                if references[entry["md5"]] == 0:
+                    total_size -= entry["size"]
+            
+            for entry in purged:
+                del self._entries[entry["entry_id"]]
+                self._append_manifest({"action": "purge", "entry_id": entry["entry_id"]})
+                if self._reference_count(entry["md5"]) == 0:
+                    try:
+                        os.remove(entry["object_path"])
+                    except OSError:
+                        pass
+            
+            if purged:
+                self._compact_manifest()
+        
+        if purged:
+            logging.info(f"隔离区 {self.root} 清理 {len(purged)} 个条目")
+        return len(purged)
+    
+    def get_stats(self) -> Dict:
+        """获取隔离区统计信息"""
+        with self.lock:
+            entries = list(self._entries.values())
+            return {
+                "root": str(self.root),
+                "entries": len(entries),
+                "objects": len({entry["md5"] for entry in entries}),
+                "size_mb": round(self._objects_size(entries) / 1024 / 1024, 2),
+                "max_size_mb": round(self.max_size_bytes / 1024 / 1024, 2)
+            }
+    
+    def _object_path(self, md5: str) -> Path:
+        return self.objects_dir / md5[:2] / md5
+    
+    def _find_entry(self, original_path: str, md5: str = None) -> Optional[Dict]:
+        """查找原路径对应的最近一次隔离条目（调用方持有锁）"""
+        matches = [entry for entry in self._entries.values()
+                   if entry["original_path"] == original_path and (md5 is None or entry["md5"] == md5)]
+        return max(matches, key=lambda entry: entry["quarantined_at"]) if matches else None
+    
+    def _reference_count(self, md5: str) -> int:
+        """引用同一内容的条目数（调用方持有锁）"""
+        return sum(1 for entry in self._entries.values() if entry["md5"] == md5)
+    
+    @staticmethod
+    def _objects_size(entries: List[Dict]) -> int:
+        """条目引用的内容文件总大小，同一内容只计算一次"""
+        return sum({entry["md5"]: entry["size"] for entry in entries}.values())
+    
+    @contextmanager
+    def _locked(self):
+        """
+        持有线程锁和清单文件锁，并从清单重新加载条目
+        
+        其他进程可能已向清单追加了记录，修改隔离区前必须以清单为准，
+        否则引用计数和清单压缩会丢掉其他进程隔离的条目。
+        """
+        with self.lock:
+            with open(self.manifest_lock_file, 'a+b') as lock_handle:
+                self._acquire_file_lock(lock_handle)
+                try:
+                    self._load_manifest()
+                    yield
+                finally:
+                    self._release_file_lock(lock_handle)
+    
+    @staticmethod
+    def _acquire_file_lock(file_handle) -> None:
+        """阻塞获取文件锁（跨平台）"""
+        if os.name == 'nt' and HAS_MSVCRT:
+            file_handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(file_handle.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    # LK_LOCK重试约10秒后仍失败会抛出异常，继续等待
+                    continue
+        elif HAS_FCNTL:
+            fcntl.flock(file_handle.fileno(), fcntl.LOCK_EX)
+    
+    @staticmethod
+    def _release_file_lock(file_handle) -> None:
+        """释放文件锁（跨平台）"""
+        try:
+            if os.name == 'nt' and HAS_MSVCRT:
+                file_handle.seek(0)
+                msvcrt.locking(file_handle.fileno(), msvcrt.LK_UNLCK, 1)
+            elif HAS_FCNTL:
+                fcntl.flock(file_handle.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+    
+    def _append_manifest(self, record: Dict) -> None:
+        """向清单追加一条记录（调用方持有清单文件锁）"""
+        with open(self.manifest_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def _compact_manifest(self) -> None:
+        """用当前有效条目重写清单，去掉已恢复和已清理的记录（调用方持有清单文件锁，条目已从清单重新加载）"""
+        temp_file = self.manifest_file.with_suffix(".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(dict(entry, action="add"), ensure_ascii=False) + "\n")
+        os.replace(temp_file, self.manifest_file)
+    
+    def _load_manifest(self) -> None:
+        """读取清单，重建有效条目"""
+        self._entries = {}
+        if not self.manifest_file.exists():
+            return
+        with open(self.manifest_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                action = record.pop("action", None)
+                if action == "add":
+                    self._entries[record["entry_id"]] = record
+                elif action in ("restore", "purge"):
+                    self._entries.pop(record.get("entry_id"), None)
+
+
+# 隔离区根目录 -> 隔离区，设备号 -> 该卷使用的隔离区根目录
+_stores: Dict[str, QuarantineStore] = {}
+_device_roots: Dict[int, str] = {}
+_stores_lock = threading.Lock()
+
+
+def _candidate_roots(file_path: str) -> List[Path]:
+    """文件可用的隔离区根目录，按优先级排序"""
+    candidates = []
+    try:
+        from tidyfile.utils.app_paths import get_app_paths
+        candidates.append(get_app_paths().quarantine_dir)
+    except ImportError:
+        pass
+    candidates.append(Path(_volume_root(file_path)) / QUARANTINE_DIRNAME)
+    return candidates
+
+
+def get_quarantine_store(file_path: str) -> QuarantineStore:
+    """
+    获取与文件在同一卷上的隔离区
+    
+    Raises:
+        QuarantineError: 该卷上没有可写的隔离区目录
+    """
+    device = os.stat(file_path).st_dev
+    with _stores_lock:
+        root = _device_roots.get(device)
+        if root is not None:
+            return _stores[root]
+        
+        for root in _candidate_roots(file_path):
+            try:
+                root.mkdir(parents=True, exist_ok=True)
+                if os.stat(root).st_dev != device:
+                    continue
+                store = _stores.get(str(root)) or QuarantineStore(root)
+            except OSError:
+                continue
+            _stores[str(root)] = store
+            _device_roots[device] = str(root)
+            return store
+    
+    raise QuarantineError(f"文件所在卷上没有可用的隔离区: {file_path}")
+
+
+def get_store_for_object(object_path: str) -> Optional[QuarantineStore]:
+    """根据隔离区中的内容文件路径找到对应的隔离区（objects/<前缀>/<md5> 的上三级目录）"""
+    root = Path(object_path).parent.parent.parent
+    if not (root / MANIFEST_FILENAME).exists():
+        return None
+    with _stores_lock:
+        store = _stores.get(str(root))
+        if store is None:
+            store = QuarantineStore(root)
+            _stores[str(root)] = store
+        return store
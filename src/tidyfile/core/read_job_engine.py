@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件解读作业引擎
+
+"扫描文件夹 → 生成摘要 → 写入结果" 的统一实现，供多任务解读器、多进程解读器和
+主界面批量解读共用，避免三处各自维护扩展名列表、并发模型和结果写入逻辑。
+
+作业分三个阶段：
+1. 扫描：收集支持的文件
+2. 解读：调用FileReader.generate_summary，由可替换的执行器并发执行
+   - inline: 在当前线程中逐个执行
+   - threads: 线程池
+   - processes: 进程池（每个进程复用一个FileReader）
+   - async: 独立的asyncio事件循环，协程函数直接await，普通函数放到默认线程池
+3. 写入：提取路径标签并追加到ai_organize_result.json，在作业线程中串行执行
+
+所有执行器共用同一套背压（在途任务数上限）、取消和分阶段计时。
+开启resumable时作业状态保存在job_store中，中断后再次运行从中断处继续。
+"""
+
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from tidyfile.core.extractors import get_extractor_registry
+
+EXECUTOR_KINDS = ('inline', 'threads', 'processes', 'async')
+
+# 可恢复作业每处理多少个文件保存一次检查点
+CHECKPOINT_EVERY = 100
+
+# 全局文件锁，防止多个作业同时写入结果文件
+_result_file_lock = threading.Lock()
+
+# 工作线程/进程内复用的FileReader
+_local = threading.local()
+
+
+def supported_read_extensions() -> Set[str]:
+    """支持解读的文件扩展名（提取器注册表中已注册的扩展名）"""
+    return set(get_extractor_registry().extensions())
+
+
+def iter_readable_files(folder_path: str) -> Iterator[str]:
+    """递归列出文件夹中支持解读的文件"""
+    extensions = supported_read_extensions()
+    for file_path in Path(folder_path).rglob('*'):
+        if file_path.suffix.lower() in extensions and file_path.is_file():
+            yield str(file_path)
+
+
+def _get_file_reader(model_name: Optional[str], summary_length: int):
+    """获取当前线程（进程）复用的FileReader"""
+    reader = getattr(_local, 'file_reader', None)
+    if reader is None or reader.model_name != model_name:
+        from tidyfile.core.file_reader import FileReader
+        reader = FileReader(model_name=model_name)
+        _local.file_reader = reader
+    reader.summary_length = summary_length
+    return reader
+
+
+def read_file(file_path: str, summary_length: int, model_name: Optional[str], ai_result_file: str) -> Dict[str, Any]:
+    """
+    解读单个文件（可在子进程中执行）
+    
+    Returns:
+        generate_summary的结果，额外包含read_seconds（解读耗时）
+    """
+    start = time.perf_counter()
+    try:
+        reader = _get_file_reader(model_name, summary_length)
+        result = reader.generate_summary(file_path, summary_length, ai_result_file)
+    except Exception as e:
+        result = {
+            'file_path': file_path,
+            'file_name': Path(file_path).name,
+            'success': False,
+            'extracted_text': '',
+            'summary': '',
+            'error': str(e),
+            'model_used': model_name
+        }
+    result['read_seconds'] = time.perf_counter() - start
+    return result
+
+
+class InlineExecutor(concurrent.futures.Executor):
+    """在调用线程中同步执行的执行器"""
+    
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class AsyncioExecutor(concurrent.futures.Executor):
+    """在独立事件循环上执行任务的执行器，用信号量限制并发数"""
+    
+    def __init__(self, max_workers: int = 16):
+        self._loop = asyncio.new_event_loop()
+        self._max_workers = max_workers
+        self._semaphore = None
+        self._thread = threading.Thread(target=self._run_loop, name="read-job-asyncio", daemon=True)
+        self._ready = threading.Event()
+        self._thread.start()
+        self._ready.wait()
+    
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self._max_workers)
+        self._ready.set()
+        self._loop.run_forever()
+    
+    async def _call(self, fn, args, kwargs):
+        async with self._semaphore:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*args, **kwargs)
+            return await self._loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+    
+    def submit(self, fn, *args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(self._call(fn, args, kwargs), self._loop)
+    
+    def shutdown(self, wait: bool = True, **kwargs) -> None:
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if wait:
+                self._thread.join()
+        if not self._loop.is_running() and not self._loop.is_closed():
+            self._loop.close()
+
+
+def create_executor(kind: str = 'threads', max_workers: int = 4) -> concurrent.futures.Executor:
+    """
+    创建作业执行器
+    
+    Args:
+        kind: inline / threads / processes / async
+        max_workers: 最大并发数（inline忽略）
+    """
+    if kind == 'inline':
+        return InlineExecutor()
+    if kind == 'threads':
+        return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="read-job")
+    if kind == 'processes':
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    if kind == 'async':
+        return AsyncioExecutor(max_workers=max_workers)
+    raise ValueError(f"不支持的执行器类型: {kind}")
+
+
+class FileReadJob:
+    """文件夹解读作业"""
+    
+    def __init__(self, folder_path: str, summary_length: int = 200, executor: str = 'threads',
+                 max_workers: int = 4, max_pending: int = None, model_name: str = None,
+                 ai_result_file: str = None,
+                 progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                 result_callback: Optional[Callable[[Dict[str, Any], str], None]] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 resumable: bool = False):
+        """
+        初始化解读作业
+        
+        Args:
+            folder_path: 要解读的文件夹
+            summary_length: 摘要长度
+            executor: 执行器类型，见EXECUTOR_KINDS
+            max_workers: 最大并发数
+            max_pending: 在途任务数上限，默认为max_workers的2倍
+            model_name: 指定模型，None时由FileReader自动选择
+            ai_result_file: 结果文件，默认为应用数据目录下的ai_organize_result.json
+            progress_callback: 每个文件完成后调用 progress_callback(已处理数, 总数, 文件名)
+            result_callback: 每个文件完成后调用 result_callback(结果, 结果类型)，
+                结果类型为 success / failed / skipped / path_updated
+            cancel_event: 取消事件，设置后不再提交新文件，尚未开始的文件被丢弃
+            resumable: 是否持久化作业状态（见job_store），中断后再次运行同一文件夹时
+                沿用上次的文件顺序并加入新增的文件，跳过已完成的文件，失败的文件按退避策略重试
+        """
+        if executor not in EXECUTOR_KINDS:
+            raise ValueError(f"不支持的执行器类型: {executor}")
+        self.folder_path = folder_path
+        self.summary_length = summary_length
+        self.executor_kind = executor
+        self.max_workers = max(1, max_workers)
+        # inline执行器提交即完成，逐个处理结果，保证进度和取消及时生效
+        self.max_pending = 1 if executor == 'inline' else max(1, max_pending or self.max_workers * 2)
+        self.model_name = model_name
+        self.ai_result_file = ai_result_file
+        self.progress_callback = progress_callback
+        self.result_callback = result_callback
+        self.cancel_event = cancel_event or threading.Event()
+        self.resumable = resumable
+        self.job_store = None
+        
+        self.total_files = 0
+        self.resumed_files = 0
+        self.processed_files = 0
+        self.stats = {'success': 0, 'failed': 0, 'skipped': 0, 'path_updated': 0, 'write_failed': 0}
+        # 各阶段累计耗时（秒）；read为各文件解读耗时之和，并发时可能大于总耗时
+        self.timings = {'scan': 0.0, 'read': 0.0, 'write': 0.0, 'total': 0.0}
+        self.recent_errors = deque(maxlen=20)
+        self._files: List[str] = []
+        self._file_reader = None
+    
+    def cancel(self) -> None:
+        """取消作业"""
+        self.cancel_event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+    
+    def run(self) -> Dict[str, Any]:
+        """
+        执行作业（阻塞直到完成或取消）
+        
+        Returns:
+            作业摘要：total_files、processed_files、各结果类型计数、timings、recent_errors、cancelled
+        """
+        job_start = time.perf_counter()
+        if self.ai_result_file is None:
+            from tidyfile.utils.app_paths import get_app_paths
+            self.ai_result_file = str(get_app_paths().ai_results_file)
+        
+        if self.resumable:
+            from tidyfile.core.job_store import open_job
+            self.job_store = open_job('read', self.folder_path, {'summary_length': self.summary_length},
+                                      model_name=self.model_name)
+        
+        stage_start = time.perf_counter()
+        files = list(iter_readable_files(self.folder_path))
+        if self.job_store is not None:
+            if self.job_store.has_files():
+                # 恢复上次中断的作业，沿用当时的文件顺序并加入新增的文件
+                files = self.job_store.merge_files(files)
+            else:
+                self.job_store.save_files(files)
+        self.timings['scan'] = time.perf_counter() - stage_start
+        self.total_files = len(files)
+        self._files = files
+        
+        to_process = list(self.job_store.iter_pending(files)) if self.job_store is not None else files
+        self.resumed_files = self.total_files - len(to_process)
+        self.processed_files = self.resumed_files
+        logging.info(f"解读作业扫描完成: {self.folder_path}, {self.total_files} 个文件"
+                     f"（无需处理 {self.resumed_files} 个）, 执行器 {self.executor_kind}")
+        
+        try:
+            if to_process:
+                executor = create_executor(self.executor_kind, self.max_workers)
+                try:
+                    self._run_files(executor, to_process)
+                finally:
+                    executor.shutdown(wait=True)
+        finally:
+            if self.job_store is not None:
+                if self.cancelled:
+                    self.job_store.checkpoint(files)
+                    self.job_store.close()
+                else:
+                    self.job_store.finish(files)
+        
+        self.timings['total'] = time.perf_counter() - job_start
+        return self.get_summary()
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """获取作业摘要"""
+        return {
+            'folder_path': self.folder_path,
+            'total_files': self.total_files,
+            'processed_files': self.processed_files,
+            'successful_reads': self.stats['success'],
+            'failed_reads': self.stats['failed'],
+            'skipped_reads': self.stats['skipped'],
+            'path_updated_reads': self.stats['path_updated'],
+            'write_failed': self.stats['write_failed'],
+            'resumed_files': self.resumed_files,
+            'job_status': self.job_store.meta.get('status') if self.job_store is not None else None,
+            'timings': {stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+            'recent_errors': list(self.recent_errors),
+            'cancelled': self.cancelled
+        }
+    
+    def _run_files(self, executor: concurrent.futures.Executor, files: List[str]) -> None:
+        """按在途上限提交文件，边完成边写入"""
+        pending = {}
+        for file_path in files:
+            if self.cancelled:
+                break
+            future = executor.submit(read_file, file_path, self.summary_length, self.model_name, self.ai_result_file)
+            pending[future] = file_path
+            if len(pending) >= self.max_pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                self._collect(done, pending)
+        
+        if self.cancelled:
+            for future in pending:
+                future.cancel()
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            self._collect(done, pending)
+    
+    def _collect(self, done, pending: Dict) -> None:
+        for future in done:
+            file_path = pending.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'file_path': file_path, 'file_name': Path(file_path).name,
+                          'success': False, 'error': str(e), 'read_seconds': 0.0}
+            self._handle_result(result, file_path)
+    
+    def _handle_result(self, result: Dict[str, Any], file_path: str) -> None:
+        """统计并写入单个结果（作业线程中串行执行）"""
+        self.timings['read'] += result.pop('read_seconds', 0.0)
+        file_name = result.get('file_name') or Path(result.get('file_path', '')).name
+        processing_status = result.get('processing_status', '')
+        
+        stage_start = time.perf_counter()
+        written = False
+        if processing_status == '已跳过':
+            outcome = 'skipped'
+        elif processing_status == '路径已更新':
+            outcome = 'path_updated'
+            written = self._append_result(result)
+        elif result.get('success'):
+            outcome = 'success'
+            if not result.get('tags'):
+                result['tags'] = self._get_writer().extract_path_tags(result['file_path'], self.folder_path)
+            written = self._append_result(result)
+            if not written:
+                logging.warning(f"文件解读成功但写入失败: {file_name}")
+        else:
+            outcome = 'failed'
+            error_msg = result.get('error') or '未知错误'
+            self.recent_errors.append((file_name, error_msg))
+            logging.warning(f"文件解读失败: {file_name} - {error_msg}")
+        
+        # 结果写入后再记录作业状态，崩溃时最多重复处理已写入但未记录的文件
+        if self.job_store is not None:
+            if outcome == 'failed':
+                self.job_store.mark_failed(file_path, result.get('error') or '')
+            elif outcome == 'skipped' or written:
+                self.job_store.mark_done(file_path)
+            else:
+                self.job_store.mark_failed(file_path, '写入结果失败')
+        self.timings['write'] += time.perf_counter() - stage_start
+        
+        self.stats[outcome] += 1
+        self.processed_files += 1
+        if self.job_store is not None and self.processed_files % CHECKPOINT_EVERY == 0:
+            self.job_store.checkpoint(self._files)
+        
+        if self.result_callback is not None:
+            try:
+                self.result_callback(result, outcome)
+            except Exception as e:
+                logging.warning(f"解读结果回调失败: {e}")
+        if self.progress_callback is not None:
+            try:
+                self.progress_callback(self.processed_files, self.total_files, file_name)
+            except Exception as e:
+                logging.warning(f"解读进度回调失败: {e}")
+    
+    def _get_writer(self):
+        """作业线程使用的FileReader（只用于提取标签和写入结果，不调用模型）"""
+        if self._file_reader is None:
+            from tidyfile.core.file_reader import FileReader
+            self._file_reader = FileReader(model_name=self.model_name)
+        return self._file_reader
+    
+    def _append_result(self, result: Dict[str, Any]) -> bool:
+        """安全地追加结果到文件，使用全局锁防止并发冲突"""
+        with _result_file_lock:
+            try:
+                self._get_writer().append_result_to_file(self.ai_result_file, result, self.folder_path)
+                return True
+            except Exception as e:
+                self.stats['write_failed'] += 1
+                logging.error(f"写入结果失败: {result.get('file_path')} - {e}")
+                return False
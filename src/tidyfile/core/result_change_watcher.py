@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果文件变更监视器
+
+监视 ai_organize_result.json 的变化，并计算增量变更：
+1. 轮询文件的修改时间和大小，只在文件真正变化时才重新解析
+2. 按记录键和内容摘要对比前后两次快照，得到新增、修改、删除的记录
+3. 将增量变更推送给所有订阅者（如查看器服务器的SSE连接）
+4. 保留最近的变更历史，断线重连的客户端可以只补齐缺失的变更
+"""
+
+import os
+import json
+import queue
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+
+def get_record_key(record: Dict[str, Any]) -> str:
+    """
+    生成记录的标识键
+    
+    使用文件名加源路径（网页文章）或最终目标路径（本地文件）标识一条记录，
+    查看器前端使用相同的规则匹配记录。
+    """
+    file_name = record.get('文件名') or record.get('文章标题') or ''
+    location = record.get('源文件路径') or record.get('最终目标路径') or ''
+    return f"{file_name}|{location}"
+
+
+def _record_digest(record: Dict[str, Any]) -> str:
+    """计算记录内容摘要，用于判断记录是否被修改"""
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+class ResultChangeWatcher:
+    """结果文件变更监视器"""
+    
+    def __init__(self, result_file: str = None, poll_interval: float = 1.0,
+                 history_size: int = 200, subscriber_queue_size: int = 100):
+        """
+        初始化变更监视器
+        
+        Args:
+            result_file: 结果文件路径，默认为应用数据目录下的ai_organize_result.json
+            poll_interval: 轮询间隔（秒）
+            history_size: 保留的变更事件数量，用于断线重连补齐
+            subscriber_queue_size: 每个订阅者的事件队列长度，队列满时该订阅者需要重新加载全量数据
+        """
+        if result_file is None:
+            from tidyfile.utils.app_paths import get_app_paths
+            result_file = str(get_app_paths().ai_results_file)
+        
+        self.result_file = str(result_file)
+        self.poll_interval = poll_interval
+        self.subscriber_queue_size = subscriber_queue_size
+        
+        self.lock = threading.Lock()
+        self.version = 0
+        self.history = deque(maxlen=history_size)
+        self.subscribers = set()
+        
+        self._snapshot = {}  # 记录键 -> 内容摘要
+        self._file_signature = None
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self) -> None:
+        """建立初始快照并启动轮询线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        # 初始快照不产生变更事件，客户端首次仍通过 /api/data-file 加载全量数据
+        records = self._read_records()
+        if records is not None:
+            self._snapshot = self._build_snapshot(records)
+            self._file_signature = self._get_file_signature()
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll_worker, daemon=True)
+        self._thread.start()
+        logging.info(f"结果文件变更监视已启动: {self.result_file}")
+    
+    def stop(self) -> None:
+        """停止轮询线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval * 2)
+    
+    def subscribe(self) -> queue.Queue:
+        """注册订阅者，返回接收变更事件的队列"""
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        """注销订阅者"""
+        with self.lock:
+            self.subscribers.discard(subscriber)
+    
+    def get_events_since(self, last_version: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取指定版本之后的变更事件
+        
+        Returns:
+            变更事件列表；如果历史中已不包含所需的事件，或客户端的版本比当前版本还新
+            （服务器重启后版本从0重新计数），返回None（客户端需重新加载全量数据）
+        """
+        with self.lock:
+            if last_version > self.version:
+                return None
+            if last_version == self.version:
+                return []
+            if not self.history or self.history[0]['version'] > last_version + 1:
+                return None
+            return [event for event in self.history if event['version'] > last_version]
+    
+    def check_for_changes(self) -> Optional[Dict[str, Any]]:
+        """
+        检查结果文件是否变化，变化时计算并广播增量事件
+        
+        Returns:
+            本次产生的变更事件，没有变化时返回None
+        """
+        signature = self._get_file_signature()
+        if signature == self._file_signature:
+            return None
+        
+        records = self._read_records()
+        if records is None:
+            # 文件正在写入或格式错误，下次轮询再试
+            return None
+        self._file_signature = signature
+        
+        new_snapshot = {}
+        added = []
+        modified = []
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            key = get_record_key(record)
+            digest = _record_digest(record)
+            new_snapshot[key] = digest
+            
+            old_digest = self._snapshot.get(key)
+            if old_digest is None:
+                added.append({'key': key, 'record': record})
+            elif old_digest != digest:
+                modified.append({'key': key, 'record': record})
+        
+        removed = [key for key in self._snapshot if key not in new_snapshot]
+        self._snapshot = new_snapshot
+        
+        if not (added or modified or removed):
+            return None
+        
+        with self.lock:
+            self.version += 1
+            event = {
+                'version': self.version,
+                'added': added,
+                'modified': modified,
+                'removed': removed,
+                'total': len(new_snapshot)
+            }
+            self.history.append(event)
+            subscribers = list(self.subscribers)
+        
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # 订阅者消费过慢，通知其重新加载全量数据
+                self._reset_subscriber(subscriber)
+        
+        logging.info(f"结果文件变更: 新增 {len(added)}, 修改 {len(modified)}, 删除 {len(removed)}")
+        return event
+    
+    def _reset_subscriber(self, subscriber: queue.Queue) -> None:
+        """清空订阅者队列并放入重新加载标记"""
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            subscriber.put_nowait({'reset': True, 'version': self.version})
+        except queue.Full:
+            pass
+    
+    def _poll_worker(self) -> None:
+        """轮询工作线程"""
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logging.error(f"检查结果文件变更失败: {e}")
+    
+    def _get_file_signature(self) -> Optional[Tuple[int, int]]:
+        """获取文件签名（修改时间, 大小），文件不存在时返回None"""
+        try:
+            stat = os.stat(self.result_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def _read_records(self) -> Optional[List[Dict[str, Any]]]:
+        """读取结果文件，读取失败时返回None"""
+        if not os.path.exists(self.result_file):
+            return []
+        try:
+            with open(self.result_file, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            if not content:
+                return []
+            data = json.loads(content)
+            return data if isinstance(data, list) else None
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError) as e:
+            logging.debug(f"读取结果文件失败，稍后重试: {e}")
+            return None
+    
+    @staticmethod
+    def _build_snapshot(records: List[Dict[str, Any]]) -> Dict[str, str]:
+        """构建记录快照"""
+        return {
+            get_record_key(record): _record_digest(record)
+            for record in records if isinstance(record, dict)
+        }
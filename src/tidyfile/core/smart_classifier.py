@@ -44,11 +44,23 @@ import json
 import logging
 import re
 import signal
-import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Tuple, Any, Optional
 from tidyfile.ai.client_manager import chat_with_ai
+from tidyfile.utils.deadline import DeadlineExceeded, check_deadline, deadline_scope
+from tidyfile.core.embedding_index import preselect_candidates
+from tidyfile.core.chain_tag_trie import ChainTagTrie
+from tidyfile.core.directory_snapshot import DirectorySnapshot
+from tidyfile.core.extractors import COST_AI, BinaryContentError, get_extractor_registry
+from tidyfile.core.hierarchical_choice import (
+    prune_candidate_paths, render_candidate_tree, parse_path_response, validate_path
+)
+
+# 每层目录经向量预筛选后交给AI的候选数
+DIRECTORY_PRESELECT_TOP_K = 20
+# 一次匹配时交给AI的目录树层数，更深的目录从匹配结果处继续逐层匹配
+ONE_SHOT_MAX_DEPTH = 4
 
 class TimeoutError(Exception):
     """超时异常"""
@@ -61,7 +73,8 @@ def timeout_handler(signum, frame):
 class SmartFileClassifier:
     """智能文件分类器"""
     
-    def __init__(self, content_extraction_length: int = 2000, summary_length: int = 200, timeout_seconds: int = 180):
+    def __init__(self, content_extraction_length: int = 2000, summary_length: int = 200, timeout_seconds: int = 180,
+                 one_shot: bool = True):
         """
         初始化智能文件分类器
         
@@ -69,14 +82,19 @@ class SmartFileClassifier:
             content_extraction_length: 内容提取长度（从GUI获取），默认2000字符
             summary_length: 摘要长度（从GUI获取），默认200字符
             timeout_seconds: 单个文件处理超时时间（秒），默认3分钟
+            one_shot: 是否先一次调用AI匹配完整目录路径，失败时再逐层匹配
         """
         self.content_extraction_length = content_extraction_length
         self.summary_length = summary_length
         self.timeout_seconds = timeout_seconds
+        self.one_shot = one_shot
         
         # 文件缓存
         self.file_cache = {}  # 缓存文件信息和元数据
         
+        # 目标目录树快照，逐层匹配时从内存读取子目录
+        self.directory_snapshot = DirectorySnapshot()
+        
         # 设置日志
         self.setup_logging()
         
@@ -165,63 +183,14 @@ class SmartFileClassifier:
     def extract_file_content(self, file_path: str) -> str:
         """提取文件内容（使用GUI设置的长度）"""
         try:
-            file_path_obj = Path(file_path)
-            extension = file_path_obj.suffix.lower()
-            
-            if extension == '.pdf':
-                return self.extract_pdf_content(file_path_obj)
-            elif extension == '.docx':
-                return self.extract_docx_content(file_path_obj)
-            elif extension in ['.txt', '.md']:
-                return self.extract_text_content(file_path_obj)
-            else:
-                return f"文件类型: {extension}，无法提取内容"
-                
-        except Exception as e:
-            logging.error(f"提取文件内容失败: {e}")
+            extractor = get_extractor_registry().get(file_path)
+            if extractor is None or extractor.cost == COST_AI:
+                return f"文件类型: {Path(file_path).suffix.lower()}，无法提取内容"
+            return extractor.extract(file_path, self.content_extraction_length)
+        except BinaryContentError:
             return ""
-    
-    def extract_pdf_content(self, file_path: Path) -> str:
-        """提取PDF内容"""
-        try:
-            import PyPDF2
-            from PyPDF2 import PdfReader, PdfWriter
-            with open(file_path, 'rb') as f:
-                reader = PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-                    if len(text) >= self.content_extraction_length:
-                        break
-                return text[:self.content_extraction_length]
         except Exception as e:
-            logging.error(f"PDF内容提取失败: {e}")
-            return ""
-    
-    def extract_docx_content(self, file_path: Path) -> str:
-        """提取DOCX内容"""
-        try:
-            import docx
-            from docx import Document
-            doc = Document(file_path)
-            text = ""
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-                if len(text) >= self.content_extraction_length:
-                    break
-            return text[:self.content_extraction_length]
-        except Exception as e:
-            logging.error(f"DOCX内容提取失败: {e}")
-            return ""
-    
-    def extract_text_content(self, file_path: Path) -> str:
-        """提取文本内容"""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read(self.content_extraction_length)
-                return content
-        except Exception as e:
-            logging.error(f"文本内容提取失败: {e}")
+            logging.error(f"提取文件内容失败: {e}")
             return ""
     
     def generate_content_summary(self, content: str, file_name: str) -> str:
@@ -291,7 +260,7 @@ class SmartFileClassifier:
     
     def get_level_directories(self, base_directory: str, level: int = 1) -> List[str]:
         """
-        获取指定层级的所有目录
+        获取指定层级的所有目录（从目录树快照读取，不重复遍历磁盘）
         
         Args:
             base_directory: 基础目录
@@ -302,31 +271,16 @@ class SmartFileClassifier:
         """
         try:
             if level == 1:
-                # 使用os.listdir获取一级目录，更简单高效
-                dirs = [name for name in os.listdir(base_directory) 
-                       if os.path.isdir(os.path.join(base_directory, name))]
-                return dirs
-            else:
-                # 对于多级目录，使用pathlib
-                base_path = Path(base_directory)
-                if not base_path.exists():
-                    return []
-                
-                directories = []
-                for item in base_path.rglob('*'):
-                    if item.is_dir():
-                        # 计算相对路径的层级
-                        relative_path = item.relative_to(base_path)
-                        path_parts = relative_path.parts
-                        if len(path_parts) == level:
-                            directories.append(item.name)
-                
-                return directories
-                
+                return self.directory_snapshot.get_children(base_directory)
+            return self.directory_snapshot.get_descendants(base_directory, level)
         except Exception as e:
             logging.error(f"获取{level}级目录失败: {e}")
             return []
     
+    def reset_directory_snapshot(self) -> None:
+        """丢弃目录树快照，下次匹配时重新读取目标目录（每次整理开始时调用）"""
+        self.directory_snapshot = DirectorySnapshot()
+    
     def match_level_directory(self, file_info: Dict[str, Any], content: str, summary: str, 
                              base_directory: str, current_path: str, level: int) -> Tuple[str, str]:
         """
@@ -344,8 +298,8 @@ class SmartFileClassifier:
             (匹配的目录名, 匹配理由)
         """
         try:
-            # 获取当前层级的所有目录
-            level_dirs = self.get_level_directories(base_directory, level)
+            # 获取当前层级的所有目录（base_directory已经是上一级匹配到的目录，取它的直接子目录）
+            level_dirs = self.get_level_directories(base_directory, 1)
             if not level_dirs:
                 return "", "该层级没有子目录"
             
@@ -364,9 +318,18 @@ class SmartFileClassifier:
                     match_reason = f"文件名包含: 文件名包含目录名 {dir_name}"
                     return dir_name, match_reason
             
-            # 第三步：使用AI进行智能匹配
+            # 第三步：用向量相似度预筛选候选目录，匹配度足够高时直接采用
+            query = f"{file_name}\n{summary[:200] if summary else ''}"
+            dir_texts = [f"{current_path}\\{dir_name}" if current_path else dir_name for dir_name in level_dirs]
+            candidate_dirs, confident_dir, score = preselect_candidates(
+                query, level_dirs, dir_texts, top_k=DIRECTORY_PRESELECT_TOP_K
+            )
+            if confident_dir:
+                return confident_dir, f"向量匹配: 与目录 {confident_dir} 的相似度 {score:.2f}"
+            
+            # 第四步：使用AI进行智能匹配
             # 获取用户自定义分类规则
-            custom_rules = self.get_custom_rules_for_prompt(level_dirs)
+            custom_rules = self.get_custom_rules_for_prompt(candidate_dirs)
             
             # 构建简化的匹配提示词（三层防护）
             prompt = f"""不需要思考，直接输出。
@@ -379,7 +342,7 @@ class SmartFileClassifier:
                 - 内容摘要：{summary[:200] if summary else '无摘要'}
 
 当前层级可选目录（必须严格从以下列表中选择一个，不要添加任何序号、标点或额外字符）：
-{chr(10).join(level_dirs)}
+{chr(10).join(candidate_dirs)}
 
 {custom_rules}
 
@@ -563,6 +526,97 @@ class SmartFileClassifier:
             logging.error(f"清理目录名失败: {e}")
             return ai_result.strip()
     
+    def build_directory_tree(self, target_directory: str, max_depth: int = ONE_SHOT_MAX_DEPTH) -> ChainTagTrie:
+        """
+        获取目标目录的子目录树（最多max_depth层），以前缀树表示
+        
+        Args:
+            target_directory: 目标目录
+            max_depth: 展开的层数
+        
+        Returns:
+            目录前缀树（来自目录树快照，不要修改），每个节点是一个目录名
+        """
+        return self.directory_snapshot.get_trie(target_directory, max_depth)
+    
+    def match_directory_path_one_shot(self, file_info: Dict[str, Any], summary: str,
+                                      target_directory: str) -> Tuple[Optional[List[str]], str]:
+        """
+        一次调用AI匹配完整目录路径：把裁剪后的目录树交给AI，要求以JSON返回目录路径
+        
+        Args:
+            file_info: 文件信息字典
+            summary: 文件摘要
+            target_directory: 目标目录
+        
+        Returns:
+            (匹配的各级目录名, 说明)；AI返回无效或没有合适目录时目录为None
+        """
+        try:
+            dir_tree = self.build_directory_tree(target_directory)
+            file_name = file_info['file_name']
+            query = f"{file_name}\n{summary[:200] if summary else ''}"
+            candidate_paths = prune_candidate_paths(dir_tree, query, ONE_SHOT_MAX_DEPTH)
+            if not candidate_paths:
+                return None, "目标目录没有子目录"
+            
+            custom_rules = self.get_custom_rules_for_prompt(sorted({path[-1] for path in candidate_paths}))
+            
+            prompt = f"""不需要思考，直接输出。
+
+你是一个专业的文件分类专家。请根据文件信息，从下面的目录树中选择一条最匹配的目录路径。
+
+文件信息：
+- 文件名：{file_name}
+- 文件扩展名：{file_info['file_extension']}
+- 内容摘要：{summary[:200] if summary else '无摘要'}
+
+目录树（每行一个目录，缩进表示层级）：
+{render_candidate_tree(candidate_paths)}
+
+{custom_rules}
+
+匹配优先级：
+1. 最高优先级：目录名是时间命名（如年份、月份），而文件名中包含对应时间
+2. 高优先级：目录名直接包含在文件名中
+3. 中优先级：目录名与文件内容主题高度相关（请仔细阅读上面的分类规则说明）
+4. 低优先级：根据文件类型和扩展名匹配
+
+要求：
+1. 路径必须从一级目录开始，沿目录树逐级向下，尽量选到最深的合适目录
+2. 每一级都必须严格使用目录树中的名称，不要添加任何序号、标点或额外字符
+3. 如果没有合适的目录，返回 {{"path": []}}
+
+只返回JSON，格式如下：
+{{"path": ["一级目录", "二级目录"]}}
+
+/no_think"""
+            
+            messages = [
+                {
+                    'role': 'system',
+                    'content': '你是一个专业的文件分类专家。只输出JSON，不要包含任何思考过程、序号或解释。'
+                },
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ]
+            
+            result = chat_with_ai(messages)
+            path = parse_path_response(self.clean_ai_response(result))
+            if path is None:
+                return None, f"AI返回的不是有效的JSON路径: {result[:100] if result else ''}"
+            if not path:
+                return None, "AI认为没有合适的目录"
+            if not validate_path(dir_tree, path, ONE_SHOT_MAX_DEPTH):
+                return None, f"AI返回的路径不在目录树中: {'/'.join(path)}"
+            return path, "一次匹配成功"
+        
+        except Exception as e:
+            logging.error(f"一次匹配目录路径失败: {e}")
+            return None, f"一次匹配失败: {str(e)}"
+    
     def recommend_target_folder_recursive(self, file_path: str, content: str, summary: str, 
                                          target_directory: str) -> Tuple[str, List[str], str]:
         """
@@ -589,7 +643,27 @@ class SmartFileClassifier:
             level = 1
             max_levels = 10  # 防止无限递归
             
+            # 先一次调用匹配完整路径，无效时从第1级开始逐层匹配
+            if self.one_shot:
+                one_shot_path, one_shot_note = self.match_directory_path_one_shot(file_info, summary, target_directory)
+                if one_shot_path:
+                    for matched_dir in one_shot_path:
+                        match_reason = self.determine_match_reason(file_info['file_name'], matched_dir, summary)
+                        match_reasons.append(f"第{level}级: {match_reason}")
+                        chain_tags.append(matched_dir)
+                        current_base_dir = os.path.normpath(os.path.join(current_base_dir, matched_dir))
+                        level += 1
+                    current_path = "\\".join(chain_tags)
+                    logging.info(f"一次匹配目录路径: {current_path}")
+                    
+                    # 目录树只展开了ONE_SHOT_MAX_DEPTH层，更深的子目录继续逐层匹配
+                    if len(one_shot_path) < ONE_SHOT_MAX_DEPTH or not self.get_level_directories(current_base_dir, 1):
+                        level = max_levels + 1
+                else:
+                    logging.info(f"{one_shot_note}，改为逐层匹配")
+            
             while level <= max_levels:
+                check_deadline()
                 logging.info(f"开始匹配第{level}级目录，当前路径: {current_path}")
                 
                 # 匹配当前层级目录
@@ -649,112 +723,180 @@ class SmartFileClassifier:
             分类结果字典
         """
         start_time = time.time()
-        timing_info = {}
+        state = self.new_classification_state(file_path)
+        logging.info(f"开始分类文件: {state['file_name']}（超时限制: {self.timeout_seconds}秒）")
+        
+        # 使用超时机制包装整个分类过程
+        def classify_with_timeout():
+            self.extract_stage(state)
+            self.summarize_stage(state)
+            self.recommend_stage(state, target_directory)
         
         try:
-            file_name = Path(file_path).name
-            logging.info(f"开始分类文件: {file_name}（超时限制: {self.timeout_seconds}秒）")
-            
-            # 使用超时机制包装整个分类过程
-            def classify_with_timeout():
-                # 第一步：提取文件元数据
-                metadata_start = time.time()
-                file_metadata = self.extract_file_metadata(file_path)
-                metadata_time = round(time.time() - metadata_start, 3)
-                timing_info['metadata_extraction_time'] = metadata_time
-                logging.info(f"文件元数据提取完成，耗时: {metadata_time}秒")
-                
-                # 第二步：提取文件内容（使用GUI设置的长度）
-                extract_start = time.time()
-                content = self.extract_file_content(file_path)
-                extract_time = round(time.time() - extract_start, 3)
-                timing_info['content_extraction_time'] = extract_time
-                logging.info(f"文件内容提取完成，长度: {len(content)} 字符，耗时: {extract_time}秒")
-                
-                # 第三步：生成摘要（使用GUI设置的长度）
-                summary_start = time.time()
-                summary = self.generate_content_summary(content, file_name)
-                summary_time = round(time.time() - summary_start, 3)
-                timing_info['summary_generation_time'] = summary_time
-                logging.info(f"内容摘要生成完成，长度: {len(summary)} 字符，耗时: {summary_time}秒")
-                
-                # 第四步：递归逐层匹配推荐目录
-                recommend_start = time.time()
-                recommended_folder, chain_tags, match_reason = self.recommend_target_folder_recursive(
-                    file_path, content, summary, target_directory
-                )
-                recommend_time = round(time.time() - recommend_start, 3)
-                timing_info['folder_recommendation_time'] = recommend_time
-                
-                return file_metadata, content, summary, recommended_folder, chain_tags, match_reason
-            
-            # 执行带超时的分类
-            file_metadata, content, summary, recommended_folder, chain_tags, match_reason = self.run_with_timeout(classify_with_timeout)
-            
-            total_time = round(time.time() - start_time, 3)
-            timing_info['total_processing_time'] = total_time
-            
-            if recommended_folder:
-                logging.info(f"文件分类完成: {file_name} -> {recommended_folder}，总耗时: {total_time}秒")
-                logging.info(f"摘要: {summary}")
-                logging.info(f"推荐理由: {match_reason}")
-                logging.info(f"链式标签: {chain_tags}")
-            else:
-                # 如果匹配失败，设置默认的失败理由
-                if not match_reason:
-                    match_reason = "分类失败：无法匹配到合适的目录"
-                logging.warning(f"文件分类失败: {file_name}，总耗时: {total_time}秒")
-                logging.warning(f"失败理由: {match_reason}")
-            
-            result = {
-                'file_path': file_path,
-                'file_name': file_name,
-                'file_metadata': file_metadata,
-                'extracted_content': content,
-                'content_summary': summary,
-                'recommended_folder': recommended_folder,
-                'chain_tags': chain_tags,
-                'match_reason': match_reason,  # 使用可能被修改的match_reason
-                'success': bool(recommended_folder),
-                'timing_info': timing_info
-            }
-            
-            return result
+            self.run_with_timeout(classify_with_timeout)
+        except TimeoutError as e:
+            state['result'] = self._timeout_result(state, e)
+        except Exception as e:
+            state['result'] = self._failure_result(state, e)
+        
+        state['elapsed'] = time.time() - start_time
+        return self.finish_classification(state)
+    
+    def new_classification_state(self, file_path: str) -> Dict[str, Any]:
+        """
+        创建单个文件的分类状态，各分类阶段依次填充其中的字段
+        
+        Args:
+            file_path: 文件路径
             
+        Returns:
+            分类状态字典，result字段在分类失败或超时时被设置
+        """
+        return {
+            'file_path': file_path,
+            'file_name': Path(file_path).name,
+            'timing_info': {},
+            'file_metadata': {},
+            'content': '',
+            'summary': '',
+            'recommended_folder': None,
+            'chain_tags': [],
+            'match_reason': '',
+            'elapsed': 0.0,
+            'result': None
+        }
+    
+    def extract_stage(self, state: Dict[str, Any]) -> None:
+        """分类阶段一：提取文件元数据和内容（使用GUI设置的长度）"""
+        file_path = state['file_path']
+        timing_info = state['timing_info']
+        
+        metadata_start = time.time()
+        state['file_metadata'] = self.extract_file_metadata(file_path)
+        metadata_time = round(time.time() - metadata_start, 3)
+        timing_info['metadata_extraction_time'] = metadata_time
+        logging.info(f"文件元数据提取完成，耗时: {metadata_time}秒")
+        
+        extract_start = time.time()
+        state['content'] = self.extract_file_content(file_path)
+        extract_time = round(time.time() - extract_start, 3)
+        timing_info['content_extraction_time'] = extract_time
+        logging.info(f"文件内容提取完成，长度: {len(state['content'])} 字符，耗时: {extract_time}秒")
+    
+    def summarize_stage(self, state: Dict[str, Any]) -> None:
+        """分类阶段二：生成摘要（使用GUI设置的长度）"""
+        summary_start = time.time()
+        state['summary'] = self.generate_content_summary(state['content'], state['file_name'])
+        summary_time = round(time.time() - summary_start, 3)
+        state['timing_info']['summary_generation_time'] = summary_time
+        logging.info(f"内容摘要生成完成，长度: {len(state['summary'])} 字符，耗时: {summary_time}秒")
+    
+    def recommend_stage(self, state: Dict[str, Any], target_directory: str) -> None:
+        """分类阶段三：递归逐层匹配推荐目录"""
+        recommend_start = time.time()
+        recommended_folder, chain_tags, match_reason = self.recommend_target_folder_recursive(
+            state['file_path'], state['content'], state['summary'], target_directory
+        )
+        state['recommended_folder'] = recommended_folder
+        state['chain_tags'] = chain_tags
+        state['match_reason'] = match_reason
+        state['timing_info']['folder_recommendation_time'] = round(time.time() - recommend_start, 3)
+    
+    def run_classification_stage(self, state: Dict[str, Any], stage, *args) -> None:
+        """
+        在文件剩余的超时预算内执行一个分类阶段（供分阶段流水线使用）
+        
+        各阶段的处理时间累计到state['elapsed']，累计超过timeout_seconds即视为超时；
+        失败或超时时设置state['result']，之后的阶段直接跳过。
+        
+        Args:
+            state: 分类状态
+            stage: 阶段函数，如extract_stage
+            *args: 阶段函数的其他参数
+        """
+        if state['result'] is not None:
+            return
+        start_time = time.time()
+        try:
+            remaining = self.timeout_seconds - state['elapsed']
+            if remaining <= 0:
+                raise TimeoutError(f"操作超时（{self.timeout_seconds}秒）")
+            self.run_with_time_limit(remaining, stage, state, *args)
         except TimeoutError as e:
-            total_time = round(time.time() - start_time, 3)
-            timing_info['total_processing_time'] = total_time
-            logging.error(f"文件分类超时: {file_name}，总耗时: {total_time}秒，超时限制: {self.timeout_seconds}秒")
-            return {
-                'file_path': file_path,
-                'file_name': Path(file_path).name,
-                'file_metadata': {},
-                'extracted_content': '',
-                'content_summary': '',
-                'recommended_folder': None,
-                'chain_tags': [],
-                'match_reason': f"分类超时：处理时间超过{self.timeout_seconds}秒",
-                'success': False,
-                'error': str(e),
-                'timing_info': timing_info
-            }
+            state['result'] = self._timeout_result(state, e)
         except Exception as e:
-            total_time = round(time.time() - start_time, 3)
-            timing_info['total_processing_time'] = total_time
-            logging.error(f"文件分类失败: {e}，总耗时: {total_time}秒")
-            return {
-                'file_path': file_path,
-                'file_name': Path(file_path).name,
-                'file_metadata': {},
-                'extracted_content': '',
-                'content_summary': '',
-                'recommended_folder': None,
-                'chain_tags': [],
-                'match_reason': f"分类失败: {str(e)}",
-                'success': False,
-                'error': str(e),
-                'timing_info': timing_info
-            }
+            state['result'] = self._failure_result(state, e)
+        finally:
+            state['elapsed'] += time.time() - start_time
+    
+    def finish_classification(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        根据分类状态生成分类结果
+        
+        Args:
+            state: 分类状态
+            
+        Returns:
+            分类结果字典
+        """
+        file_name = state['file_name']
+        total_time = round(state['elapsed'], 3)
+        state['timing_info']['total_processing_time'] = total_time
+        
+        if state['result'] is not None:
+            return state['result']
+        
+        recommended_folder = state['recommended_folder']
+        match_reason = state['match_reason']
+        if recommended_folder:
+            logging.info(f"文件分类完成: {file_name} -> {recommended_folder}，总耗时: {total_time}秒")
+            logging.info(f"摘要: {state['summary']}")
+            logging.info(f"推荐理由: {match_reason}")
+            logging.info(f"链式标签: {state['chain_tags']}")
+        else:
+            # 如果匹配失败，设置默认的失败理由
+            if not match_reason:
+                match_reason = "分类失败：无法匹配到合适的目录"
+            logging.warning(f"文件分类失败: {file_name}，总耗时: {total_time}秒")
+            logging.warning(f"失败理由: {match_reason}")
+        
+        return {
+            'file_path': state['file_path'],
+            'file_name': file_name,
+            'file_metadata': state['file_metadata'],
+            'extracted_content': state['content'],
+            'content_summary': state['summary'],
+            'recommended_folder': recommended_folder,
+            'chain_tags': state['chain_tags'],
+            'match_reason': match_reason,  # 使用可能被修改的match_reason
+            'success': bool(recommended_folder),
+            'timing_info': state['timing_info']
+        }
+    
+    def _timeout_result(self, state: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        """分类超时的结果"""
+        logging.error(f"文件分类超时: {state['file_name']}，超时限制: {self.timeout_seconds}秒")
+        return self._error_result(state, f"分类超时：处理时间超过{self.timeout_seconds}秒", error)
+    
+    def _failure_result(self, state: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        """分类出错的结果"""
+        logging.error(f"文件分类失败: {error}")
+        return self._error_result(state, f"分类失败: {str(error)}", error)
+    
+    def _error_result(self, state: Dict[str, Any], match_reason: str, error: Exception) -> Dict[str, Any]:
+        return {
+            'file_path': state['file_path'],
+            'file_name': state['file_name'],
+            'file_metadata': {},
+            'extracted_content': '',
+            'content_summary': '',
+            'recommended_folder': None,
+            'chain_tags': [],
+            'match_reason': match_reason,
+            'success': False,
+            'error': str(error),
+            'timing_info': state['timing_info']
+        }
     
     def clear_file_cache(self, file_path: str) -> None:
         """清除文件缓存"""
@@ -778,8 +920,17 @@ class SmartFileClassifier:
             
             return tags
     
-    def append_result_to_file(self, ai_result_file: str, result: dict, target_directory: str = "") -> None:
-        """将AI结果追加到JSON文件（使用并发管理器）"""
+    def append_result_to_file(self, ai_result_file: str, result: dict, target_directory: str = "",
+                              transfer_success: Optional[bool] = None) -> None:
+        """
+        将AI结果追加到JSON文件（使用并发管理器）
+        
+        Args:
+            ai_result_file: 结果文件
+            result: 分类结果
+            target_directory: 目标目录
+            transfer_success: 文件转移是否成功，False时记录为迁移失败，None表示不区分（按分类结果）
+        """
         try:
             # 使用新的路径管理获取正确的文件路径
             from tidyfile.utils.app_paths import get_app_paths
@@ -787,9 +938,10 @@ class SmartFileClassifier:
             if ai_result_file == "ai_organize_result.json":
                 ai_result_file = str(app_paths.ai_results_file)
             
-            # 构建最终目标路径
+            # 构建最终目标路径（转移失败时文件不在目标路径，不记录）
+            migrated = result['success'] and transfer_success is not False
             final_target_path = ""
-            if result['success'] and result['recommended_folder']:
+            if migrated and result['recommended_folder']:
                 final_target_path = os.path.join(target_directory, result['recommended_folder'], result['file_name'])
             
             # 根据最终目标路径生成标签（与batch_add_chain_tags.py保持一致）
@@ -815,7 +967,7 @@ class SmartFileClassifier:
                 "处理耗时": result['timing_info'].get('total_processing_time', 0),
                 "最终目标路径": final_target_path,
                 "操作类型": "文件迁移",
-                "处理状态": "迁移成功" if result['success'] else "迁移失败",
+                "处理状态": "迁移成功" if migrated else "迁移失败",
                 "标签": tags,
                 "文件元数据": {
                     "file_name": result['file_metadata']['file_name'],
@@ -890,29 +1042,32 @@ class SmartFileClassifier:
         Raises:
             TimeoutError: 如果函数执行超时
         """
-        result = [None]
-        exception = [None]
-        
-        def target():
-            try:
-                result[0] = func(*args, **kwargs)
-            except Exception as e:
-                exception[0] = e
+        return self.run_with_time_limit(self.timeout_seconds, func, *args, **kwargs)
+    
+    def run_with_time_limit(self, timeout: float, func, *args, **kwargs):
+        """
+        在指定的时间限制下运行函数
         
-        thread = threading.Thread(target=target)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout=self.timeout_seconds)
+        函数在当前线程中执行，截止时间通过上下文传递：AI请求以剩余时间作为请求超时，
+        逐层匹配、逐页提取等循环每一步检查截止时间，到期后立即停止，不留下后台线程。
         
-        if thread.is_alive():
-            logging.warning(f"函数执行超时（{self.timeout_seconds}秒）")
-            raise TimeoutError(f"操作超时（{self.timeout_seconds}秒）")
+        Args:
+            timeout: 时间限制（秒）
+            func: 要执行的函数
+            *args, **kwargs: 函数参数
         
-        if exception[0]:
-            raise exception[0]
+        Returns:
+            函数执行结果
         
-        return result[0] 
-
+        Raises:
+            TimeoutError: 如果函数执行超时
+        """
+        try:
+            with deadline_scope(timeout):
+                return func(*args, **kwargs)
+        except DeadlineExceeded:
+            logging.warning(f"函数执行超时（{timeout:.0f}秒）")
+            raise TimeoutError(f"操作超时（{self.timeout_seconds}秒）")
 
 def main():
     """单独执行时的主函数"""
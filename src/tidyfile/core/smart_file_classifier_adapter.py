@@ -12,18 +12,30 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 from tidyfile.core.smart_classifier import SmartFileClassifier
+from tidyfile.core.file_mover import ParallelFileMover
+from tidyfile.core.classification_pipeline import (
+    ClassificationPipeline, DEFAULT_EXTRACT_WORKERS, DEFAULT_SUMMARY_WORKERS, DEFAULT_CLASSIFY_WORKERS
+)
 
 class SmartFileClassifierAdapter:
     """智能文件分类器适配器，适配主程序接口"""
     
-    def __init__(self, model_name: str = None, enable_transfer_log: bool = True, timeout_seconds: int = 180):
+    def __init__(self, model_name: str = None, enable_transfer_log: bool = True, timeout_seconds: int = 180,
+                 transfer_workers: int = 4, verify_transfers: bool = False,
+                 extract_workers: int = DEFAULT_EXTRACT_WORKERS, summary_workers: int = DEFAULT_SUMMARY_WORKERS,
+                 classify_workers: int = DEFAULT_CLASSIFY_WORKERS):
         """
         初始化适配器
         
         Args:
             model_name: 模型名称（兼容旧接口，但新分类器使用ai_client_manager）
-            enable_transfer_log: 是否启用传输日志（兼容旧接口）
+            enable_transfer_log: 是否启用传输日志，启用时每个完成的转移都会写入转移日志
             timeout_seconds: 单个文件处理超时时间（秒），默认3分钟
+            transfer_workers: 文件转移的I/O线程数
+            verify_transfers: 复制后是否用MD5校验目标文件
+            extract_workers: 分类流水线的内容提取线程数
+            summary_workers: 分类流水线的摘要生成线程数
+            classify_workers: 分类流水线的目录匹配线程数
         """
         # 默认参数，可通过set_parameters方法动态设置
         self._content_extraction_length = 2000
@@ -37,10 +49,21 @@ class SmartFileClassifierAdapter:
             'timeout_seconds': self._timeout_seconds
         }
         
+        self.model_name = model_name
+        
         # 传输日志相关（兼容旧接口）
         self.enable_transfer_log = enable_transfer_log
         self.transfer_logs = []
         
+        # 文件转移设置
+        self.transfer_workers = transfer_workers
+        self.verify_transfers = verify_transfers
+        
+        # 分类流水线设置
+        self.extract_workers = extract_workers
+        self.summary_workers = summary_workers
+        self.classify_workers = classify_workers
+        
         # 初始化智能分类器
         self.classifier = SmartFileClassifier(
             content_extraction_length=self._content_extraction_length,
@@ -160,7 +183,7 @@ class SmartFileClassifierAdapter:
     
     def organize_files(self, files=None, target_base_dir=None, copy_mode=True, 
                       source_directory=None, target_directory=None, 
-                      progress_callback=None) -> Dict[str, Any]:
+                      progress_callback=None, resumable=True) -> Dict[str, Any]:
         """
         整理文件（兼容旧接口）
         
@@ -170,8 +193,15 @@ class SmartFileClassifierAdapter:
             copy_mode: 是否复制模式（兼容旧接口）
             source_directory: 源目录
             target_directory: 目标目录
-            progress_callback: 进度回调函数
+            progress_callback: 进度回调函数，每完成一个文件的分类调用一次
+                progress_callback(已完成数, 总数, 文件名)，在当前线程中调用
+            resumable: 是否持久化作业状态（见job_store）。复制模式下源文件不会减少，
+                中断后再次整理同一源目录到同一目标目录时跳过已转移成功的文件
             
+        文件经分阶段并发流水线（提取、摘要、目录匹配）分类，分类结果在当前线程
+        提交给ParallelFileMover在后台转移，AI分类和文件I/O同时进行。每个文件转移完成后
+        才把结果写入结果文件（转移失败记录为迁移失败），所有转移完成后才返回结果。
+        
         Returns:
             整理结果字典
         """
@@ -195,7 +225,38 @@ class SmartFileClassifierAdapter:
                 }
             
             total_files = len(files)
+            
+            # 可恢复的作业状态：已转移成功的文件不再分类
+            job_store = None
+            job_files = []
+            skipped_files = 0
+            if resumable:
+                try:
+                    from tidyfile.core.job_store import open_job
+                    job_store = open_job('organize', source_directory,
+                                         {'target_directory': os.path.abspath(target_directory),
+                                          'copy_mode': copy_mode,
+                                          'content_extraction_length': self._content_extraction_length,
+                                          'summary_length': self._summary_length},
+                                         model_name=self.model_name)
+                    job_files = [str(file_info['path']) for file_info in files]
+                    if job_store.has_files():
+                        job_files = job_store.merge_files(job_files)
+                    else:
+                        job_store.save_files(job_files)
+                    pending = set(job_store.iter_pending(job_files))
+                    files = [file_info for file_info in files if str(file_info['path']) in pending]
+                    skipped_files = total_files - len(files)
+                    if skipped_files:
+                        logging.info(f"恢复整理作业: 跳过 {skipped_files} 个已完成或等待重试的文件")
+                except Exception as e:
+                    logging.warning(f"打开整理作业状态失败，将处理全部文件: {e}")
+                    job_store = None
+            
             successful_moves = 0
+            
+            # 本次整理使用新的目标目录树快照，之后的目录查找都从内存读取
+            self.classifier.reset_directory_snapshot()
             failed_moves = 0
             success_list = []
             failed_list = []
@@ -203,87 +264,137 @@ class SmartFileClassifierAdapter:
             # 创建结果文件
             result_file = "smart_classify_result.json"
             
-            for i, file_info in enumerate(files):
-                file_path = str(file_info['path'])
-                filename = file_info['name']
-                
-                # 更新进度
-                if progress_callback:
-                    progress_callback(i + 1, total_files, filename)
-                
+            # 使用新的路径管理获取主程序期望的结果文件路径
+            from tidyfile.utils.app_paths import get_app_paths
+            app_paths = get_app_paths()
+            ai_result_file = str(app_paths.ai_results_file)
+            
+            # 转移日志
+            transfer_log_manager = None
+            if self.enable_transfer_log:
                 try:
-                    # 分析并分类文件
-                    result = self.classify_file(file_path, target_directory)
-                    
-                    if result['success'] and result['recommended_folder']:
-                        # 构建目标路径
-                        target_path = os.path.join(target_directory, result['recommended_folder'], filename)
-                        
-                        # 创建目标目录
-                        target_dir = os.path.dirname(target_path)
-                        os.makedirs(target_dir, exist_ok=True)
-                        
-                        # 复制文件
-                        import shutil
-                        shutil.copy2(file_path, target_path)
-                        
-                        # 记录成功
-                        success_list.append({
-                            'source_path': file_path,
-                            'target_path': target_path,
-                            'target_folder': result['recommended_folder'],
-                            'reason': result['match_reason']
-                        })
-                        successful_moves += 1
-                        
-                        logging.info(f"文件复制成功: {filename} -> {result['recommended_folder']}")
+                    from tidyfile.core.transfer_log_manager import TransferLogManager
+                    transfer_log_manager = TransferLogManager()
+                    transfer_log_manager.start_transfer_session(
+                        f"organize_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                    )
+                except Exception as e:
+                    logging.warning(f"创建转移日志失败，将不记录本次转移: {e}")
+                    transfer_log_manager = None
+            
+            def record_transfer(transfer):
+                # 转移完成后才写入结果文件，转移失败的文件记录为迁移失败
+                result = transfer['context']['result']
+                self.classifier.append_result_to_file(result_file, result, target_directory, transfer['success'])
+                self.classifier.append_result_to_file(ai_result_file, result, target_directory, transfer['success'])
+                if job_store is not None:
+                    if transfer['success']:
+                        job_store.mark_done(transfer['source_path'])
                     else:
-                        # 分类失败，移动到"分类失败"文件夹
-                        failed_folder = "分类失败"
-                        failed_target_path = os.path.join(source_directory, failed_folder, filename)
-                        
-                        # 创建"分类失败"文件夹
-                        failed_dir = os.path.join(source_directory, failed_folder)
-                        os.makedirs(failed_dir, exist_ok=True)
-                        
-                        # 移动文件到"分类失败"文件夹
-                        import shutil
-                        shutil.move(file_path, failed_target_path)
+                        job_store.mark_failed(transfer['source_path'], transfer['error'] or '')
+            
+            # 分类成功的文件按copy_mode复制或移动到目标目录，分类失败的文件移动到"分类失败"文件夹
+            operation_type = 'copy' if copy_mode else 'move'
+            mover = ParallelFileMover(
+                max_workers=self.transfer_workers,
+                verify=self.verify_transfers,
+                transfer_log_manager=transfer_log_manager,
+                on_complete=record_transfer
+            )
+            
+            pipeline = ClassificationPipeline(
+                self.classifier, target_directory,
+                extract_workers=self.extract_workers,
+                summary_workers=self.summary_workers,
+                classify_workers=self.classify_workers
+            )
+            
+            completed = 0
+            try:
+                for index, result in pipeline.run(str(file_info['path']) for file_info in files):
+                    file_info = files[index]
+                    file_path = str(file_info['path'])
+                    filename = file_info['name']
+                    
+                    # 更新进度
+                    completed += 1
+                    if progress_callback:
+                        progress_callback(skipped_files + completed, total_files, filename)
+                    
+                    try:
+                        if result['success'] and result['recommended_folder']:
+                            # 构建目标路径，提交到转移队列
+                            target_path = os.path.join(target_directory, result['recommended_folder'], filename)
+                            mover.submit(file_path, target_path, operation_type,
+                                         target_folder=result['recommended_folder'],
+                                         context={'classified': True, 'reason': result['match_reason'],
+                                                  'result': result})
+                        else:
+                            # 分类失败，移动到"分类失败"文件夹
+                            failed_folder = "分类失败"
+                            failed_target_path = os.path.join(source_directory, failed_folder, filename)
+                            mover.submit(file_path, failed_target_path, 'move',
+                                         target_folder=failed_folder,
+                                         context={'classified': False,
+                                                  'reason': result.get('match_reason', '分类失败：无法匹配到合适的目录'),
+                                                  'result': result})
+                            logging.warning(f"文件分类失败: {filename}")
                         
-                        logging.info(f"文件分类失败，已移动到: {filename} -> {failed_folder}")
+                        # 清理文件缓存
+                        self.classifier.clear_file_cache(file_path)
                         
-                        # 记录失败
+                    except Exception as e:
+                        error_msg = f"处理文件失败: {str(e)}"
                         failed_list.append({
                             'source_path': file_path,
-                            'target_path': failed_target_path,
-                            'error': result.get('match_reason', '分类失败：无法匹配到合适的目录')
+                            'target_path': f"{source_directory}/处理失败/{filename}",
+                            'error': error_msg
                         })
                         failed_moves += 1
-                        logging.warning(f"文件分类失败: {filename}")
-                    
-                    # 写入结果到JSON文件
-                    self.classifier.append_result_to_file(result_file, result, target_directory)
-                    
-                    # 同时写入到主程序期望的文件名
-                    # 使用新的路径管理获取正确的文件路径
-                    from tidyfile.utils.app_paths import get_app_paths
-                    app_paths = get_app_paths()
-                    ai_result_file = str(app_paths.ai_results_file)
-                    
-                    self.classifier.append_result_to_file(ai_result_file, result, target_directory)
-                    
-                    # 清理文件缓存
-                    self.classifier.clear_file_cache(file_path)
-                    
-                except Exception as e:
-                    error_msg = f"处理文件失败: {str(e)}"
+                        logging.error(f"处理文件失败 {filename}: {e}")
+                        if job_store is not None:
+                            job_store.mark_failed(file_path, error_msg)
+            finally:
+                # 等待所有转移完成
+                transfer_results = mover.wait()
+                if transfer_log_manager is not None:
+                    transfer_log_manager.end_transfer_session()
+                if job_store is not None:
+                    if completed == len(files):
+                        job_store.finish(job_files)
+                    else:
+                        # 整理中途出错，保留作业状态供下次继续
+                        job_store.checkpoint(job_files)
+                        job_store.close()
+            
+            for transfer in transfer_results:
+                context = transfer['context']
+                filename = os.path.basename(transfer['source_path'])
+                if context['classified'] and transfer['success']:
+                    success_list.append({
+                        'source_path': transfer['source_path'],
+                        'target_path': transfer['target_path'],
+                        'target_folder': transfer['target_folder'],
+                        'reason': context['reason']
+                    })
+                    successful_moves += 1
+                    logging.info(f"文件{'复制' if copy_mode else '移动'}成功: {filename} -> {transfer['target_folder']}")
+                else:
+                    if context['classified']:
+                        error = f"文件转移失败: {transfer['error']}"
+                    elif transfer['success']:
+                        error = context['reason']
+                        logging.info(f"文件分类失败，已移动到: {filename} -> {transfer['target_folder']}")
+                    else:
+                        error = f"{context['reason']}（移动到分类失败文件夹失败: {transfer['error']}）"
                     failed_list.append({
-                        'source_path': file_path,
-                        'target_path': f"{source_directory}/处理失败/{filename}",
-                        'error': error_msg
+                        'source_path': transfer['source_path'],
+                        'target_path': transfer['target_path'],
+                        'error': error
                     })
                     failed_moves += 1
-                    logging.error(f"处理文件失败 {filename}: {e}")
+            
+            logging.info(f"文件转移统计: 重命名 {mover.stats['renamed']}, 复制 {mover.stats['copied']}, 失败 {mover.stats['failed']}")
             
             # 返回结果
             return {
@@ -294,8 +405,8 @@ class SmartFileClassifierAdapter:
                 'success': success_list,
                 'failed': failed_list,
                 'result_file': result_file,
-                'processed_files': total_files,  # 添加兼容字段
-                'skipped_files': 0,  # 添加兼容字段
+                'processed_files': len(files),  # 添加兼容字段
+                'skipped_files': skipped_files,  # 添加兼容字段
                 'errors': []  # 添加兼容字段
             }
             
@@ -4,33 +4,63 @@
 文件转移日志管理器
 
 本模块提供文件转移操作的详细日志记录和恢复功能，包括：
-1. 转移操作的详细记录（JSON格式）
+1. 转移操作的详细记录（逐行追加的JSON Lines格式，兼容读取旧版整体JSON格式）
 2. 基于日志的文件恢复功能
 3. 日志文件的管理和查询
 4. 操作历史的可视化展示
 
+日志文件格式（.jsonl，每行一个JSON对象）:
+    {"type": "header", "format_version": 2, "session_info": {...}}     会话开始时写入
+    {"type": "operation", "operation_id": 1, ...}                      每个操作追加一行
+    {"type": "footer", "session_info": {...}}                          会话结束时写入计数
+没有footer的日志（会话未正常结束）在加载时根据操作行重新统计计数。
+
+日志目录中的 transfer_logs.catalog 保存每个会话的摘要（计数、大小、操作类型、目标文件夹），
+会话结束时更新；浏览日志列表只读目录，无需解析完整日志，旧日志在首次列出时补录。
+
 作者: AI Assistant
 创建时间: 2025-01-15
 """
 
 import os
 import json
-import shutil
 import logging
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator, Callable
 from pathlib import Path
 
+from tidyfile.core.file_mover import ParallelFileMover
+from tidyfile.core.quarantine_store import QuarantineError, get_store_for_object
+from tidyfile.utils.path_existence_checker import check_paths_exist
+
+# 追加式日志格式版本及扩展名
+TRANSFER_LOG_FORMAT_VERSION = 2
+TRANSFER_LOG_SUFFIX = ".jsonl"
+# 旧版整体JSON格式的扩展名
+LEGACY_TRANSFER_LOG_SUFFIX = ".json"
+# 恢复进度检查点文件的扩展名（追加在日志文件名之后）
+RESTORE_CHECKPOINT_SUFFIX = ".restore"
+# 会话摘要目录文件名及格式版本
+CATALOG_FILENAME = "transfer_logs.catalog"
+CATALOG_VERSION = 1
+
+# 同一进程内多个TransferLogManager实例共用的目录文件锁
+_catalog_lock = threading.Lock()
+
 
 class TransferLogManager:
     """文件转移日志管理器"""
     
-    def __init__(self, log_directory: str = None):
+    def __init__(self, log_directory: str = None, flush_batch_size: int = 1):
         """
         初始化转移日志管理器
         
         Args:
             log_directory: 日志文件存储目录，默认为应用数据目录下的transfer_logs文件夹
+            flush_batch_size: 批量写入大小，累计多少条操作后写入一次文件。
+                默认每条操作立即写入；调大可减少大批量操作时的I/O次数，
+                但进程异常退出时可能丢失最后未写入的记录
         """
         # 使用新的路径管理
         try:
@@ -49,6 +79,13 @@ class TransferLogManager:
         # 当前操作的日志文件路径
         self.current_log_file = None
         
+        # 当前会话的追加写入状态
+        self.flush_batch_size = max(1, flush_batch_size)
+        self._log_handle = None
+        self._pending_lines = []
+        self._session_info = None
+        self._session_summary = None
+        
         # 设置日志记录
         self._setup_logging()
         
@@ -92,26 +129,32 @@ class TransferLogManager:
         if session_name is None:
             session_name = f"transfer_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
+        # 上一个会话未结束时先写入其缓冲内容
+        self._close_log_handle()
+        
         # 创建日志文件
-        log_filename = f"{session_name}.json"
+        log_filename = f"{session_name}{TRANSFER_LOG_SUFFIX}"
         self.current_log_file = self.log_directory / log_filename
         
-        # 初始化日志文件结构
-        initial_log = {
-            "session_info": {
-                "session_name": session_name,
-                "start_time": datetime.now().isoformat(),
-                "end_time": None,
-                "total_operations": 0,
-                "successful_operations": 0,
-                "failed_operations": 0
-            },
-            "operations": []
+        # 初始化会话信息
+        self._session_info = {
+            "session_name": session_name,
+            "start_time": datetime.now().isoformat(),
+            "end_time": None,
+            "total_operations": 0,
+            "successful_operations": 0,
+            "failed_operations": 0
         }
+        self._session_summary = self._new_summary(self._session_info)
         
-        # 写入初始日志
-        with open(self.current_log_file, 'w', encoding='utf-8') as f:
-            json.dump(initial_log, f, ensure_ascii=False, indent=2)
+        # 写入文件头，之后的操作逐行追加
+        self._log_handle = open(self.current_log_file, 'w', encoding='utf-8')
+        self._write_line({
+            "type": "header",
+            "format_version": TRANSFER_LOG_FORMAT_VERSION,
+            "session_info": self._session_info
+        })
+        self._flush_pending(force=True)
         
         # 创建转移操作日志文件
         self._create_log_file()
@@ -133,10 +176,13 @@ class TransferLogManager:
         """
         记录单个文件转移操作
         
+        操作以一行JSON追加到日志文件末尾，不会重写已有内容。
+        
         Args:
             source_path: 源文件路径
             target_path: 目标文件路径
-            operation_type: 操作类型（copy/move/delete_duplicate）
+            operation_type: 操作类型（copy/move/delete_duplicate/link_duplicate）
+                link_duplicate表示重复文件被替换为指向target_path的链接，target_folder记录链接方式
             target_folder: 目标文件夹名称
             success: 操作是否成功
             error_message: 错误信息（如果失败）
@@ -157,10 +203,6 @@ class TransferLogManager:
             self.logger.error(f"记录删除日志失败: target_path 应该是字符串，但收到了 {type(target_path)}: {target_path}")
             return
         
-        # 读取当前日志
-        with open(self.current_log_file, 'r', encoding='utf-8') as f:
-            log_data = json.load(f)
-        
         # 获取文件信息
         if file_size is None and source_path and isinstance(source_path, str) and os.path.exists(source_path):
             try:
@@ -168,9 +210,17 @@ class TransferLogManager:
             except:
                 file_size = 0
         
+        # 更新统计信息
+        self._session_info["total_operations"] += 1
+        if success:
+            self._session_info["successful_operations"] += 1
+        else:
+            self._session_info["failed_operations"] += 1
+        
         # 创建操作记录
         operation_record = {
-            "operation_id": len(log_data["operations"]) + 1,
+            "type": "operation",
+            "operation_id": self._session_info["total_operations"],
             "timestamp": datetime.now().isoformat(),
             "operation_type": operation_type,
             "source_path": source_path,
@@ -184,19 +234,10 @@ class TransferLogManager:
             "error_message": error_message
         }
         
-        # 添加到操作列表
-        log_data["operations"].append(operation_record)
-        
-        # 更新统计信息
-        log_data["session_info"]["total_operations"] += 1
-        if success:
-            log_data["session_info"]["successful_operations"] += 1
-        else:
-            log_data["session_info"]["failed_operations"] += 1
-        
-        # 写回文件
-        with open(self.current_log_file, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=2)
+        # 追加到日志文件
+        self._write_line(operation_record)
+        self._flush_pending()
+        self._add_to_summary(self._session_summary, operation_record)
         
         # 记录到普通日志
         status = "成功" if success else "失败"
@@ -204,9 +245,13 @@ class TransferLogManager:
         if not success and error_message:
             self.logger.error(f"错误详情: {error_message}")
     
+    def flush(self) -> None:
+        """立即写入缓冲中的操作记录"""
+        self._flush_pending(force=True)
+    
     def end_transfer_session(self) -> Dict:
         """
-        结束当前转移会话
+        结束当前转移会话，写入包含最终计数的文件尾
         
         Returns:
             会话统计信息
@@ -214,26 +259,56 @@ class TransferLogManager:
         if not self.current_log_file:
             raise ValueError("没有活动的转移会话")
         
-        # 读取当前日志
-        with open(self.current_log_file, 'r', encoding='utf-8') as f:
-            log_data = json.load(f)
-        
         # 更新结束时间
-        log_data["session_info"]["end_time"] = datetime.now().isoformat()
+        self._session_info["end_time"] = datetime.now().isoformat()
+        self._write_line({"type": "footer", "session_info": self._session_info})
+        self._close_log_handle()
         
-        # 写回文件
-        with open(self.current_log_file, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=2)
+        # 更新会话摘要目录
+        self._session_summary["session_info"] = dict(self._session_info)
+        self._update_catalog({str(self.current_log_file): self._session_summary})
         
-        session_info = log_data["session_info"]
+        session_info = dict(self._session_info)
         self.logger.info(f"结束转移会话: {session_info['session_name']}")
         self.logger.info(f"总操作数: {session_info['total_operations']}, 成功: {session_info['successful_operations']}, 失败: {session_info['failed_operations']}")
         
         # 清除当前会话
         self.current_log_file = None
+        self._session_info = None
+        self._session_summary = None
         
         return session_info
     
+    def _write_line(self, record: Dict) -> None:
+        """将一条记录加入写入缓冲"""
+        self._pending_lines.append(json.dumps(record, ensure_ascii=False))
+    
+    def _flush_pending(self, force: bool = False) -> None:
+        """缓冲达到批量大小（或强制）时写入文件"""
+        if not self._pending_lines or self._log_handle is None:
+            return
+        if not force and len(self._pending_lines) < self.flush_batch_size:
+            return
+        self._log_handle.write("\n".join(self._pending_lines) + "\n")
+        self._log_handle.flush()
+        self._pending_lines = []
+    
+    def _close_log_handle(self) -> None:
+        """写入剩余缓冲并关闭日志文件"""
+        if self._log_handle is not None:
+            try:
+                self._flush_pending(force=True)
+            finally:
+                self._log_handle.close()
+                self._log_handle = None
+        self._pending_lines = []
+    
+    def __del__(self):
+        try:
+            self._close_log_handle()
+        except Exception:
+            pass
+    
     def get_transfer_logs(self) -> List[str]:
         """
         获取所有转移日志文件列表
@@ -242,8 +317,9 @@ class TransferLogManager:
             日志文件路径列表
         """
         log_files = []
-        for file_path in self.log_directory.glob("*.json"):
-            log_files.append(str(file_path))
+        for suffix in (TRANSFER_LOG_SUFFIX, LEGACY_TRANSFER_LOG_SUFFIX):
+            for file_path in self.log_directory.glob(f"*{suffix}"):
+                log_files.append(str(file_path))
         
         # 按修改时间排序（最新的在前）
         log_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
@@ -251,30 +327,97 @@ class TransferLogManager:
     
     def load_transfer_log(self, log_file_path: str) -> Dict:
         """
-        加载指定的转移日志文件
+        加载指定的转移日志文件，支持追加式格式和旧版整体JSON格式
         
         Args:
             log_file_path: 日志文件路径
             
         Returns:
-            日志数据字典
+            日志数据字典，结构为 {"session_info": {...}, "operations": [...]}
         """
         try:
-            with open(log_file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            if not self._is_line_log(log_file_path):
+                with open(log_file_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            
+            session_info = None
+            footer_info = None
+            operations = []
+            for record in self._iter_line_records(log_file_path):
+                record_type = record.pop("type", None)
+                if record_type == "header":
+                    session_info = record.get("session_info", {})
+                elif record_type == "footer":
+                    footer_info = record.get("session_info", {})
+                elif record_type == "operation":
+                    operations.append(record)
+            
+            if session_info is None:
+                raise ValueError("缺少日志文件头")
+            
+            if footer_info is not None:
+                session_info = footer_info
+            else:
+                # 会话未正常结束，根据已写入的操作重新统计
+                session_info = dict(session_info)
+                session_info["total_operations"] = len(operations)
+                session_info["successful_operations"] = sum(1 for op in operations if op.get("success"))
+                session_info["failed_operations"] = len(operations) - session_info["successful_operations"]
+            
+            return {"session_info": session_info, "operations": operations}
         except Exception as e:
             raise ValueError(f"无法加载日志文件 {log_file_path}: {e}")
     
+    @staticmethod
+    def _is_line_log(log_file_path: str) -> bool:
+        """判断是否为追加式（JSON Lines）日志"""
+        if str(log_file_path).endswith(TRANSFER_LOG_SUFFIX):
+            return True
+        # 旧版日志以多行缩进的JSON对象开头，追加式日志第一行就是完整的文件头
+        with open(log_file_path, 'r', encoding='utf-8') as f:
+            first_line = f.readline().strip()
+        try:
+            header = json.loads(first_line)
+        except json.JSONDecodeError:
+            return False
+        return isinstance(header, dict) and header.get("type") == "header"
+    
+    @staticmethod
+    def _iter_line_records(log_file_path: str) -> Iterator[Dict]:
+        """逐行读取追加式日志，忽略异常退出时可能残留的不完整末行"""
+        with open(log_file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+    
     def restore_from_log(self, log_file_path: str, 
                         operation_ids: List[int] = None,
-                        dry_run: bool = True) -> Dict:
+                        dry_run: bool = True,
+                        max_workers: int = 4,
+                        progress_callback: Optional[Callable[[int, int, Dict], None]] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        resume: bool = True) -> Dict:
         """
         根据转移日志恢复文件
         
+        所有路径的存在性按目录批量检查，需要恢复的源目录统一预先创建，
+        恢复操作由ParallelFileMover并行执行（同一设备上的移动直接重命名）。
+        实际恢复时每完成一个操作都会写入检查点文件（日志文件名 + .restore），
+        中途中断后再次调用会跳过检查点中已恢复的操作；全部成功后删除检查点。
+        
         Args:
             log_file_path: 日志文件路径
             operation_ids: 要恢复的操作ID列表，如果为None则恢复所有成功的操作
             dry_run: 是否为试运行模式（只检查不实际操作）
+            max_workers: 并行恢复的线程数
+            progress_callback: 进度回调函数 (已完成数, 总数, 恢复详情)，在工作线程中调用
+            cancel_event: 取消事件，设置后不再提交新的恢复操作
+            resume: 是否跳过检查点中已恢复的操作
             
         Returns:
             恢复结果统计
@@ -298,13 +441,42 @@ class TransferLogManager:
             "successful_restores": 0,
             "failed_restores": 0,
             "skipped_operations": 0,
+            "resumed_operations": 0,
             "restore_details": [],
-            "dry_run": dry_run
+            "dry_run": dry_run,
+            "cancelled": False
         }
         
         self.logger.info(f"开始恢复操作，目标操作数: {len(target_operations)}, 试运行: {dry_run}")
         
-        # 逐个恢复操作
+        checkpoint_file = f"{log_file_path}{RESTORE_CHECKPOINT_SUFFIX}"
+        restored_ids = self._load_restore_checkpoint(checkpoint_file) if resume and not dry_run else set()
+        
+        # 批量检查所有路径是否存在
+        all_paths = []
+        for operation in target_operations:
+            for path in (operation["source_path"], operation["target_path"]):
+                if path and isinstance(path, str):
+                    all_paths.append(path)
+        path_exists = check_paths_exist(all_paths, max_workers=max_workers)
+        
+        lock = threading.Lock()
+        total = len(target_operations)
+        completed = [0]
+        
+        def finish(restore_detail: Dict, outcome: str) -> None:
+            """登记一个操作的恢复结果并报告进度"""
+            with lock:
+                restore_results[outcome] += 1
+                if outcome != "skipped_operations":
+                    restore_results["restore_details"].append(restore_detail)
+                completed[0] += 1
+                done = completed[0]
+            if progress_callback:
+                progress_callback(done, total, restore_detail)
+        
+        # 先处理不需要实际移动文件的操作，收集需要恢复的操作
+        pending = []
         for operation in target_operations:
             source_path = operation["source_path"]
             target_path = operation["target_path"]
@@ -319,104 +491,308 @@ class TransferLogManager:
                 "restore_message": ""
             }
             
-            try:
-                # 检查源文件是否还存在
-                source_exists = source_path and isinstance(source_path, str) and os.path.exists(source_path)
-                # 检查目标文件是否存在
-                target_exists = target_path and isinstance(target_path, str) and os.path.exists(target_path)
-                
-                if not source_exists and not target_exists:
-                    restore_detail["restore_message"] = "源文件和目标文件都不存在，无法恢复"
-                    restore_results["skipped_operations"] += 1
-                    self.logger.warning(f"跳过恢复 - 源文件和目标文件都不存在: {source_path} / {target_path}")
-                    continue
-                
-                # 如果源文件还在，直接标记为恢复成功
-                if source_exists:
-                    restore_detail["restore_message"] = "源文件仍然存在，无需恢复"
+            if operation["operation_id"] in restored_ids:
+                restore_detail["restore_message"] = "已在上次恢复中完成"
+                restore_detail["restore_success"] = True
+                restore_results["resumed_operations"] += 1
+                finish(restore_detail, "successful_restores")
+                continue
+            
+            if operation_type == "link_duplicate":
+                # 重复文件只是被替换为链接，路径和内容都还在，没有需要恢复的内容
+                restore_detail["restore_message"] = "重复文件已替换为链接，内容未丢失，无需恢复"
+                restore_detail["restore_success"] = True
+                finish(restore_detail, "successful_restores")
+                continue
+            
+            # 检查源文件和目标文件是否存在
+            source_exists = bool(path_exists.get(source_path))
+            target_exists = bool(path_exists.get(target_path))
+            
+            if not source_exists and not target_exists:
+                restore_detail["restore_message"] = "源文件和目标文件都不存在，无法恢复"
+                self.logger.warning(f"跳过恢复 - 源文件和目标文件都不存在: {source_path} / {target_path}")
+                finish(restore_detail, "skipped_operations")
+                continue
+            
+            # 如果源文件还在，直接标记为恢复成功
+            if source_exists:
+                restore_detail["restore_message"] = "源文件仍然存在，无需恢复"
+                restore_detail["restore_success"] = True
+                self.logger.info(f"源文件存在，无需恢复: {source_path}")
+                finish(restore_detail, "successful_restores")
+                continue
+            
+            # 此时源文件不存在但目标文件存在，需要从目标位置恢复
+            if operation_type == "delete_duplicate":
+                # 重复文件在隔离区中，恢复只是一次重命名，直接在当前线程完成
+                if dry_run:
+                    restore_detail["restore_message"] = "试运行模式 - 将从隔离区恢复文件"
                     restore_detail["restore_success"] = True
-                    restore_results["successful_restores"] += 1
-                    self.logger.info(f"源文件存在，无需恢复: {source_path}")
-                    restore_results["restore_details"].append(restore_detail)
+                    finish(restore_detail, "successful_restores")
                     continue
-                
-                # 此时源文件不存在但目标文件存在，需要从目标位置恢复
-                if not dry_run:
-                    # 确保源目录存在
-                    source_dir = os.path.dirname(source_path)
+                try:
+                    store = get_store_for_object(target_path)
+                    if store is None:
+                        raise QuarantineError(f"找不到隔离区: {target_path}")
+                    store.restore(source_path, operation.get("md5"))
+                    restore_detail["restore_message"] = "文件已从隔离区恢复"
+                    restore_detail["restore_success"] = True
+                    self._append_restore_checkpoint(checkpoint_file, operation["operation_id"])
+                    self.logger.info(f"恢复成功: {target_path} -> {source_path}")
+                    finish(restore_detail, "successful_restores")
+                except Exception as e:
+                    restore_detail["restore_message"] = f"恢复失败: {str(e)}"
+                    self.logger.error(f"恢复失败 {source_path}: {e}")
+                    finish(restore_detail, "failed_restores")
+                continue
+            
+            if operation_type not in ("copy", "move"):
+                restore_detail["restore_message"] = f"未知操作类型: {operation_type}"
+                finish(restore_detail, "failed_restores")
+                continue
+            
+            if dry_run:
+                restore_detail["restore_message"] = "试运行模式 - 将从目标位置恢复文件"
+                restore_detail["restore_success"] = True
+                finish(restore_detail, "successful_restores")
+                continue
+            
+            pending.append(restore_detail)
+        
+        if pending:
+            # 统一创建源目录
+            for source_dir in {os.path.dirname(detail["source_path"]) for detail in pending}:
+                try:
                     os.makedirs(source_dir, exist_ok=True)
-                    
-                    # 根据原操作类型进行恢复
-                    if operation_type == "copy":
-                        # 原来是复制，恢复时复制回去
-                        shutil.copy2(target_path, source_path)
-                        restore_detail["restore_message"] = "文件已从目标位置复制回源位置"
-                    elif operation_type == "move":
-                        # 原来是移动，恢复时移动回去
-                        shutil.move(target_path, source_path)
-                        restore_detail["restore_message"] = "文件已从目标位置移动回源位置"
+                except OSError as e:
+                    self.logger.error(f"创建目录失败 {source_dir}: {e}")
+            
+            with open(checkpoint_file, 'a', encoding='utf-8') as checkpoint:
+                def on_restored(result: Dict) -> None:
+                    restore_detail = result["context"]
+                    if result["success"]:
+                        # 原来是复制则复制回去，原来是移动则移动回去
+                        if restore_detail["operation_type"] == "copy":
+                            restore_detail["restore_message"] = "文件已从目标位置复制回源位置"
+                        else:
+                            restore_detail["restore_message"] = "文件已从目标位置移动回源位置"
+                        restore_detail["restore_success"] = True
+                        checkpoint.write(json.dumps({"operation_id": restore_detail["operation_id"]}) + "\n")
+                        checkpoint.flush()
+                        self.logger.info(f"恢复成功: {restore_detail['target_path']} -> {restore_detail['source_path']}")
+                        finish(restore_detail, "successful_restores")
                     else:
-                        restore_detail["restore_message"] = f"未知操作类型: {operation_type}"
-                        restore_results["failed_restores"] += 1
-                        continue
-                else:
-                    restore_detail["restore_message"] = "试运行模式 - 将从目标位置恢复文件"
+                        restore_detail["restore_message"] = f"恢复失败: {result['error']}"
+                        self.logger.error(f"恢复失败 {restore_detail['target_path']}: {result['error']}")
+                        finish(restore_detail, "failed_restores")
                 
-                restore_detail["restore_success"] = True
-                restore_results["successful_restores"] += 1
-                self.logger.info(f"恢复成功: {target_path} -> {source_path}")
-                
-            except Exception as e:
-                restore_detail["restore_message"] = f"恢复失败: {str(e)}"
-                restore_results["failed_restores"] += 1
-                self.logger.error(f"恢复失败 {target_path}: {e}")
-            
-            restore_results["restore_details"].append(restore_detail)
+                mover = ParallelFileMover(max_workers=max_workers, on_complete=on_restored,
+                                          cancel_event=cancel_event)
+                try:
+                    for restore_detail in pending:
+                        if cancel_event is not None and cancel_event.is_set():
+                            restore_results["cancelled"] = True
+                            break
+                        mover.submit(restore_detail["target_path"], restore_detail["source_path"],
+                                     restore_detail["operation_type"], context=restore_detail)
+                finally:
+                    mover.wait()
+                if cancel_event is not None and cancel_event.is_set():
+                    restore_results["cancelled"] = True
+        
+        # 全部恢复完成后检查点不再需要
+        if (not dry_run and not restore_results["cancelled"] and restore_results["failed_restores"] == 0
+                and os.path.exists(checkpoint_file)):
+            try:
+                os.remove(checkpoint_file)
+            except OSError:
+                pass
         
+        restore_results["restore_details"].sort(key=lambda detail: detail["operation_id"])
         self.logger.info(f"恢复操作完成 - 成功: {restore_results['successful_restores']}, 失败: {restore_results['failed_restores']}, 跳过: {restore_results['skipped_operations']}")
         return restore_results
     
+    @staticmethod
+    def _append_restore_checkpoint(checkpoint_file: str, operation_id: int) -> None:
+        """在检查点中记录一个已恢复的操作"""
+        with open(checkpoint_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"operation_id": operation_id}) + "\n")
+    
+    @staticmethod
+    def _load_restore_checkpoint(checkpoint_file: str) -> set:
+        """读取检查点中已恢复的操作ID"""
+        restored_ids = set()
+        if not os.path.exists(checkpoint_file):
+            return restored_ids
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    restored_ids.add(json.loads(line)["operation_id"])
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+        return restored_ids
+    
     def get_session_summary(self, log_file_path: str) -> Dict:
         """
         获取转移会话的摘要信息
         
+        日志未变化时直接使用摘要目录中的记录，否则解析完整日志并更新目录。
+        
         Args:
             log_file_path: 日志文件路径
             
         Returns:
             会话摘要信息
         """
-        log_data = self.load_transfer_log(log_file_path)
-        session_info = log_data["session_info"]
-        operations = log_data["operations"]
+        log_file_path = str(log_file_path)
+        entry = self._read_catalog().get(os.path.basename(log_file_path))
+        if entry is not None and entry.get("stat") == self._file_stat_key(log_file_path):
+            return self._summary_from_catalog(entry)
+        
+        summary = self._summarize_log(log_file_path)
+        self._update_catalog({log_file_path: summary})
+        return summary
+    
+    def get_log_catalog(self) -> List[Dict]:
+        """
+        获取所有日志的会话摘要（用于日志列表，无需解析完整日志）
         
-        # 统计各种操作类型
-        operation_types = {}
-        target_folders = {}
-        total_size = 0
+        目录中没有记录或日志文件已变化的会话会被解析一次并写回目录，
+        已删除的日志会从目录中移除。
         
-        for op in operations:
-            if op["success"]:
-                # 统计操作类型
-                op_type = op["operation_type"]
-                operation_types[op_type] = operation_types.get(op_type, 0) + 1
-                
-                # 统计目标文件夹
-                folder = op.get("target_folder", "未知")
-                target_folders[folder] = target_folders.get(folder, 0) + 1
-                
-                # 统计文件大小
-                if op.get("file_size"):
-                    total_size += op["file_size"]
+        Returns:
+            摘要列表（按修改时间从新到旧），每项在get_session_summary的基础上增加log_file字段；
+            无法解析的日志额外包含error字段
+        """
+        log_files = self.get_transfer_logs()
+        catalog = self._read_catalog()
+        
+        summaries = []
+        updates = {}
+        for log_file_path in log_files:
+            entry = catalog.get(os.path.basename(log_file_path))
+            if entry is not None and entry.get("stat") == self._file_stat_key(log_file_path):
+                summary = self._summary_from_catalog(entry)
+            else:
+                try:
+                    summary = self._summarize_log(log_file_path)
+                    updates[log_file_path] = summary
+                except Exception as e:
+                    self.logger.error(f"加载日志文件失败: {log_file_path} - {e}")
+                    summaries.append({"log_file": log_file_path, "error": str(e)})
+                    continue
+            summary["log_file"] = log_file_path
+            summaries.append(summary)
+        
+        existing_names = {os.path.basename(path) for path in log_files}
+        if updates or any(name not in existing_names for name in catalog):
+            self._update_catalog(updates, keep_names=existing_names)
         
+        return summaries
+    
+    def _summarize_log(self, log_file_path: str) -> Dict:
+        """解析完整日志并统计摘要"""
+        log_data = self.load_transfer_log(log_file_path)
+        summary = self._new_summary(log_data["session_info"])
+        for op in log_data["operations"]:
+            self._add_to_summary(summary, op)
+        return summary
+    
+    @staticmethod
+    def _new_summary(session_info: Dict) -> Dict:
+        """创建空的会话摘要"""
         return {
             "session_info": session_info,
-            "operation_types": operation_types,
-            "target_folders": target_folders,
-            "total_size_bytes": total_size,
-            "total_size_mb": round(total_size / (1024 * 1024), 2)
+            "operation_types": {},
+            "target_folders": {},
+            "total_size_bytes": 0,
+            "total_size_mb": 0.0
+        }
+    
+    @staticmethod
+    def _add_to_summary(summary: Dict, op: Dict) -> None:
+        """将一条操作记录计入摘要（只统计成功的操作）"""
+        if not op["success"]:
+            return
+        
+        # 统计操作类型
+        op_type = op["operation_type"]
+        summary["operation_types"][op_type] = summary["operation_types"].get(op_type, 0) + 1
+        
+        # 统计目标文件夹
+        folder = op.get("target_folder", "未知")
+        summary["target_folders"][folder] = summary["target_folders"].get(folder, 0) + 1
+        
+        # 统计文件大小
+        if op.get("file_size"):
+            summary["total_size_bytes"] += op["file_size"]
+            summary["total_size_mb"] = round(summary["total_size_bytes"] / (1024 * 1024), 2)
+    
+    @staticmethod
+    def _file_stat_key(log_file_path: str) -> Optional[List[int]]:
+        """日志文件的修改时间和大小，用于判断目录中的摘要是否过期"""
+        try:
+            stat = os.stat(log_file_path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+    
+    @staticmethod
+    def _summary_from_catalog(entry: Dict) -> Dict:
+        """将目录记录转换为摘要（目标文件夹以键值对列表保存，以保留None键）"""
+        return {
+            "session_info": dict(entry["session_info"]),
+            "operation_types": dict(entry["operation_types"]),
+            "target_folders": {folder: count for folder, count in entry["target_folders"]},
+            "total_size_bytes": entry["total_size_bytes"],
+            "total_size_mb": round(entry["total_size_bytes"] / (1024 * 1024), 2)
         }
     
+    def _read_catalog(self) -> Dict[str, Dict]:
+        """读取摘要目录，文件不存在或格式不符时返回空目录"""
+        catalog_file = self.log_directory / CATALOG_FILENAME
+        try:
+            with open(catalog_file, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+            if catalog.get("version") == CATALOG_VERSION:
+                return catalog.get("sessions", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"读取日志目录失败，将重新建立: {e}")
+        return {}
+    
+    def _update_catalog(self, summaries: Dict[str, Dict], keep_names: Optional[set] = None) -> None:
+        """
+        写入会话摘要到目录
+        
+        Args:
+            summaries: 日志文件路径 -> 摘要
+            keep_names: 如果提供，只保留这些日志文件名对应的记录
+        """
+        catalog_file = self.log_directory / CATALOG_FILENAME
+        with _catalog_lock:
+            sessions = self._read_catalog()
+            if keep_names is not None:
+                sessions = {name: entry for name, entry in sessions.items() if name in keep_names}
+            for log_file_path, summary in summaries.items():
+                sessions[os.path.basename(log_file_path)] = {
+                    "stat": self._file_stat_key(log_file_path),
+                    "session_info": summary["session_info"],
+                    "operation_types": summary["operation_types"],
+                    "target_folders": list(summary["target_folders"].items()),
+                    "total_size_bytes": summary["total_size_bytes"]
+                }
+            
+            try:
+                temp_file = catalog_file.with_name(f"{CATALOG_FILENAME}.{os.getpid()}.tmp")
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump({"version": CATALOG_VERSION, "sessions": sessions}, f, ensure_ascii=False)
+                os.replace(temp_file, catalog_file)
+            except Exception as e:
+                self.logger.warning(f"更新日志目录失败: {e}")
+    
     def cleanup_old_logs(self, days_to_keep: int = 30) -> int:
         """
         清理旧的日志文件
@@ -432,7 +808,9 @@ class TransferLogManager:
         cutoff_time = datetime.now() - timedelta(days=days_to_keep)
         deleted_count = 0
         
-        for log_file in self.log_directory.glob("*.json"):
+        log_files = list(self.log_directory.glob(f"*{TRANSFER_LOG_SUFFIX}")) + \
+            list(self.log_directory.glob(f"*{LEGACY_TRANSFER_LOG_SUFFIX}"))
+        for log_file in log_files:
             try:
                 file_time = datetime.fromtimestamp(log_file.stat().st_mtime)
                 if file_time < cutoff_time:
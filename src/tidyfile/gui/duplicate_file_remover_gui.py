@@ -26,6 +26,8 @@ class DuplicateFileRemoverGUI:
         self.result_text = None
         self.dry_run_var = None
         self.keep_strategy_var = None
+        self.dedup_mode_var = None
+        self.find_similar_var = None
         
     def show_dialog(self):
         """显示删除重复文件对话框"""
@@ -171,6 +173,14 @@ class DuplicateFileRemoverGUI:
             variable=self.dry_run_var
         ).pack(anchor=tk.W, pady=2)
         
+        # 相似文件检测选项
+        self.find_similar_var = tk.BooleanVar(value=False)
+        tb.Checkbutton(
+            options_frame,
+            text="同时查找相似文件（重新编码的图片、重新导出的文档，仅列出供确认）",
+            variable=self.find_similar_var
+        ).pack(anchor=tk.W, pady=2)
+        
         # 保留策略
         strategy_frame = tb.Frame(options_frame)
         strategy_frame.pack(fill=tk.X, pady=(5, 0))
@@ -192,6 +202,27 @@ class DuplicateFileRemoverGUI:
             value="oldest"
         ).pack(side=tk.LEFT)
         
+        # 处理方式
+        mode_frame = tb.Frame(options_frame)
+        mode_frame.pack(fill=tk.X, pady=(5, 0))
+        
+        tb.Label(mode_frame, text="处理方式:").pack(side=tk.LEFT)
+        
+        self.dedup_mode_var = tk.StringVar(value="delete")
+        tb.Radiobutton(
+            mode_frame,
+            text="删除重复文件（移入隔离区）",
+            variable=self.dedup_mode_var,
+            value="delete"
+        ).pack(side=tk.LEFT, padx=(10, 20))
+        
+        tb.Radiobutton(
+            mode_frame,
+            text="替换为链接（保留路径）",
+            variable=self.dedup_mode_var,
+            value="link"
+        ).pack(side=tk.LEFT)
+        
         # 结果显示区域
         result_frame = tb.LabelFrame(main_frame, text="扫描结果", padding="3")
         result_frame.pack(fill=tb.BOTH, expand=True, pady=(0, 5))
@@ -236,7 +267,9 @@ class DuplicateFileRemoverGUI:
                     results = self._remove_duplicate_files(
                         target_folder_paths=selected_folders,
                         dry_run=dry_run,
-                        keep_oldest=keep_oldest
+                        keep_oldest=keep_oldest,
+                        dedup_mode=self.dedup_mode_var.get(),
+                        find_similar=self.find_similar_var.get()
                     )
                     logger.info(f"扫描完成: 结果={results}")
                     
@@ -294,6 +327,15 @@ class DuplicateFileRemoverGUI:
                 self._add_delete_button(results)
         else:
             self.result_text.insert(tk.END, "未发现可删除的重复文件。\n")
+        
+        if results.get('similar_groups'):
+            self.result_text.insert(tk.END, f"\n相似文件组: {results['similar_groups_found']}（不会被自动删除，请人工确认）\n\n")
+            for idx, group in enumerate(results['similar_groups'], 1):
+                group_type = '图片' if group['type'] == 'image' else '文档'
+                self.result_text.insert(tk.END, f"相似{group_type}组{idx}: 相似度 {group['similarity']:.0%} 共{len(group['files'])}个文件\n")
+                for file_info in group['files']:
+                    self.result_text.insert(tk.END, f"  - {file_info['relative_path']} 来源: {file_info.get('source_folder', '')}\n")
+                self.result_text.insert(tk.END, "\n")
     
     def _add_delete_button(self, scan_results):
         """添加删除按钮"""
@@ -323,10 +365,21 @@ class DuplicateFileRemoverGUI:
             action_frame = self.window
         
         # 创建删除按钮
+        dedup_mode = scan_results.get('dedup_mode', 'delete')
+        if dedup_mode == "link":
+            action_text = "替换为链接"
+            confirm_text = (f"确定要将 {scan_results['total_duplicates_found']} 个重复文件替换为指向保留文件的链接吗？\n\n"
+                            "替换前会逐字节确认内容相同。\n\n"
+                            "注意：文件系统不支持reflink时使用硬链接，硬链接与保留文件是同一个文件，"
+                            "修改其中任何一个，其他路径下的内容也会一起改变；修改时间也与保留文件相同。")
+        else:
+            action_text = "删除"
+            confirm_text = f"确定要删除 {scan_results['total_duplicates_found']} 个重复文件吗？\n\n文件将移入隔离区，可在转移日志中恢复。"
+        
         def delete_duplicates():
-            if messagebox.askyesno("确认删除", f"确定要删除 {scan_results['total_duplicates_found']} 个重复文件吗？\n\n此操作不可撤销！"):
+            if messagebox.askyesno(f"确认{action_text}", confirm_text):
                 self.result_text.delete(1.0, tk.END)
-                self.result_text.insert(tk.END, "正在删除重复文件...\n")
+                self.result_text.insert(tk.END, f"正在{action_text}重复文件...\n")
                 
                 def delete_worker():
                     try:
@@ -336,7 +389,8 @@ class DuplicateFileRemoverGUI:
                         delete_results = self._remove_duplicate_files(
                             target_folder_paths=selected_folders,
                             dry_run=False,
-                            keep_oldest=keep_oldest
+                            keep_oldest=keep_oldest,
+                            dedup_mode=dedup_mode
                         )
                         
                         self.window.after(0, lambda: self._show_delete_results(delete_results))
@@ -349,7 +403,7 @@ class DuplicateFileRemoverGUI:
         
         delete_button = tb.Button(
             action_frame,
-            text=f"删除 {scan_results['total_duplicates_found']} 个重复文件",
+            text=f"{action_text} {scan_results['total_duplicates_found']} 个重复文件",
             command=delete_duplicates,
             style='danger.TButton'
         )
@@ -358,6 +412,9 @@ class DuplicateFileRemoverGUI:
     
     def _show_delete_results(self, results):
         """显示删除结果"""
+        if results.get('dedup_mode') == "link":
+            self._show_link_results(results)
+            return
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, f"删除完成！\n\n")
         self.result_text.insert(tk.END, f"成功删除: {len(results.get('files_deleted', []))} 个文件\n")
@@ -380,20 +437,46 @@ class DuplicateFileRemoverGUI:
                 error_msg = file_info.get('error', '未知错误')
                 self.result_text.insert(tk.END, f"  - {relative_path}: {error_msg}\n")
     
+    def _show_link_results(self, results):
+        """显示链接替换结果"""
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, "链接替换完成！\n\n")
+        self.result_text.insert(tk.END, f"成功替换: {len(results.get('files_linked', []))} 个文件\n")
+        self.result_text.insert(tk.END, f"已是硬链接: {results.get('already_linked', 0)} 个文件\n")
+        self.result_text.insert(tk.END, f"替换失败: {len(results.get('deletion_errors', []))} 个文件\n")
+        
+        space_freed = sum(file_info.get('size', 0) for file_info in results.get('files_linked', []))
+        self.result_text.insert(tk.END, f"释放空间: {space_freed:,} bytes\n\n")
+        
+        if results.get('files_linked'):
+            self.result_text.insert(tk.END, "已替换的文件:\n")
+            for file_info in results['files_linked']:
+                self.result_text.insert(tk.END, f"  - {file_info['relative_path']} ({file_info['link_type']})\n")
+        
+        if results.get('deletion_errors'):
+            self.result_text.insert(tk.END, "\n替换失败的文件:\n")
+            for file_info in results['deletion_errors']:
+                relative_path = file_info.get('relative_path', file_info.get('path', ''))
+                error_msg = file_info.get('error', '未知错误')
+                self.result_text.insert(tk.END, f"  - {relative_path}: {error_msg}\n")
+    
     def _show_error(self, error_message):
         """显示错误信息"""
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, f"扫描失败:\n{error_message}")
     
-    def _remove_duplicate_files(self, target_folder_paths, dry_run=True, keep_oldest=False):
+    def _remove_duplicate_files(self, target_folder_paths, dry_run=True, keep_oldest=False, dedup_mode="delete",
+                                find_similar=False):
         """删除重复文件的核心逻辑"""
         try:
             from tidyfile.core.duplicate_cleaner import remove_duplicate_files
-            logger.info(f"开始调用删除重复文件函数: 文件夹={target_folder_paths}, 试运行={dry_run}, 保留最旧={keep_oldest}")
+            logger.info(f"开始调用删除重复文件函数: 文件夹={target_folder_paths}, 试运行={dry_run}, 保留最旧={keep_oldest}, 处理方式={dedup_mode}")
             result = remove_duplicate_files(
                 target_folder_paths=target_folder_paths,
                 dry_run=dry_run,
-                keep_oldest=keep_oldest
+                keep_oldest=keep_oldest,
+                dedup_mode=dedup_mode,
+                find_similar=find_similar
             )
             logger.info(f"删除重复文件函数调用完成: 扫描文件={result.get('total_files_scanned', 0)}, 重复组={result.get('duplicate_groups_found', 0)}")
             return result
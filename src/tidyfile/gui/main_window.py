@@ -27,6 +27,7 @@ import time
 from tidyfile.core.file_reader import FileReader
 from tidyfile.core.transfer_log_manager import TransferLogManager
 from tidyfile.core.batch_add_chain_tags import ChainTagsBatchProcessor
+from tidyfile.gui.progress_throttle import CoalescedProgress
 
 # 导入国际化支持
 try:
@@ -246,8 +247,9 @@ class TagOptimizerGUI:
             # 执行扫描
             stats = self.processor.pre_scan_chain_tags(data)
             
-            # 提取现有标签统计
-            existing_tags = self.processor.extract_existing_tags(data)
+            # 提取现有标签统计（前缀树同时记录各标签的使用次数）
+            tag_trie = self.processor.build_tag_trie(data)
+            existing_tags = tag_trie.level_tags()
             
             # 显示基本统计
             self.log_message(f"总记录数: {len(data)}")
@@ -276,11 +278,11 @@ class TagOptimizerGUI:
             self.log_message(f"  5级标签数量: {len(existing_tags[5])}")
             self.log_message(f"  3级及以上标签总数: {len(existing_tags[3] | existing_tags[4] | existing_tags[5])}")
             
-            # 显示前10个1级标签示例
+            # 显示使用最多的10个1级标签
             if existing_tags[1]:
-                self.log_message(f"\n1级标签示例 (前10个):")
-                for i, tag in enumerate(sorted(list(existing_tags[1]))[:10], 1):
-                    self.log_message(f"  {i}. {tag}")
+                self.log_message(f"\n1级标签示例 (使用最多的10个):")
+                for i, (tag, count) in enumerate(tag_trie.get_child_counts()[:10], 1):
+                    self.log_message(f"  {i}. {tag} ({count}条记录)")
                 if len(existing_tags[1]) > 10:
                     self.log_message(f"  ... 还有 {len(existing_tags[1]) - 10} 个1级标签")
             
@@ -1091,8 +1093,9 @@ class FileOrganizerTabGUI:
                 # 扫描文件夹并显示文件数量
                 try:
                     from pathlib import Path
+                    from tidyfile.core.read_job_engine import supported_read_extensions
                     folder_path = Path(directory)
-                    supported_extensions = {'.txt', '.pdf', '.docx', '.doc', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv'}
+                    supported_extensions = supported_read_extensions()
                     document_files = []
                     for file_path in folder_path.rglob('*'):
                         if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
@@ -1834,7 +1837,13 @@ class FileOrganizerTabGUI:
 
             
     def _batch_read_worker(self, folder_path):
-        """批量解读工作线程"""
+        """
+        批量解读工作线程
+        
+        以流式方式处理：结果写入ai_organize_result.json后即丢弃，只保留计数和最近的错误，
+        界面进度由CoalescedProgress按固定帧率刷新，不再每个文件提交两次Tk事件。
+        """
+        progress = None
         try:
             self.log_message("初始化文件解读器...")
             
@@ -1842,134 +1851,75 @@ class FileOrganizerTabGUI:
             if not self.ai_organizer:
                 self.initialize_organizers()
             
+            # 进度状态只在主线程按帧率刷新
+            def apply_progress(current, total, filename):
+                self.reader_progress_var.set((current / total) * 100 if total > 0 else 0)
+                self.reader_status_label.config(text=f"正在解读 ({current}/{total}): {filename}")
+            
+            progress = CoalescedProgress(self.root, apply_progress)
+            progress.start()
+            
             # 定义进度回调函数
             def progress_callback(current, total, filename):
-                progress = (current / total) * 100 if total > 0 else 0
-                self.root.after(0, lambda: self.reader_progress_var.set(progress))
-                self.root.after(0, lambda: self.reader_status_label.config(text=f"正在解读 ({current}/{total}): {filename}"))
+                progress.update(current, total, filename)
                 # 每处理10个文件记录一次日志
                 if current % 10 == 0 or current == total:
-                    self.log_message(f"处理进度: {current}/{total} ({progress:.1f}%) - 当前文件: {filename}")
-            
-            # 直接使用FileReader进行批量文档解读
-            from tidyfile.core.file_reader import FileReader
+                    percent = (current / total) * 100 if total > 0 else 0
+                    self.log_message(f"处理进度: {current}/{total} ({percent:.1f}%) - 当前文件: {filename}")
             
-            # 初始化文件解读器
-            file_reader = FileReader()
-            file_reader.summary_length = self.reader_summary_length.get()
+            # 扫描、解读和结果写入由共用的作业引擎完成，结果写入ai_organize_result.json后即丢弃
+            from tidyfile.core.read_job_engine import FileReadJob
             
-            # 扫描文件夹中的文件
-            from pathlib import Path
-            folder_path_obj = Path(folder_path)
+            def result_callback(result, outcome):
+                filename = result.get('file_name', '')
+                if outcome == 'failed':
+                    self.log_message(f"文件解读失败: {filename} - {result.get('error') or '未知错误'}", "WARNING")
+                else:
+                    self.log_message(f"文件解读完成 ({outcome}): {filename}", "DEBUG")
             
             self.log_message("开始扫描文件夹中的可解读文件...")
+            job = FileReadJob(
+                folder_path=folder_path,
+                summary_length=self.reader_summary_length.get(),
+                executor='threads',
+                progress_callback=progress_callback,
+                result_callback=result_callback,
+                resumable=True
+            )
+            summary = job.run()
             
-            # 支持的文件扩展名
-            supported_extensions = [
-                '.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv',
-                '.pdf', '.docx', '.doc',
-                '.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'
-            ]
-            
-            # 收集所有支持的文件
-            files = []
-            for file_path in folder_path_obj.rglob('*'):
-                if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                    files.append(str(file_path))
-            
-            self.log_message(f"扫描完成，发现 {len(files)} 个可解读文件")
-            
-            if not files:
+            if summary['total_files'] == 0:
                 batch_results = {
                     'success': False,
                     'message': f'文件夹中没有找到可解读的文件: {folder_path}',
-                    'results': [],
                     'total_files': 0,
                     'successful_reads': 0,
-                    'failed_reads': 0
+                    'failed_reads': 0,
+                    'recent_errors': []
                 }
             else:
-                total_files = len(files)
-                successful_reads = 0
-                failed_reads = 0
-                results = []
-                
-                for i, file_path in enumerate(files):
-                    filename = Path(file_path).name
-                    
-                    # 更新进度
-                    progress_callback(i + 1, total_files, filename)
-                    
-                    try:
-                        # 解读单个文件
-                        self.log_message(f"开始解读文件: {filename}", "DEBUG")
-                        result = file_reader.generate_summary(file_path, self.reader_summary_length.get())
-                        
-                        # 提取路径标签
-                        if result['success']:
-                            result['tags'] = file_reader.extract_path_tags(file_path, folder_path)
-                            successful_reads += 1
-                            logging.info(f"文件解读成功: {filename}")
-                            self.log_message(f"文件解读成功: {filename}")
-                            
-                            # 使用新的路径管理获取正确的文件路径
-                            try:
-                                from tidyfile.utils.app_paths import get_app_paths
-                                app_paths = get_app_paths()
-                                ai_result_file = str(app_paths.ai_results_file)
-                            except ImportError:
-                                # 兼容旧版本，使用相对路径
-                                from tidyfile.utils.app_paths import get_app_paths
-                            app_paths = get_app_paths()
-                            ai_result_file = str(app_paths.ai_results_file)
-                            
-                            # 写入结果到ai_organize_result.json
-                            file_reader.append_result_to_file(ai_result_file, result, folder_path)
-                        else:
-                            failed_reads += 1
-                            error_msg = result.get('error', '未知错误')
-                            logging.warning(f"文件解读失败: {filename} - {error_msg}")
-                            self.log_message(f"文件解读失败: {filename} - {error_msg}", "WARNING")
-                        
-                        results.append(result)
-                        
-                    except Exception as e:
-                        failed_reads += 1
-                        error_msg = str(e)
-                        self.log_message(f"文件解读异常: {filename} - {error_msg}", "ERROR")
-                        error_result = {
-                            'file_path': file_path,
-                            'file_name': filename,
-                            'success': False,
-                            'extracted_text': '',
-                            'summary': '',
-                            'error': error_msg,
-                            'model_used': 'unknown',
-                            'timestamp': datetime.now().isoformat()
-                        }
-                        results.append(error_result)
-                
-                # 批量解读结果已通过file_reader.append_result_to_file写入ai_organize_result.json
-                # 不再需要单独的batch_read_results.json文件
-                
-                completion_msg = f"批量解读完成，共处理 {total_files} 个文件，成功 {successful_reads} 个，失败 {failed_reads} 个"
+                completion_msg = (f"批量解读完成，共处理 {summary['processed_files']} 个文件，"
+                                  f"成功 {summary['successful_reads']} 个，失败 {summary['failed_reads']} 个，"
+                                  f"跳过 {summary['skipped_reads']} 个，路径更新 {summary['path_updated_reads']} 个")
                 self.log_message(completion_msg)
+                timings = summary['timings']
+                self.log_message(f"耗时: 扫描 {timings['scan']}s, 解读 {timings['read']}s, 写入 {timings['write']}s, 总计 {timings['total']}s", "DEBUG")
                 
-                batch_results = {
-                    'success': True,
-                    'folder_path': folder_path,
-                    'total_files': total_files,
-                    'successful_reads': successful_reads,
-                    'failed_reads': failed_reads,
-                    'results': results
-                }
+                batch_results = dict(summary, success=True)
             
             # 显示结果
             def show_results():
                 self.reader_status_label.config(text=t("batch_reading_completed", "file_reader"))
                 self.log_message(f"批量文档解读完成: 成功 {batch_results['successful_reads']}, 失败 {batch_results['failed_reads']}")
+                if batch_results['recent_errors']:
+                    self.log_message(f"最近 {len(batch_results['recent_errors'])} 个失败的文件:", "WARNING")
+                    for filename, error_msg in batch_results['recent_errors']:
+                        self.log_message(f"  {filename}: {error_msg}", "WARNING")
                 messagebox.showinfo(t("success", "messages"), t("batch_reading_completed", "messages", success=batch_results['successful_reads'], failed=batch_results['failed_reads']))
             
+            # 先停止进度刷新，保证结果显示在最后一次进度之后
+            progress.stop()
+            progress = None
             self.root.after(0, show_results)
             
         except Exception as e:
@@ -1978,6 +1928,8 @@ class FileOrganizerTabGUI:
             self.root.after(0, lambda: messagebox.showerror(t("error", "messages"), t("batch_document_reading_failed", "messages", error=error_msg)))
             self.root.after(0, lambda: self.reader_status_label.config(text=t("reading_failed", "file_reader")))
         finally:
+            if progress is not None:
+                progress.stop()
             self.root.after(0, lambda: self.reader_progress_var.set(0))
             self.root.after(0, lambda: self.reader_start_button.config(state='normal'))
             
@@ -3382,27 +3334,30 @@ class FileOrganizerTabGUI:
             try:
                 from tidyfile.core.transfer_log_manager import TransferLogManager
                 log_manager = TransferLogManager()
-                log_files = log_manager.get_transfer_logs()
+                # 从摘要目录读取会话信息，完整日志在查看详情时才加载
+                log_summaries = log_manager.get_log_catalog()
                 
                 # 调试信息
                 self.log_message(f"转移日志管理器初始化成功")
                 self.log_message(f"日志目录: {log_manager.log_directory}")
-                self.log_message(f"找到日志文件数量: {len(log_files)}")
+                self.log_message(f"找到日志文件数量: {len(log_summaries)}")
                 
             except Exception as e:
                 self.log_message(f"初始化日志管理器失败: {e}")
                 tree.insert("", "end", values=("日志管理器初始化失败", "", "", "", "", ""))
                 return
             
-            if not log_files:
+            if not log_summaries:
                 tree.insert("", "end", values=("暂无日志记录", "", "", "", "", ""))
                 return
             
-            # 加载每个日志文件的信息
-            for log_file_path in log_files:
+            # 显示每个日志文件的信息
+            for summary in log_summaries:
+                log_file_path = summary['log_file']
                 try:
-                    log_data = log_manager.load_transfer_log(log_file_path)
-                    session_info = log_data.get('session_info', {})
+                    if 'error' in summary:
+                        raise ValueError(summary['error'])
+                    session_info = summary.get('session_info', {})
                     
                     # 提取信息
                     start_time = session_info.get('start_time', 'N/A')
@@ -3682,7 +3637,13 @@ class FileOrganizerTabGUI:
                 
             else:
                 progress_var.set("正在执行恢复操作...")
-                result = log_manager.restore_from_log(log_file, dry_run=False)
+                
+                def on_progress(done, total, detail):
+                    # 每完成50个操作更新一次界面，避免大量after调用
+                    if done % 50 == 0 or done == total:
+                        restore_window.after(0, lambda: progress_var.set(f"正在执行恢复操作... {done}/{total}"))
+                
+                result = log_manager.restore_from_log(log_file, dry_run=False, progress_callback=on_progress)
                 
                 def update_result():
                     result_text.delete(1.0, tb.END)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GUI进度更新节流
+
+工作线程每处理一个文件就调用一次 root.after 更新界面，处理速度快时会塞满Tk事件队列。
+CoalescedProgress 让工作线程只记录最新的进度状态，由主线程按固定帧率取出并刷新界面，
+同一帧内的多次更新合并为一次。
+"""
+
+import threading
+
+
+class CoalescedProgress:
+    """按固定帧率合并刷新的进度状态"""
+    
+    def __init__(self, root, apply_callback, interval_ms: int = 100):
+        """
+        初始化进度节流器
+        
+        Args:
+            root: Tk根窗口
+            apply_callback: 在主线程中调用 apply_callback(*最新状态) 刷新界面
+            interval_ms: 刷新间隔（毫秒），默认每秒10帧
+        """
+        self.root = root
+        self.apply_callback = apply_callback
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._pending = None
+        self._running = False
+    
+    def start(self) -> None:
+        """开始定时刷新"""
+        self._running = True
+        self.root.after(0, self._tick)
+    
+    def update(self, *state) -> None:
+        """记录最新状态（可在任意线程调用，不会产生Tk事件）"""
+        with self._lock:
+            self._pending = state
+    
+    def stop(self) -> None:
+        """停止定时刷新，最后一次状态仍会被应用"""
+        self._running = False
+        self.root.after(0, self._flush)
+    
+    def _flush(self) -> None:
+        with self._lock:
+            state, self._pending = self._pending, None
+        if state is not None:
+            self.apply_callback(*state)
+    
+    def _tick(self) -> None:
+        self._flush()
+        if self._running:
+            self.root.after(self.interval_ms, self._tick)
@@ -12,4 +12,5 @@ __all__ = [
     "PathUtils",
     "AppPaths",
     "ConfigMigrator",
+    "FileNameIndex",
 ] 
\ No newline at end of file
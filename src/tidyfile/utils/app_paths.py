@@ -86,6 +86,8 @@ class AppPaths:
             self.app_data_dir / "data" / "cache",
             self.app_data_dir / "data" / "logs",
             self.app_data_dir / "data" / "transfer_logs",
+            self.app_data_dir / "data" / "quarantine",
+            self.app_data_dir / "data" / "jobs",
             self.app_data_dir / "data" / "results",
             self.app_data_dir / "data" / "results" / "weixin_articles",
             self.app_data_dir / "temp",
@@ -133,6 +135,16 @@ class AppPaths:
         """转移日志目录路径"""
         return self.app_data_dir / "data" / "transfer_logs"
     
+    @property
+    def quarantine_dir(self) -> Path:
+        """重复文件隔离区目录路径"""
+        return self.app_data_dir / "data" / "quarantine"
+    
+    @property
+    def jobs_dir(self) -> Path:
+        """可恢复作业状态目录路径"""
+        return self.app_data_dir / "data" / "jobs"
+    
     @property
     def results_dir(self) -> Path:
         """结果目录路径"""
@@ -209,6 +221,8 @@ class AppPaths:
             'cache_dir': self.cache_dir,
             'logs_dir': self.logs_dir,
             'transfer_logs_dir': self.transfer_logs_dir,
+            'quarantine_dir': self.quarantine_dir,
+            'jobs_dir': self.jobs_dir,
             'results_dir': self.results_dir,
             'ai_results_file': self.ai_results_file,
             'weixin_articles_dir': self.weixin_articles_dir,
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+协作式截止时间
+
+原先单个文件的超时靠"新开一个线程执行、调用方等待join/future超时"实现：每个文件都要创建线程，
+超时后调用方返回了，但后台线程仍在继续调用模型，既占着线程也占着模型的并发。
+
+这里改为在当前线程中执行，并把截止时间放进上下文：
+1. 发往模型的HTTP请求把剩余时间作为请求超时（request_timeout），请求不会超过截止时间
+2. 重试、逐层匹配、逐页提取等循环在每一步检查截止时间（check_deadline），到期即抛出DeadlineExceeded
+3. DeadlineExceeded继承BaseException（与asyncio.CancelledError相同），不会被业务代码中的
+   except Exception 吞掉，一直传到设置截止时间的地方
+到期后工作随即停止，不会有泄漏的线程。
+
+用法:
+    try:
+        with deadline_scope(180):
+            do_work()
+    except DeadlineExceeded:
+        ...
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# 请求超时的下限（秒），避免剩余时间极短时传入0或负数
+MIN_REQUEST_TIMEOUT = 0.5
+
+
+class DeadlineExceeded(BaseException):
+    """截止时间已到"""
+    pass
+
+
+class Deadline:
+    """一个截止时间"""
+    
+    def __init__(self, seconds: float):
+        """
+        Args:
+            seconds: 从现在起的时间限制（秒）
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+    
+    def remaining(self) -> float:
+        """剩余时间（秒），已到期时为0"""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+    
+    def check(self) -> None:
+        """已到期时抛出DeadlineExceeded"""
+        if self.expired():
+            raise DeadlineExceeded(f"操作超时（{self.seconds:.0f}秒）")
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("tidyfile_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    """
+    在上下文中设置截止时间；已有更早的截止时间时沿用更早的那个
+    
+    Args:
+        seconds: 时间限制（秒）
+    """
+    deadline = Deadline(seconds)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """当前上下文的截止时间，没有时返回None"""
+    return _current_deadline.get()
+
+
+def check_deadline() -> None:
+    """当前上下文的截止时间已到时抛出DeadlineExceeded（没有截止时间时什么也不做）"""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def request_timeout(default: Optional[float] = None) -> Optional[float]:
+    """
+    计算HTTP请求的超时时间：不超过当前截止时间的剩余时间
+    
+    Args:
+        default: 没有截止时间（或剩余时间更长）时使用的超时，None表示不限制
+    
+    Returns:
+        请求超时（秒）；没有截止时间时返回default
+    
+    Raises:
+        DeadlineExceeded: 截止时间已到
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    deadline.check()
+    remaining = max(MIN_REQUEST_TIMEOUT, deadline.remaining())
+    return remaining if default is None else min(default, remaining)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件名索引
+
+为"搜索并更新文件路径"提供一次遍历、多次查找的文件名索引：
+1. 对配置的搜索根目录做一次遍历，建立 文件名 -> 路径列表 的映射，并保留忽略大小写的映射
+2. 遍历结果按目录缓存到磁盘，刷新时目录修改时间未变化的目录直接复用缓存的文件列表
+3. 同一次请求中的所有查找都基于同一份索引，不再为每个文件重新遍历磁盘
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，格式变化时旧缓存自动失效
+INDEX_CACHE_VERSION = 1
+
+
+def get_default_search_roots() -> List[Tuple[str, int]]:
+    """
+    获取默认的搜索根目录及各自的最大遍历深度
+    
+    Returns:
+        (根目录, 最大深度) 列表，按查找优先级排序
+    """
+    home = os.path.expanduser("~")
+    roots = [
+        (home, 3),  # 当前用户目录
+        (os.path.join(home, "Desktop"), 3),  # 桌面
+        (os.path.join(home, "Documents"), 3),  # 文档
+        (os.path.join(home, "Downloads"), 3),  # 下载
+        ("C:/Users", 3),  # 所有用户目录
+    ]
+    
+    # 其他用户的常见子目录
+    users_dir = "C:/Users"
+    if os.path.isdir(users_dir):
+        try:
+            for user_dir in os.listdir(users_dir):
+                user_path = os.path.join(users_dir, user_dir)
+                if os.path.isdir(user_path):
+                    for sub_dir in ["Desktop", "Documents", "Downloads", "Pictures", "Videos"]:
+                        roots.append((os.path.join(user_path, sub_dir), 2))
+        except OSError:
+            pass
+    
+    # 常见盘符
+    for drive in ["C:/", "D:/", "E:/"]:
+        roots.append((drive, 2))
+    
+    return roots
+
+
+class FileNameIndex:
+    """文件名索引"""
+    
+    def __init__(self, roots: List[Tuple[str, int]] = None, cache_file: str = None):
+        """
+        初始化文件名索引
+        
+        Args:
+            roots: (根目录, 最大深度) 列表，默认使用 get_default_search_roots()
+            cache_file: 磁盘缓存文件路径，默认为应用缓存目录下的file_name_index.json
+        """
+        if roots is None:
+            roots = get_default_search_roots()
+        if cache_file is None:
+            try:
+                from tidyfile.utils.app_paths import get_app_paths
+                cache_file = str(get_app_paths().cache_dir / "file_name_index.json")
+            except ImportError:
+                cache_file = str(Path("cache") / "file_name_index.json")
+        
+        self.roots = [(os.path.normpath(root), max_depth) for root, max_depth in roots]
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        
+        # 目录 -> [修改时间, 文件名列表, 子目录名列表]
+        self._dirs: Dict[str, list] = {}
+        self._by_name: Dict[str, List[str]] = {}
+        self._by_folded_name: Dict[str, List[str]] = {}
+        self._cache_loaded = False
+        self.last_refresh_time = None
+        self.last_refresh_stats = {}
+    
+    def refresh(self) -> Dict[str, int]:
+        """
+        增量刷新索引
+        
+        每个目录都会重新获取修改时间，修改时间未变化的目录复用缓存的文件列表，
+        只有新增或发生变化的目录才会重新列出内容。
+        
+        Returns:
+            刷新统计信息
+        """
+        with self.lock:
+            if not self._cache_loaded:
+                self._load_cache()
+                self._cache_loaded = True
+            
+            start_time = time.time()
+            stats = {'scanned_dirs': 0, 'reused_dirs': 0, 'indexed_files': 0}
+            new_dirs = {}
+            visited = {}  # 目录 -> 已遍历的剩余深度，避免重叠根目录重复遍历
+            
+            for root, max_depth in self.roots:
+                if os.path.isdir(root):
+                    self._walk(root, max_depth, new_dirs, visited, stats)
+            
+            self._dirs = new_dirs
+            self._rebuild_lookup()
+            stats['indexed_files'] = sum(len(paths) for paths in self._by_name.values())
+            stats['elapsed_ms'] = int((time.time() - start_time) * 1000)
+            
+            self._save_cache()
+            self.last_refresh_time = time.time()
+            self.last_refresh_stats = stats
+            logger.info(f"文件名索引刷新完成: 遍历目录 {stats['scanned_dirs']}, "
+                        f"复用缓存 {stats['reused_dirs']}, 文件 {stats['indexed_files']}, "
+                        f"耗时 {stats['elapsed_ms']}ms")
+            return stats
+    
+    def find(self, file_name: str) -> Optional[str]:
+        """
+        查找文件，先精确匹配文件名，再忽略大小写匹配
+        
+        Args:
+            file_name: 文件名
+        
+        Returns:
+            找到的文件路径，未找到返回None
+        """
+        for path in self.find_all(file_name):
+            return path
+        return None
+    
+    def find_all(self, file_name: str) -> List[str]:
+        """
+        查找所有同名文件，按搜索根目录的优先级排序
+        
+        索引可能落后于磁盘，返回前会过滤掉已不存在的路径。
+        """
+        if not file_name:
+            return []
+        
+        candidates = list(self._by_name.get(file_name, []))
+        for path in self._by_folded_name.get(file_name.casefold(), []):
+            if path not in candidates:
+                candidates.append(path)
+        
+        return [path for path in candidates if os.path.exists(path)]
+    
+    def _walk(self, root: str, max_depth: int, new_dirs: Dict[str, list],
+              visited: Dict[str, int], stats: Dict[str, int]) -> None:
+        """遍历目录树，depth为相对根目录的层数"""
+        stack = [(root, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            remaining = max_depth - depth
+            if visited.get(directory, -1) >= remaining:
+                continue
+            visited[directory] = remaining
+            
+            entry = new_dirs.get(directory) or self._read_dir(directory, stats)
+            if entry is None:
+                continue
+            new_dirs[directory] = entry
+            
+            if depth < max_depth:
+                # 逆序入栈，保持与os.walk相同的遍历顺序
+                for sub_dir in reversed(entry[2]):
+                    stack.append((os.path.join(directory, sub_dir), depth + 1))
+    
+    def _read_dir(self, directory: str, stats: Dict[str, int]) -> Optional[list]:
+        """读取目录内容，目录修改时间未变化时复用缓存"""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+        
+        cached = self._dirs.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            stats['reused_dirs'] += 1
+            return cached
+        
+        files = []
+        sub_dirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            sub_dirs.append(entry.name)
+                        elif entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        
+        stats['scanned_dirs'] += 1
+        return [mtime_ns, files, sub_dirs]
+    
+    def _rebuild_lookup(self) -> None:
+        """根据目录缓存重建文件名映射，按根目录遍历顺序保存路径"""
+        by_name = {}
+        by_folded_name = {}
+        for directory, (_, files, _) in self._dirs.items():
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                by_name.setdefault(file_name, []).append(path)
+                by_folded_name.setdefault(file_name.casefold(), []).append(path)
+        self._by_name = by_name
+        self._by_folded_name = by_folded_name
+    
+    def _load_cache(self) -> None:
+        """加载磁盘缓存，根目录配置变化时丢弃缓存"""
+        try:
+            if not os.path.exists(self.cache_file):
+                return
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') != INDEX_CACHE_VERSION:
+                return
+            if [tuple(root) for root in cache.get('roots', [])] != self.roots:
+                return
+            self._dirs = cache.get('dirs', {})
+            self._rebuild_lookup()
+        except Exception as e:
+            logger.warning(f"加载文件名索引缓存失败，将重新建立索引: {e}")
+            self._dirs = {}
+    
+    def _save_cache(self) -> None:
+        """保存磁盘缓存"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            temp_file = self.cache_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': INDEX_CACHE_VERSION,
+                    'roots': self.roots,
+                    'dirs': self._dirs
+                }, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            logger.warning(f"保存文件名索引缓存失败: {e}")
+
+
+# 全局实例
+_file_name_index = None
+
+
+def get_file_name_index() -> FileNameIndex:
+    """
+    获取文件名索引实例（单例模式）
+    
+    Returns:
+        FileNameIndex实例
+    """
+    global _file_name_index
+    if _file_name_index is None:
+        _file_name_index = FileNameIndex()
+    return _file_name_index
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量路径存在性检查
+
+网络共享（SMB/NFS）上每次 os.path.exists 都是一次网络往返，逐条检查大量记录非常慢。
+本模块按父目录对路径分组，每个目录只用 scandir 列出一次，在内存中判断文件是否存在，
+目录列出操作在线程池中并行执行。
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional, Set
+
+
+def _list_directory(directory: str) -> Optional[Set[str]]:
+    """列出目录中的条目名（已按系统规则规范大小写），目录不存在或无法访问时返回None"""
+    try:
+        with os.scandir(directory) as entries:
+            return {os.path.normcase(entry.name) for entry in entries}
+    except OSError:
+        return None
+
+
+def check_paths_exist(paths: Iterable[str], max_workers: int = 8,
+                      progress_callback: Optional[Callable[[int, int], None]] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Dict[str, bool]:
+    """
+    批量检查路径是否存在
+    
+    Args:
+        paths: 待检查的路径
+        max_workers: 并行列出目录的线程数
+        progress_callback: 进度回调函数 (已检查路径数, 总路径数)
+        cancel_event: 取消事件，设置后停止提交新的目录并返回已得到的结果
+    
+    Returns:
+        路径 -> 是否存在；取消时未检查的路径不会出现在结果中
+    """
+    # 按父目录分组，空路径直接视为不存在
+    results = {}
+    groups = {}
+    for path in paths:
+        if path in results:
+            continue
+        if not path:
+            results[path] = False
+            continue
+        parent, name = os.path.split(os.path.normpath(path))
+        groups.setdefault(parent, {})[path] = os.path.normcase(name)
+        results[path] = None
+    
+    total = len(results)
+    checked = sum(1 for value in results.values() if value is not None)
+    if progress_callback:
+        progress_callback(checked, total)
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+        for directory in groups:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            futures[executor.submit(_list_directory, directory)] = directory
+        
+        for future in as_completed(futures):
+            directory = futures[future]
+            entries = future.result()
+            for path, name in groups[directory].items():
+                results[path] = entries is not None and name in entries
+            
+            checked += len(groups[directory])
+            if progress_callback:
+                progress_callback(checked, total)
+            
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                break
+    
+    return {path: exists for path, exists in results.items() if exists is not None}
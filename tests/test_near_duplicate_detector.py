@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似文件检测的LSH召回测试
+"""
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from tidyfile.core.near_duplicate_detector import hamming_distance, image_candidate_pairs
+
+
+def _planted_hashes(count: int, pairs: int, distance: int, seed: int = 1):
+    """生成count个随机哈希，并植入pairs对汉明距离为distance的哈希"""
+    rnd = random.Random(seed)
+    hashes = [rnd.getrandbits(64) for _ in range(count)]
+    planted = []
+    for _ in range(pairs):
+        original = rnd.randrange(count)
+        value = hashes[original]
+        for bit in rnd.sample(range(64), distance):
+            value ^= 1 << bit
+        hashes.append(value)
+        planted.append((original, len(hashes) - 1))
+    return hashes, planted
+
+
+class ImageCandidatePairsTest(unittest.TestCase):
+    
+    def test_recall_at_several_thousand_images(self):
+        for distance in (4, 8):
+            hashes, planted = _planted_hashes(5000, 100, distance)
+            pairs = image_candidate_pairs(hashes, max_distance=8)
+            missed = [pair for pair in planted if pair not in pairs]
+            self.assertEqual(missed, [], f"距离{distance}的相似对未进入候选")
+    
+    def test_candidates_include_every_pair_within_threshold(self):
+        rnd = random.Random(2)
+        hashes = [rnd.getrandbits(64) for _ in range(200)]
+        hashes += [value ^ (1 << rnd.randrange(64)) ^ (1 << rnd.randrange(64)) for value in hashes[:50]]
+        pairs = image_candidate_pairs(hashes, max_distance=3)
+        for a in range(len(hashes)):
+            for b in range(a + 1, len(hashes)):
+                if hamming_distance(hashes[a], hashes[b]) <= 3:
+                    self.assertIn((a, b), pairs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果文件变更监视器的断线补齐测试
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from tidyfile.core.result_change_watcher import ResultChangeWatcher
+
+
+class GetEventsSinceTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.result_file = os.path.join(tempfile.mkdtemp(), "result.json")
+        self._write([])
+        self.watcher = ResultChangeWatcher(self.result_file)
+        self.watcher.start()
+        self.watcher.stop()
+    
+    def _write(self, records):
+        with open(self.result_file, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+        # 保证文件签名变化
+        stat = os.stat(self.result_file)
+        os.utime(self.result_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    
+    def test_missed_events_are_replayed(self):
+        self._write([{'文件名': 'a.txt', '最终目标路径': '/x/a.txt'}])
+        self.watcher.check_for_changes()
+        self._write([{'文件名': 'a.txt', '最终目标路径': '/x/a.txt'}, {'文件名': 'b.txt', '最终目标路径': '/x/b.txt'}])
+        self.watcher.check_for_changes()
+        self.assertEqual([event['version'] for event in self.watcher.get_events_since(0)], [1, 2])
+        self.assertEqual(self.watcher.get_events_since(2), [])
+    
+    def test_client_ahead_of_restarted_server_is_reset(self):
+        # 服务器重启后版本从0重新计数，旧连接带来的更大版本号需要重新加载全量数据
+        self.assertIsNone(self.watcher.get_events_since(7))
+
+
+if __name__ == "__main__":
+    unittest.main()